@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+'''
+Throughput benchmarks of urchintai_client, run against a local StubServer.
+
+Usage:
+    python benchmarks/bench_throughput.py [--requests 2000] [--concurrency 50] [--latency 0.005] [--json]
+
+For each scenario, reports requests (or parses) per second, failed requests,
+p50/p99 latency in milliseconds and peak memory allocated by Python in KiB.
+'''
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import tracemalloc
+
+import aiohttp
+
+from urchintai_client import ur_parser
+from urchintai_client.exceptions import RequestError
+from urchintai_client.models import PropertyCode
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.stub_server import StubServer
+from urchintai_client.ur_client import UrClient
+
+
+class TimedSender:
+    '''
+    Wrap a RequestSender and record the latency of each request.
+    '''
+
+    def __init__(self, sender):
+        self._sender = sender
+        self.latencies = []
+
+    async def post(self, url, data):
+        started = time.perf_counter()
+        try:
+            return await self._sender.post(url, data)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    async def get(self, url):
+        started = time.perf_counter()
+        try:
+            return await self._sender.get(url)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+async def bench_single(server, session, args):
+    sender = TimedSender(RequestSender(session))
+    client = create_client(server, sender)
+
+    errors = 0
+    for code in create_codes(args.requests):
+        try:
+            await client.is_property_vacant(property_code=code)
+        except RequestError:
+            # Failures are expected with --error-rate, like in the batch scenario.
+            errors += 1
+
+    return sender.latencies, errors
+
+async def bench_batch(server, session, args):
+    sender = TimedSender(RequestSender(session))
+    client = create_client(server, sender)
+
+    errors = 0
+    async for result in client.check_properties(create_codes(args.requests), max_concurrency=args.concurrency):
+        if result.error is not None:
+            errors += 1
+
+    return sender.latencies, errors
+
+async def bench_parse(server, session, args):
+    async with session.get(server.property_page_url(PropertyCode('40', '246', '0'))) as response:
+        html_doc = await response.text()
+
+    latencies = []
+    for _ in range(args.parses):
+        started = time.perf_counter()
+        ur_parser.get_property_name_from_content(html_doc)
+        latencies.append(time.perf_counter() - started)
+
+    return latencies, 0
+
+async def bench_parse_incremental(server, session, args):
+    async with session.get(server.property_page_url(PropertyCode('40', '246', '0'))) as response:
+        html_doc = await response.read()
+
+    latencies = []
+    for _ in range(args.parses):
+        started = time.perf_counter()
+        parser = ur_parser.PropertyNameParser()
+        for i in range(0, len(html_doc), 8192):
+            if parser.feed_chunk(html_doc[i:i + 8192]):
+                break
+        parser.get_property_name()
+        latencies.append(time.perf_counter() - started)
+
+    return latencies, 0
+
+SCENARIOS = [
+    ('single', bench_single),
+    ('batch', bench_batch),
+    ('parse', bench_parse),
+    ('parse_incremental', bench_parse_incremental),
+]
+
+async def run_scenario(bench, args):
+    server = StubServer(latency=args.latency, null_ratio=args.null_ratio,
+                        error_rate=args.error_rate, page_size=args.page_size, seed=0)
+    async with server:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            started = time.perf_counter()
+            latencies, errors = await bench(server, session, args)
+            elapsed = time.perf_counter() - started
+
+            tracemalloc.start()
+            await bench(server, session, args)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    return {
+        'count': len(latencies),
+        'per_second': round(len(latencies) / elapsed, 1),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'peak_memory_kib': round(peak / 1024, 1),
+    }
+
+def percentile(values, p):
+    if len(values) < 2:
+        return values[0] if values else 0
+
+    return statistics.quantiles(values, n=100, method='inclusive')[p - 1]
+
+def create_client(server, sender):
+    return UrClient(sender, property_rooms_api=server.property_rooms_api,
+                    room_details_api=server.room_details_api)
+
+def create_codes(count):
+    return [PropertyCode(f'{i % 100:02d}', f'{i // 100 % 1000:03d}', '0') for i in range(count)]
+
+async def main(args):
+    results = {}
+    for name, bench in SCENARIOS:
+        if args.scenario and name not in args.scenario:
+            continue
+        results[name] = await run_scenario(bench, args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f'{"scenario":<20}{"count":>8}{"per sec":>12}{"errors":>8}{"p50 ms":>10}{"p99 ms":>10}{"peak KiB":>12}')
+    for name, result in results.items():
+        print(f'{name:<20}{result["count"]:>8}{result["per_second"]:>12}{result["errors"]:>8}{result["p50_ms"]:>10}' + \
+              f'{result["p99_ms"]:>10}{result["peak_memory_kib"]:>12}')
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark urchintai_client against a local stub server.')
+    parser.add_argument('--scenario', action='append', choices=[name for name, _ in SCENARIOS],
+                        help='scenario to run, can be repeated (default: all)')
+    parser.add_argument('--requests', type=int, default=2000, help='number of API requests per scenario')
+    parser.add_argument('--parses', type=int, default=200, help='number of property pages parsed')
+    parser.add_argument('--concurrency', type=int, default=50, help='requests in flight for batch scenario')
+    parser.add_argument('--latency', type=float, default=0.005, help='latency of the stub server in seconds')
+    parser.add_argument('--null-ratio', type=float, default=0.5, help='ratio of full properties')
+    parser.add_argument('--error-rate', type=float, default=0, help='ratio of failed requests')
+    parser.add_argument('--page-size', type=int, default=300_000, help='size of property pages in bytes')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+
+    return parser.parse_args()
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -5,6 +5,10 @@ requires = [
     'beautifulsoup4>=4.9.3'
 ]
 
+extra_requirements = {
+    'speedups': ['orjson>=3.0.0', 'Brotli>=1.0.9'],
+}
+
 test_requirements = [
     'pytest-mock>=3.5.1',
     'pytest>=6.2.2',
@@ -30,5 +34,9 @@ setup(
         'Operating System :: OS Independent',
     ],
    install_requires=requires,
+   extras_require=extra_requirements,
+   entry_points={
+       'console_scripts': ['urchintai=urchintai_client.cli:main'],
+   },
    tests_require=test_requirements,
 )
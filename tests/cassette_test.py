@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+from urchintai_client.cassette import RecordingSender, ReplaySender
+from urchintai_client.exceptions import (DeadlineExceededError, RequestTimeoutError,
+                                         ServerError, ThrottledError)
+from urchintai_client.request_sender import ConditionalResponse, RequestSender
+from urchintai_client.retry import RetryPolicy
+
+
+class FakeSender:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    async def _respond(self):
+        self.calls += 1
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def post(self, url, data):
+        return await self._respond()
+
+    async def get(self, url):
+        return await self._respond()
+
+    async def get_conditional(self, url, etag=None, last_modified=None):
+        return await self._respond()
+
+    async def get_until(self, url, consume, chunk_size=8192):
+        body = await self._respond()
+        for offset in range(0, len(body), chunk_size):
+            if consume(body[offset:offset + chunk_size]):
+                return
+
+class MockResponse:
+    def __init__(self, status, chunks=()):
+        self.status = status
+        self.charset = None
+        self.content_length = None
+        self.content = self
+        self._chunks = chunks
+
+    async def text(self, encoding=None):
+        return 'error'
+
+    async def iter_chunked(self, n):
+        for chunk in self._chunks:
+            yield chunk
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+@pytest.mark.asyncio
+async def test_should_replay_recorded_responses(tmp_path):
+    '''
+    Responses are replayed for the same method, url and form data, whatever the order of fields.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    with RecordingSender(FakeSender(['[{"id": 1}]', b'<html>name</html>']), path) as recorder:
+        await recorder.post('https://example.com/api', {'a': 1, 'b': 2})
+        await recorder.get('https://example.com/page')
+
+    # Act
+    with ReplaySender(path) as replay:
+        text = await replay.post('https://example.com/api', {'b': '2', 'a': '1'})
+        body = await replay.get('https://example.com/page')
+
+    # Assert
+    assert text == '[{"id": 1}]'
+    assert body == b'<html>name</html>'
+
+@pytest.mark.asyncio
+async def test_should_cycle_through_repeated_responses(tmp_path):
+    '''
+    A request recorded several times gets its responses in recorded order, then starts over.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    with RecordingSender(FakeSender(['1', '2']), path) as recorder:
+        await recorder.get('https://example.com')
+        await recorder.get('https://example.com')
+
+    # Act
+    with ReplaySender(path) as replay:
+        results = [await replay.get('https://example.com') for _ in range(3)]
+
+    # Assert
+    assert results == ['1', '2', '1']
+
+@pytest.mark.asyncio
+async def test_should_replay_recorded_errors(tmp_path):
+    '''
+    Errors received from the server are recorded and raised again with the same type and status.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    url = 'https://example.com'
+    inner = FakeSender([ThrottledError('slow down', url, 429), ServerError('oops', url, 503),
+                        RequestTimeoutError('timed out', url), DeadlineExceededError('no time left', url)])
+    with RecordingSender(inner, path) as recorder:
+        for _ in range(4):
+            with pytest.raises(Exception):
+                await recorder.get(url)
+
+    # Act, Assert
+    with ReplaySender(path) as replay:
+        assert len(replay) == 3 # running out of time is not a server response
+
+        with pytest.raises(ThrottledError) as e:
+            await replay.get(url)
+        assert e.value.status == 429
+        assert str(e.value) == 'slow down'
+
+        with pytest.raises(ServerError) as e:
+            await replay.get(url)
+        assert e.value.status == 503
+
+        with pytest.raises(RequestTimeoutError) as e:
+            await replay.get(url)
+        assert e.value.status is None
+
+@pytest.mark.asyncio
+async def test_should_replay_conditional_and_streamed_requests(tmp_path):
+    '''
+    Not modified answers and the part of streamed bodies which was read are replayed.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    url = 'https://example.com'
+    inner = FakeSender([ConditionalResponse('body', '"v1"', None, False),
+                        ConditionalResponse(None, '"v1"', None, True),
+                        b'0123456789'])
+    with RecordingSender(inner, path) as recorder:
+        await recorder.get_conditional(url)
+        await recorder.get_conditional(url, etag='"v1"')
+        await recorder.get_until(url, lambda chunk: b'5' in chunk, chunk_size=3)
+
+    # Act
+    chunks = []
+    with ReplaySender(path) as replay:
+        modified = await replay.get_conditional(url)
+        not_modified = await replay.get_conditional(url, etag='"v1"')
+        await replay.get_until(url, lambda chunk: chunks.append(bytes(chunk)), chunk_size=4)
+
+    # Assert
+    assert modified.text == 'body'
+    assert not modified.not_modified
+    assert not_modified.not_modified
+    assert not_modified.etag == '"v1"'
+    assert chunks == [b'0123', b'45'] # reading stopped after 012345
+
+@pytest.mark.asyncio
+async def test_should_replay_validators_of_conditional_requests(tmp_path):
+    '''
+    ETag and Last-Modified are recorded, so that a client tracking changes can use them on replay.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    url = 'https://example.com/40_4120.html'
+    last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+    inner = FakeSender([ConditionalResponse('<h1 class="item_title">Name</h1>', '"v1"', last_modified, False),
+                        ConditionalResponse(None, '"v1"', last_modified, True)])
+    with RecordingSender(inner, path) as recorder:
+        await recorder.get_conditional(url)
+        await recorder.get_conditional(url, '"v1"', last_modified)
+
+    # Act
+    with ReplaySender(path) as replay:
+        modified = await replay.get_conditional(url)
+        not_modified = await replay.get_conditional(url, modified.etag, modified.last_modified)
+
+    # Assert
+    assert modified == ConditionalResponse('<h1 class="item_title">Name</h1>', '"v1"', last_modified, False)
+    assert not_modified == ConditionalResponse(None, '"v1"', last_modified, True)
+
+@pytest.mark.asyncio
+async def test_should_replay_errors_of_streamed_requests(tmp_path):
+    '''
+    A streamed request which failed raises the same error again instead of passing it to consume.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    url = 'https://example.com'
+    with RecordingSender(FakeSender([ServerError('oops', url, 503)]), path) as recorder:
+        with pytest.raises(ServerError):
+            await recorder.get_until(url, lambda chunk: False)
+
+    # Act
+    chunks = []
+    with ReplaySender(path) as replay:
+        with pytest.raises(ServerError) as e:
+            await replay.get_until(url, chunks.append)
+
+    # Assert
+    assert e.value.status == 503
+    assert chunks == []
+
+@pytest.mark.asyncio
+async def test_should_record_streamed_body_of_last_attempt_only(tmp_path):
+    '''
+    When RequestSender retries a streamed request, only the body of the attempt which succeeded is recorded.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    url = 'https://example.com'
+    session = Mock()
+    session.get.side_effect = [MockResponse(503), MockResponse(200, [b'abc', b'def'])]
+    sender = RequestSender(session, retry_policy=RetryPolicy(base_delay=0, jitter=False))
+    with RecordingSender(sender, path) as recorder:
+        await recorder.get_until(url, lambda chunk: False)
+
+    # Act
+    chunks = []
+    with ReplaySender(path) as replay:
+        await replay.get_until(url, lambda chunk: chunks.append(bytes(chunk)))
+
+    # Assert
+    assert session.get.call_count == 2
+    assert chunks == [b'abcdef']
+
+@pytest.mark.asyncio
+async def test_should_throw_error_if_request_was_not_recorded(tmp_path):
+    '''
+    Replaying a request missing from the cassette raises LookupError.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    with RecordingSender(FakeSender(['1']), path) as recorder:
+        await recorder.post('https://example.com', {'a': 1})
+
+    # Act, Assert
+    with ReplaySender(path) as replay:
+        with pytest.raises(LookupError):
+            await replay.post('https://example.com', {'a': 2})
+
+@pytest.mark.asyncio
+async def test_should_replay_with_scaled_latency(tmp_path):
+    '''
+    With latency_scale, each response waits for its recorded latency multiplied by the scale.
+    '''
+
+    # Arrange
+    class SlowSender(FakeSender):
+        async def get(self, url):
+            await asyncio.sleep(0.1)
+            return await self._respond()
+
+    path = tmp_path / 'traffic.cassette'
+    with RecordingSender(SlowSender(['1']), path) as recorder:
+        await recorder.get('https://example.com')
+
+    # Act
+    with ReplaySender(path, latency_scale=0.5) as replay:
+        started = time.monotonic()
+        await replay.get('https://example.com')
+        elapsed = time.monotonic() - started
+
+    # Assert
+    assert 0.04 <= elapsed < 0.1
+
+def test_should_append_to_cassette_and_ignore_truncated_record(tmp_path):
+    '''
+    Recording again appends to the cassette, and a record cut short by a crash is ignored.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    for body in ['1', '2']:
+        with RecordingSender(FakeSender([body]), path) as recorder:
+            asyncio.run(recorder.get('https://example.com'))
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x00')
+
+    # Act
+    with ReplaySender(path) as replay:
+        count = len(replay)
+
+    # Assert
+    assert count == 2
+
+def test_should_throw_error_if_file_is_not_a_cassette(tmp_path):
+    '''
+    Only files written by RecordingSender can be replayed.
+    '''
+
+    # Arrange
+    path = tmp_path / 'traffic.cassette'
+    path.write_bytes(b'something else')
+
+    # Act, Assert
+    with pytest.raises(ValueError):
+        ReplaySender(path)
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import Mock
+
+from urchintai_client.change_tracker import ChangeTracker
+
+
+def test_should_only_parse_changed_body():
+    '''
+    Body identical to the previous one is not parsed again.
+    '''
+
+    # Arrange
+    tracker = ChangeTracker()
+    parse = Mock(side_effect=lambda body: len(body))
+
+    # Act
+    first = tracker.update('key', '[{"id": "1"}]', parse)
+    second = tracker.update('key', '[{"id": "1"}]', parse)
+    third = tracker.update('key', 'null', parse)
+
+    # Assert
+    assert first == (True, 13)
+    assert second == (False, 13)
+    assert third == (True, 4)
+    assert parse.call_count == 2
+
+def test_should_track_each_key_separately():
+    '''
+    Same body for a different key counts as a change.
+    '''
+
+    # Arrange
+    tracker = ChangeTracker()
+    tracker.update('key_1', b'null', lambda body: body)
+
+    # Act
+    changed, _ = tracker.update('key_2', b'null', lambda body: body)
+
+    # Assert
+    assert changed == True
+    assert len(tracker) == 2
+
+def test_should_keep_page_validators():
+    '''
+    Validators of a page are kept along with the value parsed from it.
+    '''
+
+    # Arrange
+    tracker = ChangeTracker()
+    url = 'http://example.com'
+
+    # Act
+    tracker.set_validators(url, '"etag"', 'Wed, 21 Oct 2015 07:28:00 GMT', 'Name')
+    validators = tracker.get_validators(url)
+
+    # Assert
+    assert validators.etag == '"etag"'
+    assert validators.last_modified == 'Wed, 21 Oct 2015 07:28:00 GMT'
+    assert validators.value == 'Name'
+    assert tracker.get_validators('http://other.example.com') is None
+
+def test_should_forget_bodies_and_validators_separately():
+    '''
+    Bodies are forgotten by key and validators by URL, without affecting each other.
+    '''
+
+    # Arrange
+    tracker = ChangeTracker()
+    url = 'http://example.com'
+    key = ('GET', url, ())
+    tracker.update(key, b'body', lambda body: body)
+    tracker.set_validators(url, '"etag"', None, 'Name')
+
+    # Act
+    tracker.forget(key)
+    changed, _ = tracker.update(key, b'body', lambda body: body)
+    validators = tracker.get_validators(url)
+    tracker.forget_validators(url)
+
+    # Assert
+    assert changed == True
+    assert validators.etag == '"etag"'
+    assert tracker.get_validators(url) is None
+    assert len(tracker) == 1
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import io
+import json
+import subprocess
+import sys
+from unittest.mock import Mock
+
+import pytest
+from urchintai_client.cli import main, parse_targets, run
+from urchintai_client.models import PropertyCode, RoomCode
+from urchintai_client.ur_client import UrClient
+
+
+def test_should_parse_urls_and_codes():
+    '''
+    Each line can be a property URL, a room URL, a property code or a room code.
+    '''
+
+    # Arrange
+    lines = [
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html\n',
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654\n',
+        '40_4121\n',
+        '40_2460_000020655\n',
+        '\n',
+        'abcxyz\n',
+    ]
+
+    # Act
+    targets = list(parse_targets(lines))
+
+    # Assert
+    assert [(kind, code) for _, kind, code in targets] == [
+        ('property', PropertyCode('40', '412', '0')),
+        ('room', RoomCode('40', '246', '0', '000020654')),
+        ('property', PropertyCode('40', '412', '1')),
+        ('room', RoomCode('40', '246', '0', '000020655')),
+        (None, None),
+    ]
+
+@pytest.mark.asyncio
+async def test_should_write_one_json_line_per_target():
+    '''
+    Results and errors are written as JSON lines, and failures are counted.
+    '''
+
+    # Arrange
+    lines = [
+        '40_4120',
+        '40_2460_000020654',
+        'abcxyz',
+    ]
+
+    async def post(url, data):
+        if 'id' in data:
+            raise ConnectionError('Server error')
+        return 'not null'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    output = io.StringIO()
+
+    # Act
+    failed = await run(UrClient(request_sender), lines, output, max_concurrency=2)
+
+    # Assert
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records == [
+        { 'target': 'abcxyz', 'kind': None, 'vacant': None, 'error': 'Cannot parse URL or code: abcxyz' },
+        { 'target': '40_4120', 'kind': 'property', 'vacant': True, 'error': None },
+        { 'target': '40_2460_000020654', 'kind': 'room', 'vacant': None, 'error': 'Server error' },
+    ]
+    assert failed == 2
+
+def test_should_not_import_beautifulsoup_or_aiohttp_to_show_help():
+    '''
+    The command line tool starts without loading heavy dependencies.
+    '''
+
+    # Arrange
+    code = 'import sys\n' + \
+           'from urchintai_client import cli\n' + \
+           'try:\n' + \
+           '    cli.main(["--help"])\n' + \
+           'except SystemExit:\n' + \
+           '    pass\n' + \
+           'print("bs4" in sys.modules, "aiohttp" in sys.modules, file=sys.stderr)\n'
+
+    # Act
+    completed = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+
+    # Assert
+    assert 'usage: urchintai' in completed.stdout
+    assert completed.stderr.strip() == 'False False'
+
+@pytest.mark.asyncio
+async def test_should_write_result_of_each_line_as_soon_as_it_is_checked():
+    '''
+    Lines are checked as they arrive, and a target given twice gets two output lines.
+    '''
+
+    # Arrange
+    request_sender = Mock()
+    request_sender.post.side_effect = lambda url, data: asyncio.sleep(0, 'not null')
+    output = io.StringIO()
+    written_before_second_line = []
+
+    async def lines():
+        yield '40_4120\n'
+        await asyncio.sleep(0.01)
+        written_before_second_line.append(output.getvalue().count('\n'))
+        yield '40_4120\n'
+
+    # Act
+    failed = await run(UrClient(request_sender), lines(), output, max_concurrency=2)
+
+    # Assert
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records == [{ 'target': '40_4120', 'kind': 'property', 'vacant': True, 'error': None }] * 2
+    assert written_before_second_line == [1]
+    assert failed == 0
+
+def test_should_reject_concurrency_below_one(capsys):
+    '''
+    Concurrency must be at least 1.
+    '''
+
+    # Act
+    with pytest.raises(SystemExit) as e:
+        main(['-c', '0'])
+
+    # Assert
+    assert e.value.code == 2
+    assert 'must be at least 1' in capsys.readouterr().err
+
+@pytest.mark.parametrize('argv, message', [
+    (['--retries', '-1'], 'must be at least 0'),
+    (['--rate', '-5'], 'must be greater than 0'),
+    (['--timeout', '0'], 'must be greater than 0'),
+])
+def test_should_reject_invalid_retries_rate_and_timeout(capsys, argv, message):
+    '''
+    Retries cannot be negative, rate and timeout must be greater than 0.
+    '''
+
+    # Act
+    with pytest.raises(SystemExit) as e:
+        main(argv)
+
+    # Assert
+    assert e.value.code == 2
+    assert message in capsys.readouterr().err
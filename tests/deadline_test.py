@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from urchintai_client.deadline import (deadline, get_deadline, get_remaining,
+                                       run_with_timeout)
+from urchintai_client.exceptions import DeadlineExceededError, is_transient
+
+
+def test_nested_deadline_should_never_extend_outer_one():
+    '''
+    A nested deadline can shorten the current one but not extend it.
+    '''
+
+    # Act, Assert
+    assert get_remaining() is None
+    with deadline(10):
+        outer = get_deadline()
+        with deadline(100):
+            assert get_deadline() == outer
+        with deadline(1):
+            assert get_remaining() <= 1
+        assert get_deadline() == outer
+    assert get_deadline() is None
+
+@pytest.mark.asyncio
+async def test_should_cancel_coroutine_when_deadline_is_exceeded():
+    '''
+    A coroutine still running at its deadline is cancelled, and the call raises DeadlineExceededError.
+    '''
+
+    # Arrange
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    # Act
+    with pytest.raises(DeadlineExceededError) as e:
+        await run_with_timeout(slow(), 0.01)
+
+    # Assert
+    assert cancelled == [True]
+    assert not is_transient(e.value)
+
+@pytest.mark.asyncio
+async def test_should_see_deadline_inside_coroutine():
+    '''
+    The deadline is visible to the coroutine and the tasks it starts.
+    '''
+
+    # Arrange
+    async def remaining():
+        return await asyncio.ensure_future(asyncio.sleep(0, get_remaining()))
+
+    # Act
+    result = await run_with_timeout(remaining(), 5)
+
+    # Assert
+    assert 0 < result <= 5
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from urchintai_client.hedging import HedgePolicy
+
+
+def test_should_use_initial_delay_until_enough_latencies_are_known():
+    '''
+    Without enough samples, the hedge delay is initial_delay.
+    '''
+
+    # Arrange
+    policy = HedgePolicy(min_samples=3, initial_delay=2)
+    policy.record('a', 0.1)
+    policy.record('a', 0.1)
+
+    # Act, Assert
+    assert policy.get_delay('a') == 2
+    assert policy.get_delay('b') == 2
+
+def test_should_use_percentile_of_recent_latencies():
+    '''
+    The hedge delay follows the percentile of the most recent latencies of each endpoint.
+    '''
+
+    # Arrange
+    policy = HedgePolicy(percentile=0.9, window=10, min_samples=10, min_delay=0)
+    for latency in range(100):
+        policy.record('a', latency)
+
+    # Act, Assert
+    assert policy.get_delay('a') == 99 # only 90 to 99 are kept
+
+    for latency in range(1, 11):
+        policy.record('a', latency / 10)
+    assert policy.get_delay('a') == 1
+
+def test_should_limit_hedges_to_budget():
+    '''
+    Each request adds max_ratio to the budget, each hedge spends 1, up to max_burst.
+    '''
+
+    # Arrange
+    policy = HedgePolicy(max_ratio=0.5, max_burst=1)
+
+    # Act
+    results = []
+    for _ in range(6):
+        policy.on_request()
+        results.append(policy.try_hedge())
+
+    # Assert
+    assert results == [False, True, False, True, False, True]
+
+def test_should_throw_error_if_percentile_is_invalid():
+    '''
+    Percentile must be between 0 and 1.
+    '''
+
+    # Act
+    with pytest.raises(ValueError) as e:
+        HedgePolicy(percentile=95)
+
+    # Assert
+    assert str(e.value) == 'percentile must be between 0 and 1'
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+from urchintai_client.metrics import Metrics, default_endpoint_label
+
+
+def test_should_group_property_pages_under_one_label():
+    '''
+    Query strings are removed and every .html page shares one label.
+    '''
+
+    # Act, Assert
+    assert default_endpoint_label('https://example.com/api/detail/?id=1') == 'https://example.com/api/detail/'
+    assert default_endpoint_label('https://example.com/chintai/kanto/kanagawa/40_4120.html') == \
+        'https://example.com/*.html'
+
+def test_should_snapshot_recorded_metrics():
+    '''
+    Counters, gauges and histograms are available as a plain dict.
+    '''
+
+    # Arrange
+    metrics = Metrics(buckets=(0.1, 1))
+    endpoint = 'https://example.com/api'
+
+    # Act
+    metrics.request_started(endpoint)
+    metrics.request_started(endpoint)
+    metrics.record_response(endpoint, 200, 100)
+    metrics.request_finished(endpoint, 0.05)
+    metrics.record_error(endpoint, 'RequestTimeoutError')
+    metrics.record_parse('rooms', 0.5)
+    metrics.increment('retries')
+    metrics.increment('retries')
+    snapshot = metrics.snapshot()
+
+    # Assert
+    assert snapshot['requests'] == [{ 'endpoint': endpoint, 'status': 200, 'count': 1 }]
+    assert snapshot['errors'] == [{ 'endpoint': endpoint, 'type': 'RequestTimeoutError', 'count': 1 }]
+    assert snapshot['bytes'] == { endpoint: 100 }
+    assert snapshot['in_flight'] == { endpoint: 1 }
+    assert snapshot['latency_seconds'][endpoint]['buckets'] == [(0.1, 1), (1, 1), (float('inf'), 1)]
+    assert snapshot['parse_seconds']['rooms']['buckets'] == [(0.1, 0), (1, 1), (float('inf'), 1)]
+    assert snapshot['counters'] == { 'retries': 2 }
+
+def test_should_export_prometheus_text():
+    '''
+    Metrics can be exported in Prometheus text format.
+    '''
+
+    # Arrange
+    metrics = Metrics(buckets=(0.1,))
+    endpoint = 'https://example.com/api'
+    metrics.request_started(endpoint)
+    metrics.record_response(endpoint, 503, 10)
+    metrics.request_finished(endpoint, 0.2)
+    metrics.increment('cache_hits')
+
+    # Act
+    text = metrics.to_prometheus()
+
+    # Assert
+    lines = text.splitlines()
+    assert 'urchintai_requests_total{endpoint="https://example.com/api",status="503"} 1' in lines
+    assert 'urchintai_response_bytes_total{endpoint="https://example.com/api"} 10' in lines
+    assert 'urchintai_requests_in_flight{endpoint="https://example.com/api"} 0' in lines
+    assert 'urchintai_request_duration_seconds_bucket{endpoint="https://example.com/api",le="0.1"} 0' in lines
+    assert 'urchintai_request_duration_seconds_bucket{endpoint="https://example.com/api",le="+Inf"} 1' in lines
+    assert 'urchintai_request_duration_seconds_count{endpoint="https://example.com/api"} 1' in lines
+    assert 'urchintai_cache_hits_total 1' in lines
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+from urchintai_client.name_store import PropertyNameStore
+
+
+def test_should_return_none_if_property_not_in_store():
+    '''
+    Unknown property has no name in the store.
+    '''
+
+    # Arrange
+    store = PropertyNameStore(':memory:')
+
+    # Act
+    entry = store.get(CreatePropertyCode('40', '412', '0'))
+
+    # Assert
+    assert entry is None
+
+def test_should_return_stored_name():
+    '''
+    A stored name can be read back using the same property code.
+    '''
+
+    # Arrange
+    store = PropertyNameStore(':memory:')
+    store.set(CreatePropertyCode('40', '412', '0'), 'Old Name')
+    store.set(CreatePropertyCode('40', '412', '0'), 'New Name')
+    store.set(CreatePropertyCode('40', '412', '1'), 'Other Name')
+
+    # Act
+    name, updated_at = store.get(CreatePropertyCode('40', '412', '0'))
+
+    # Assert
+    assert name == 'New Name'
+    assert updated_at > 0
+    assert len(store) == 2
+
+def test_should_keep_names_on_disk(tmp_path):
+    '''
+    Names are still available after the store is reopened.
+    '''
+
+    # Arrange
+    path = str(tmp_path / 'names.db')
+    store = PropertyNameStore(path)
+    store.set(CreatePropertyCode('40', '412', '0'), 'Expected Name')
+    store.close()
+
+    # Act
+    store = PropertyNameStore(path)
+    name, _ = store.get(CreatePropertyCode('40', '412', '0'))
+
+    # Assert
+    assert name == 'Expected Name'
+
+def test_should_commit_names_in_batches(tmp_path):
+    '''
+    Names are committed once commit_every of them are waiting, or when flushed.
+    '''
+
+    # Arrange
+    path = str(tmp_path / 'names.db')
+    store = PropertyNameStore(path, commit_every=2, commit_interval=60)
+    reader = PropertyNameStore(path)
+
+    # Act, Assert
+    store.set(CreatePropertyCode('40', '412', '0'), 'First Name')
+    assert store.get(CreatePropertyCode('40', '412', '0'))[0] == 'First Name'
+    assert len(reader) == 0
+
+    store.set(CreatePropertyCode('40', '412', '1'), 'Second Name')
+    assert len(reader) == 2
+
+    store.set(CreatePropertyCode('40', '412', '2'), 'Third Name')
+    store.flush()
+    assert len(reader) == 3
+
+def CreatePropertyCode(store_code, house_code, type):
+    return {
+        'store_code': store_code,
+        'house_code': house_code,
+        'type': type
+    }
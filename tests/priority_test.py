@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from urchintai_client.priority import (BACKGROUND, INTERACTIVE,
+                                       PriorityScheduler, get_priority,
+                                       priority)
+
+
+@pytest.mark.asyncio
+async def test_should_give_free_slot_to_interactive_requests_first():
+    '''
+    A queued interactive request gets the next free slot before queued background requests.
+    '''
+
+    # Arrange
+    scheduler = PriorityScheduler(max_concurrency=1)
+    await scheduler.acquire(BACKGROUND)
+    order = []
+
+    async def request(lane, name):
+        await scheduler.acquire(lane)
+        order.append(name)
+        scheduler.release(lane)
+
+    tasks = [asyncio.ensure_future(request(BACKGROUND, 'background 1')),
+             asyncio.ensure_future(request(BACKGROUND, 'background 2'))]
+    await asyncio.sleep(0)
+    tasks.append(asyncio.ensure_future(request(INTERACTIVE, 'interactive')))
+    await asyncio.sleep(0)
+
+    # Act
+    scheduler.release(BACKGROUND)
+    await asyncio.gather(*tasks)
+
+    # Assert
+    assert order == ['interactive', 'background 1', 'background 2']
+
+@pytest.mark.asyncio
+async def test_should_keep_slots_for_interactive_requests():
+    '''
+    Background requests cannot use more than their share of slots.
+    '''
+
+    # Arrange
+    scheduler = PriorityScheduler(max_concurrency=4, background_share=0.5)
+    for _ in range(2):
+        await scheduler.acquire(BACKGROUND)
+
+    # Act
+    waiting = asyncio.ensure_future(scheduler.acquire(BACKGROUND))
+    await asyncio.sleep(0)
+    await asyncio.wait_for(scheduler.acquire(INTERACTIVE), timeout=0.1)
+    await asyncio.wait_for(scheduler.acquire(INTERACTIVE), timeout=0.1)
+
+    # Assert
+    assert not waiting.done()
+    assert scheduler.in_flight == { INTERACTIVE: 2, BACKGROUND: 2 }
+    assert scheduler.waiting == { INTERACTIVE: 0, BACKGROUND: 1 }
+
+    waiting.cancel()
+
+@pytest.mark.asyncio
+async def test_should_not_starve_background_requests():
+    '''
+    After starvation_limit interactive requests in a row, a waiting background request gets a slot.
+    '''
+
+    # Arrange
+    scheduler = PriorityScheduler(max_concurrency=1, starvation_limit=2)
+    await scheduler.acquire(INTERACTIVE)
+    order = []
+
+    async def request(lane, name):
+        await scheduler.acquire(lane)
+        order.append(name)
+        scheduler.release(lane)
+
+    tasks = [asyncio.ensure_future(request(BACKGROUND, 'background'))]
+    await asyncio.sleep(0)
+    tasks += [asyncio.ensure_future(request(INTERACTIVE, f'interactive {i}')) for i in range(4)]
+    await asyncio.sleep(0)
+
+    # Act
+    scheduler.release(INTERACTIVE)
+    await asyncio.gather(*tasks)
+
+    # Assert
+    assert order == ['interactive 0', 'interactive 1', 'background', 'interactive 2', 'interactive 3']
+
+@pytest.mark.asyncio
+async def test_should_remove_cancelled_waiters():
+    '''
+    A cancelled waiter does not take a slot.
+    '''
+
+    # Arrange
+    scheduler = PriorityScheduler(max_concurrency=1)
+    await scheduler.acquire(INTERACTIVE)
+    cancelled = asyncio.ensure_future(scheduler.acquire(INTERACTIVE))
+    await asyncio.sleep(0)
+
+    # Act
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    scheduler.release(INTERACTIVE)
+
+    # Assert
+    await asyncio.wait_for(scheduler.acquire(BACKGROUND), timeout=0.1)
+    assert scheduler.in_flight == { INTERACTIVE: 0, BACKGROUND: 1 }
+
+def test_should_set_priority_inside_block():
+    '''
+    priority() sets the lane of requests sent inside the block only.
+    '''
+
+    # Act, Assert
+    assert get_priority() is None
+    with priority(BACKGROUND):
+        assert get_priority() == BACKGROUND
+    assert get_priority() is None
+
+    with pytest.raises(ValueError):
+        with priority('urgent'):
+            pass
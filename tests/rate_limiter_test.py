@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from urchintai_client.rate_limiter import (AdaptiveRateLimiter,
+                                           SharedRateLimiter, TokenBucket)
+
+
+@pytest.mark.asyncio
+async def test_should_allow_burst_without_waiting():
+    '''
+    Requests up to burst size are allowed immediately.
+    '''
+
+    # Arrange
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=3, clock=clock)
+
+    # Act
+    await asyncio.wait_for(asyncio.gather(*[bucket.acquire() for _ in range(3)]), timeout=0.1)
+
+def test_should_wait_for_token_when_bucket_is_empty(mocker):
+    '''
+    Once the bucket is empty, each request waits for its own slot.
+    '''
+
+    # Arrange
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    mocker.patch('asyncio.sleep', side_effect=fake_sleep)
+    bucket = TokenBucket(rate=10, burst=1, clock=FakeClock())
+
+    async def acquire_all():
+        for _ in range(3):
+            await bucket.acquire()
+
+    # Act
+    asyncio.run(acquire_all())
+
+    # Assert
+    assert sleeps == pytest.approx([0.1, 0.2])
+
+def test_shared_limiter_should_allow_burst_then_space_requests(mocker):
+    '''
+    Shared limiter lets burst requests through, then gives each request its own slot.
+    '''
+
+    # Arrange
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    mocker.patch('asyncio.sleep', side_effect=fake_sleep)
+    limiter = SharedRateLimiter(rate=10, burst=2, clock=FakeClock())
+
+    async def acquire_all():
+        for _ in range(4):
+            await limiter.acquire()
+
+    # Act
+    asyncio.run(acquire_all())
+
+    # Assert
+    assert sleeps == pytest.approx([0.1, 0.2])
+
+def test_should_throw_error_if_rate_is_invalid():
+    '''
+    Rate must be positive.
+    '''
+
+    # Act
+    with pytest.raises(ValueError) as e:
+        TokenBucket(rate=0)
+
+    # Assert
+    assert str(e.value) == 'rate must be greater than 0'
+
+def test_adaptive_should_increase_rate_on_success():
+    '''
+    Each successful request raises the rate additively, up to max_rate.
+    '''
+
+    # Arrange
+    limiter = AdaptiveRateLimiter(rate=5, max_rate=5.25, increase=0.1, clock=FakeClock())
+
+    # Act
+    limiter.record(True, 0.1)
+    rate_after_one = limiter.rate
+    for _ in range(10):
+        limiter.record(True, 0.1)
+
+    # Assert
+    assert rate_after_one == pytest.approx(5.1)
+    assert limiter.rate == 5.25
+
+def test_adaptive_should_decrease_rate_on_failure_or_slow_response():
+    '''
+    Failed or slow responses halve the rate, at most once per cooldown.
+    '''
+
+    # Arrange
+    clock = FakeClock()
+    limiter = AdaptiveRateLimiter(rate=40, min_rate=4, slow_threshold=1, cooldown=1, clock=clock)
+
+    # Act
+    limiter.record(False, 0.1)
+    limiter.record(False, 0.1)
+    rate_after_failures = limiter.rate
+    clock.now = 1
+    limiter.record(True, 2)
+    rate_after_slow_response = limiter.rate
+    for i in range(10):
+        clock.now = 2 + i
+        limiter.record(False, 0.1)
+
+    # Assert
+    assert rate_after_failures == 20
+    assert rate_after_slow_response == 10
+    assert limiter.rate == 4
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
@@ -1,9 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
 from unittest.mock import Mock
 
+import aiohttp
 import pytest
+from urchintai_client.deadline import deadline, run_with_timeout
+from urchintai_client.exceptions import (CircuitOpenError,
+                                         DeadlineExceededError, RequestError,
+                                         RequestTimeoutError, ServerError,
+                                         ThrottledError)
+from urchintai_client.hedging import HedgePolicy
+from urchintai_client.metrics import Metrics
+from urchintai_client.priority import (BACKGROUND, INTERACTIVE,
+                                       PriorityScheduler, priority)
+from urchintai_client.rate_limiter import AdaptiveRateLimiter
 from urchintai_client.request_sender import RequestSender
+from urchintai_client.response_cache import ResponseCache
+from urchintai_client.retry import CLOSED, OPEN, CircuitBreaker, RetryPolicy
 
 
 @pytest.mark.asyncio
@@ -98,16 +112,794 @@ async def test_should_throw_exception_if_get_not_ok(mocker):
     # Assert
     assert str(e.value) == f'An error occurred while sending request to {url}: {response_error}'
 
+@pytest.mark.asyncio
+async def test_should_serve_repeated_post_from_cache():
+    '''
+    If a cache is provided, the same request is only sent once.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    response_text = 'dummy response text'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse(response_text, 200)
+    cache = ResponseCache()
+    request_sender = RequestSender(session, cache=cache)
+
+    # Act
+    first = await request_sender.post(url, { 'a': '1', 'b': '2' })
+    second = await request_sender.post(url, { 'b': '2', 'a': '1' })
+
+    # Assert
+    assert first == second == response_text
+    assert session.post.call_count == 1
+    assert cache.hits == 1
+
+@pytest.mark.asyncio
+async def test_should_not_cache_failed_request():
+    '''
+    Error responses are never stored in the cache.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+
+    session = Mock()
+    session.get.side_effect = lambda *args, **kwargs: MockResponse('Server error', 500)
+    cache = ResponseCache()
+    request_sender = RequestSender(session, cache=cache)
+
+    # Act
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await request_sender.get(url)
+
+    # Assert
+    assert session.get.call_count == 2
+    assert len(cache) == 0
+
+@pytest.mark.asyncio
+async def test_should_coalesce_identical_concurrent_requests():
+    '''
+    Concurrent callers with the same request share one in-flight request.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    data = { 'content': 'dummy' }
+    response_text = 'dummy response text'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse(response_text, 200, delay=0.01)
+    request_sender = RequestSender(session, coalesce=True)
+
+    # Act
+    results = await asyncio.gather(*[request_sender.post(url, data) for _ in range(5)])
+    await request_sender.post(url, data)
+
+    # Assert
+    assert results == [response_text] * 5
+    assert session.post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_should_not_cancel_shared_request():
+    '''
+    If one caller is cancelled, the others still receive the response.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    data = { 'content': 'dummy' }
+    response_text = 'dummy response text'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse(response_text, 200, delay=0.01)
+    request_sender = RequestSender(session, coalesce=True)
+
+    cancelled = asyncio.ensure_future(request_sender.post(url, data))
+    waiting = asyncio.ensure_future(request_sender.post(url, data))
+    await asyncio.sleep(0)
+
+    # Act
+    cancelled.cancel()
+    result = await waiting
+
+    # Assert
+    assert cancelled.cancelled()
+    assert result == response_text
+    assert session.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_shared_request_should_not_use_deadline_of_first_caller():
+    '''
+    Each caller of a shared request only waits for it until its own deadline.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    data = { 'content': 'dummy' }
+    response_text = 'dummy response text'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse(response_text, 200, delay=0.05)
+    request_sender = RequestSender(session, coalesce=True)
+
+    # Act
+    hurried = asyncio.ensure_future(run_with_timeout(request_sender.post(url, data), 0.01))
+    await asyncio.sleep(0)
+    result = await request_sender.post(url, data)
+
+    # Assert
+    with pytest.raises(DeadlineExceededError):
+        await hurried
+    assert result == response_text
+    assert session.post.call_count == 1
+    assert 'timeout' not in session.post.call_args.kwargs
+
+@pytest.mark.asyncio
+async def test_get_until_should_stop_reading_when_consumer_is_done():
+    '''
+    Body is passed chunk by chunk until the consumer does not need more.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    resp = MockResponse('', 200, chunks=[b'a', b'b', b'c'])
+
+    session = Mock()
+    session.get.return_value = resp
+    request_sender = RequestSender(session)
+    consumed = []
+
+    def consume(chunk):
+        consumed.append(chunk)
+        return chunk == b'b'
+
+    # Act
+    await request_sender.get_until(url, consume)
+
+    # Assert
+    assert consumed == [b'a', b'b']
+    assert resp.closed
+
+@pytest.mark.asyncio
+async def test_get_until_should_not_retry_once_body_was_consumed():
+    '''
+    A request which fails before the body is read is retried, not one which fails in the middle of it.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    session = Mock()
+    session.get.side_effect = [MockResponse('error', 503),
+                               MockResponse('', 200, chunks=[b'Nam', aiohttp.ClientPayloadError()]),
+                               MockResponse('', 200, chunks=[b'Name'])]
+    request_sender = RequestSender(session, retry_policy=RetryPolicy(base_delay=0, jitter=False))
+    consumed = []
+
+    # Act
+    with pytest.raises(RequestError):
+        await request_sender.get_until(url, lambda chunk: consumed.append(chunk))
+
+    # Assert
+    assert session.get.call_count == 2
+    assert consumed == [b'Nam']
+
+@pytest.mark.asyncio
+async def test_get_until_should_throw_exception_if_not_ok():
+    '''
+    Test streaming a response with error
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    response_error = 'Server error'
+
+    session = Mock()
+    session.get.return_value = MockResponse(response_error, 500)
+    request_sender = RequestSender(session)
+
+    # Act
+    with pytest.raises(ConnectionError) as e:
+        await request_sender.get_until(url, lambda chunk: False)
+
+    # Assert
+    assert str(e.value) == f'An error occurred while sending request to {url}: {response_error}'
+
+@pytest.mark.asyncio
+async def test_should_report_each_request_to_rate_limiter():
+    '''
+    Rate limiter is asked before each request and told about its outcome.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    responses = [MockResponse('ok', 200), MockResponse('Server error', 500), MockResponse('Not found', 404)]
+
+    session = Mock()
+    session.get.side_effect = responses
+    rate_limiter = Mock()
+    rate_limiter.acquire.side_effect = lambda: asyncio.sleep(0)
+    request_sender = RequestSender(session, rate_limiter=rate_limiter)
+
+    # Act
+    await request_sender.get(url)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await request_sender.get(url)
+
+    # Assert
+    assert rate_limiter.acquire.call_count == 3
+    assert [c.args[0] for c in rate_limiter.record.call_args_list] == [True, False, False]
+
+@pytest.mark.asyncio
+async def test_should_raise_typed_error_depending_on_status():
+    '''
+    Throttling, server errors and other errors can be told apart.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    statuses = [(429, ThrottledError), (503, ServerError), (404, RequestError)]
+
+    for status, error_type in statuses:
+        session = Mock()
+        session.get.return_value = MockResponse('error', status)
+        request_sender = RequestSender(session)
+
+        # Act
+        with pytest.raises(error_type) as e:
+            await request_sender.get(url)
+
+        # Assert
+        assert e.value.status == status
+        assert e.value.url == url
+
+@pytest.mark.asyncio
+async def test_should_raise_timeout_error_if_request_times_out():
+    '''
+    Timeouts are reported as RequestTimeoutError.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+
+    session = Mock()
+    session.get.side_effect = asyncio.TimeoutError()
+    request_sender = RequestSender(session)
+
+    # Act
+    with pytest.raises(RequestTimeoutError) as e:
+        await request_sender.get(url)
+
+    # Assert
+    assert str(e.value) == f'Request to {url} timed out'
+
+@pytest.mark.asyncio
+async def test_should_retry_transient_failure():
+    '''
+    A transient failure is retried until the request succeeds.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    response_text = 'dummy response text'
+
+    session = Mock()
+    session.post.side_effect = [MockResponse('error', 503), MockResponse(response_text, 200)]
+    request_sender = RequestSender(session, retry_policy=RetryPolicy(base_delay=0))
+
+    # Act
+    actual_response_text = await request_sender.post(url, {})
+
+    # Assert
+    assert actual_response_text == response_text
+    assert session.post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_should_not_retry_permanent_failure():
+    '''
+    Permanent failures are raised after the first attempt.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse('not found', 404)
+    request_sender = RequestSender(session, retry_policy=RetryPolicy(base_delay=0))
+
+    # Act
+    with pytest.raises(RequestError):
+        await request_sender.post(url, {})
+
+    # Assert
+    assert session.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_should_give_up_after_max_attempts():
+    '''
+    The last error is raised once every attempt has failed.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse('error', 500)
+    request_sender = RequestSender(session, retry_policy=RetryPolicy(max_attempts=3, base_delay=0))
+
+    # Act
+    with pytest.raises(ServerError):
+        await request_sender.post(url, {})
+
+    # Assert
+    assert session.post.call_count == 3
+
+@pytest.mark.asyncio
+async def test_should_fail_fast_when_circuit_is_open():
+    '''
+    Once the circuit of an endpoint is open, requests are not sent anymore.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api?id=1'
+
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse('error', 500)
+    breaker = CircuitBreaker(failure_threshold=2)
+    request_sender = RequestSender(session, circuit_breaker=breaker)
+
+    for _ in range(2):
+        with pytest.raises(ServerError):
+            await request_sender.post(url, {})
+
+    # Act
+    with pytest.raises(CircuitOpenError):
+        await request_sender.post('http://example.com/api?id=2', {})
+
+    # Assert
+    assert session.post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_get_conditional_should_send_validators():
+    '''
+    Validators are sent as headers and a 304 response is reported as not modified.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    last_modified = 'Wed, 21 Oct 2015 07:28:00 GMT'
+
+    session = Mock()
+    session.get.return_value = MockResponse('', 304)
+    request_sender = RequestSender(session)
+
+    # Act
+    resp = await request_sender.get_conditional(url, '"v1"', last_modified)
+
+    # Assert
+    assert resp.not_modified
+    assert resp.text is None
+    assert session.get.call_args.kwargs['headers'] == {
+        'If-None-Match': '"v1"', 'If-Modified-Since': last_modified
+    }
+
+@pytest.mark.asyncio
+async def test_get_conditional_should_return_new_validators():
+    '''
+    A modified page is returned with its new validators.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    response_text = 'dummy response text'
+
+    session = Mock()
+    session.get.return_value = MockResponse(response_text, 200, headers={ 'ETag': '"v2"' })
+    request_sender = RequestSender(session)
+
+    # Act
+    resp = await request_sender.get_conditional(url, '"v1"')
+
+    # Assert
+    assert not resp.not_modified
+    assert resp.text == response_text
+    assert resp.etag == '"v2"'
+    assert resp.last_modified is None
+
+@pytest.mark.asyncio
+async def test_should_record_metrics_of_requests():
+    '''
+    Statuses, bytes, errors, retries and cache hits are recorded in metrics.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+
+    session = Mock()
+    session.post.side_effect = [asyncio.TimeoutError(), MockResponse('error', 503), MockResponse('ok', 200)]
+    metrics = Metrics()
+    request_sender = RequestSender(session, cache=ResponseCache(), metrics=metrics,
+                                   retry_policy=RetryPolicy(base_delay=0))
+
+    # Act
+    await request_sender.post(url, {})
+    await request_sender.post(url, {})
+
+    # Assert
+    snapshot = metrics.snapshot()
+    assert sorted((r['status'], r['count']) for r in snapshot['requests']) == [(200, 1), (503, 1)]
+    assert snapshot['errors'] == [{ 'endpoint': url, 'type': 'RequestTimeoutError', 'count': 1 }]
+    assert snapshot['bytes'] == { url: 7 }
+    assert snapshot['in_flight'] == { url: 0 }
+    assert snapshot['latency_seconds'][url]['count'] == 3
+    assert snapshot['counters'] == { 'cache_misses': 1, 'cache_hits': 1, 'retries': 2 }
+
+@pytest.mark.asyncio
+async def test_should_use_content_length_as_response_size():
+    '''
+    When the response has a Content-Length, the body is not encoded again to measure it.
+    '''
+
+    # Arrange
+    class Body(str):
+        def encode(self, *args, **kwargs):
+            raise AssertionError('body should not be encoded')
+
+    url = 'http://example.com/api'
+    response = MockResponse(Body('ok'), 200)
+    response.content_length = 120
+
+    session = Mock()
+    session.get.return_value = response
+    metrics = Metrics()
+    request_sender = RequestSender(session, metrics=metrics)
+
+    # Act
+    await request_sender.get(url)
+
+    # Assert
+    assert metrics.snapshot()['bytes'] == { url: 120 }
+
+@pytest.mark.asyncio
+async def test_should_return_bytes_in_binary_mode():
+    '''
+    In binary mode, the body is returned as is and compressed responses are asked for.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+    data = { 'key': 'value' }
+
+    session = Mock()
+    session.post.return_value = MockResponse('空室', 200)
+    request_sender = RequestSender(session, binary=True)
+
+    # Act
+    body = await request_sender.post(url, data)
+
+    # Assert
+    assert body == '空室'.encode('utf-8')
+    assert 'gzip' in session.post.call_args.kwargs['headers']['Accept-Encoding']
+
+@pytest.mark.asyncio
+async def test_should_decode_error_message_in_binary_mode():
+    '''
+    Errors of a binary RequestSender have the same message as in text mode.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+
+    session = Mock()
+    session.get.return_value = MockResponse('Not Found', 404)
+    request_sender = RequestSender(session, binary=True)
+
+    # Act
+    with pytest.raises(RequestError) as e:
+        await request_sender.get(url)
+
+    # Assert
+    assert str(e.value) == f'An error occurred while sending request to {url}: Not Found'
+
+@pytest.mark.asyncio
+async def test_should_decode_as_utf8_if_response_has_no_charset():
+    '''
+    Without charset, the body is decoded as UTF-8 instead of guessing its encoding.
+    '''
+
+    # Arrange
+    session = Mock()
+    response = MockResponse('ok', 200)
+    session.get.return_value = response
+    request_sender = RequestSender(session)
+
+    # Act
+    await request_sender.get('http://example.com/api')
+
+    # Assert
+    assert response.encoding == 'utf-8'
+
+@pytest.mark.asyncio
+async def test_should_send_hedge_if_response_is_late():
+    '''
+    If the first request is slower than the hedge delay, a second one is sent,
+    the first response wins and the other request is cancelled.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+
+    session = Mock()
+    slow = MockResponse('slow', 200, delay=10)
+    session.post.side_effect = [slow, MockResponse('fast', 200)]
+    metrics = Metrics()
+    policy = HedgePolicy(initial_delay=0.01, max_ratio=1, max_burst=1)
+    request_sender = RequestSender(session, hedge_policy=policy, metrics=metrics)
+
+    # Act
+    response_text = await asyncio.wait_for(request_sender.post(url, {}), timeout=1)
+    await asyncio.sleep(0)
+
+    # Assert
+    assert response_text == 'fast'
+    assert session.post.call_count == 2
+    assert slow.cancelled
+    assert metrics.snapshot()['counters'] == { 'hedges': 1, 'hedges_won': 1 }
+
+@pytest.mark.asyncio
+async def test_should_not_hedge_without_budget():
+    '''
+    When the hedge budget is spent, slow requests are simply awaited.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+
+    session = Mock()
+    session.post.side_effect = [MockResponse('slow', 200, delay=0.05), MockResponse('fast', 200)]
+    request_sender = RequestSender(session, hedge_policy=HedgePolicy(initial_delay=0.01, max_ratio=0))
+
+    # Act
+    response_text = await request_sender.post(url, {})
+
+    # Assert
+    assert response_text == 'slow'
+    assert session.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_should_wait_for_hedge_if_first_request_fails():
+    '''
+    If one of the two requests fails, the response of the other one is returned.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+
+    session = Mock()
+    session.post.side_effect = [MockResponse('error', 503, delay=0.05), MockResponse('ok', 200, delay=0.1)]
+    policy = HedgePolicy(initial_delay=0.01, max_ratio=1, max_burst=1)
+    request_sender = RequestSender(session, hedge_policy=policy)
+
+    # Act
+    response_text = await request_sender.post(url, {})
+
+    # Assert
+    assert response_text == 'ok'
+
+@pytest.mark.asyncio
+async def test_should_send_interactive_requests_before_queued_background_ones():
+    '''
+    With a scheduler, an interactive request does not wait behind queued background requests.
+    '''
+
+    # Arrange
+    session = Mock()
+    session.get.side_effect = lambda url: MockResponse(url, 200, delay=0.05)
+    request_sender = RequestSender(session, scheduler=PriorityScheduler(max_concurrency=1))
+    done = []
+
+    async def get(url, lane):
+        with priority(lane):
+            done.append(await request_sender.get(url))
+
+    background = [asyncio.ensure_future(get(f'background {i}', BACKGROUND)) for i in range(3)]
+    await asyncio.sleep(0)
+
+    # Act
+    await get('interactive', INTERACTIVE)
+
+    # Assert
+    assert done == ['background 0', 'interactive']
+
+    await asyncio.gather(*background)
+
+@pytest.mark.asyncio
+async def test_shared_requests_should_keep_priority_lane():
+    '''
+    With coalescing, requests made in the background lane still count as background for the scheduler.
+    '''
+
+    # Arrange
+    session = Mock()
+    session.post.side_effect = lambda *args, **kwargs: MockResponse('ok', 200, delay=0.02)
+    scheduler = PriorityScheduler(max_concurrency=10, background_share=0.2)
+    request_sender = RequestSender(session, coalesce=True, scheduler=scheduler)
+
+    async def post(i):
+        with priority(BACKGROUND):
+            return await request_sender.post(f'http://example.com/{i}', {})
+
+    tasks = [asyncio.ensure_future(post(i)) for i in range(6)]
+    await asyncio.sleep(0.01)
+
+    # Act
+    in_flight = scheduler.in_flight
+    waiting = scheduler.waiting
+    await asyncio.gather(*tasks)
+
+    # Assert
+    assert in_flight == { INTERACTIVE: 0, BACKGROUND: 2 }
+    assert waiting == { INTERACTIVE: 0, BACKGROUND: 4 }
+
+@pytest.mark.asyncio
+async def test_should_cap_request_timeout_with_deadline():
+    '''
+    Inside a deadline, the timeout of the request is the time left.
+    '''
+
+    # Arrange
+    session = Mock()
+    session.timeout = aiohttp.ClientTimeout(total=30, connect=0.5)
+    session.get.return_value = MockResponse('ok', 200)
+    request_sender = RequestSender(session)
+
+    # Act
+    with deadline(2):
+        await request_sender.get('http://example.com/api')
+
+    # Assert
+    timeout = session.get.call_args.kwargs['timeout']
+    assert 1 < timeout.total <= 2
+    assert timeout.connect == 0.5
+    assert 1 < timeout.sock_read <= 2
+
+@pytest.mark.asyncio
+async def test_should_not_retry_after_deadline():
+    '''
+    A retry which would start after the deadline is not attempted, the error is raised instead.
+    '''
+
+    # Arrange
+    session = Mock()
+    session.get.side_effect = [MockResponse('error', 503), MockResponse('ok', 200)]
+    request_sender = RequestSender(session, retry_policy=RetryPolicy(base_delay=5, jitter=False))
+
+    # Act
+    with pytest.raises(ServerError):
+        with deadline(1):
+            await request_sender.get('http://example.com/api')
+
+    # Assert
+    assert session.get.call_count == 1
+
+@pytest.mark.asyncio
+async def test_should_raise_deadline_exceeded_error():
+    '''
+    No request is sent once the deadline has passed, and timeouts caused by the deadline are reported as such.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+    session = Mock()
+    session.get.side_effect = asyncio.TimeoutError()
+    request_sender = RequestSender(session)
+
+    # Act
+    with pytest.raises(DeadlineExceededError) as before:
+        with deadline(0):
+            await request_sender.get(url)
+
+    with pytest.raises(DeadlineExceededError) as during:
+        with deadline(0.01):
+            await asyncio.sleep(0.02)
+            await request_sender._translate_errors(url, session.get)
+
+    # Assert
+    assert session.get.call_count == 1
+    assert str(before.value) == f'Deadline exceeded before sending request to {url}'
+    assert str(during.value) == f'Deadline exceeded while waiting for {url}'
+
+@pytest.mark.asyncio
+async def test_should_count_deadline_timeouts_as_failures():
+    '''
+    A request which times out because of the deadline still counts as a failure
+    for the circuit breaker and the rate limiter.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+    session = Mock()
+    session.get.side_effect = asyncio.TimeoutError()
+    breaker = CircuitBreaker(failure_threshold=2)
+    rate_limiter = AdaptiveRateLimiter(5, cooldown=0)
+    request_sender = RequestSender(session, rate_limiter=rate_limiter, circuit_breaker=breaker)
+
+    # Act
+    with pytest.raises(RequestTimeoutError):
+        await request_sender.get(url)
+    with pytest.raises(DeadlineExceededError):
+        with deadline(0.01):
+            await asyncio.sleep(0.02)
+            await request_sender._limited_attempt(url, url, session.get)
+
+    # Assert
+    assert breaker.get_state(url) == OPEN
+    assert rate_limiter.rate < 5
+
+@pytest.mark.asyncio
+async def test_client_errors_should_not_open_circuit():
+    '''
+    An endpoint which answers with a 4xx is up, its circuit stays closed.
+    '''
+
+    # Arrange
+    url = 'http://example.com/api'
+    session = Mock()
+    session.get.side_effect = lambda *args, **kwargs: MockResponse('Not found', 404)
+    breaker = CircuitBreaker(failure_threshold=1)
+    request_sender = RequestSender(session, circuit_breaker=breaker)
+
+    # Act
+    for _ in range(2):
+        with pytest.raises(RequestError):
+            await request_sender.get(url)
+
+    # Assert
+    assert breaker.get_state(url) == CLOSED
+
 class MockResponse:
-    def __init__(self, text, status):
+    def __init__(self, text, status, delay=0, chunks=None, headers=None):
         self._text = text
         self.status = status
+        self.headers = headers or {}
+        self.content_length = None
+        self.charset = None
+        self._delay = delay
+        self.content = MockStreamReader(chunks or [])
+        self.closed = False
+        self.cancelled = False
+
+    def close(self):
+        self.closed = True
 
-    async def text(self):
+    async def text(self, encoding=None):
+        self.encoding = encoding
+        if self._delay:
+            try:
+                await asyncio.sleep(self._delay)
+            except asyncio.CancelledError:
+                self.cancelled = True
+                raise
         return self._text
 
+    async def read(self):
+        return (await self.text()).encode('utf-8')
+
     async def __aexit__(self, exc_type, exc, tb):
         pass
 
     async def __aenter__(self):
         return self
+
+class MockStreamReader:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def iter_chunked(self, n):
+        for chunk in self._chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
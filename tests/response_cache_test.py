@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from urchintai_client.response_cache import ResponseCache, make_key
+
+
+def test_key_should_not_depend_on_order_of_form_data():
+    '''
+    Same form data in a different order must hit the same cache entry.
+    '''
+
+    # Arrange
+    url = 'http://example.com'
+    data_1 = { 'shisya': '40', 'danchi': '246' }
+    data_2 = { 'danchi': '246', 'shisya': '40' }
+
+    # Act, Assert
+    assert make_key('POST', url, data_1) == make_key('POST', url, data_2)
+    assert make_key('POST', url, data_1) != make_key('GET', url, data_1)
+
+def test_should_return_cached_value_before_expiry():
+    '''
+    A stored value is returned until its time to live has passed.
+    '''
+
+    # Arrange
+    clock = FakeClock()
+    cache = ResponseCache(ttl=60, clock=clock)
+    cache.set('key', 'value')
+
+    # Act
+    clock.now = 59
+    before_expiry = cache.get('key')
+    clock.now = 60
+    after_expiry = cache.get('key')
+
+    # Assert
+    assert before_expiry == 'value'
+    assert after_expiry is None
+    assert cache.stats == {
+        'size': 0, 'hits': 1, 'misses': 1, 'evictions': 0, 'expirations': 1
+    }
+
+def test_should_use_null_ttl_for_null_response():
+    '''
+    'null' responses expire after null_ttl instead of ttl.
+    '''
+
+    # Arrange
+    clock = FakeClock()
+    cache = ResponseCache(ttl=60, null_ttl=5, clock=clock)
+    cache.set('full', 'null')
+    cache.set('vacant', 'not null')
+
+    # Act
+    clock.now = 5
+
+    # Assert
+    assert cache.get('full') is None
+    assert cache.get('vacant') == 'not null'
+
+def test_should_use_null_ttl_for_null_bytes_response():
+    '''
+    b'null' responses of a binary RequestSender also expire after null_ttl.
+    '''
+
+    # Arrange
+    clock = FakeClock()
+    cache = ResponseCache(ttl=60, null_ttl=5, clock=clock)
+    cache.set('full', b'null')
+
+    # Act
+    clock.now = 5
+
+    # Assert
+    assert cache.get('full') is None
+
+def test_should_evict_least_recently_used_entry():
+    '''
+    When the cache is full, the entry that was used the longest time ago is removed.
+    '''
+
+    # Arrange
+    cache = ResponseCache(max_size=2, clock=FakeClock())
+    cache.set('a', '1')
+    cache.set('b', '2')
+    cache.get('a')
+
+    # Act
+    cache.set('c', '3')
+
+    # Assert
+    assert cache.get('b') is None
+    assert cache.get('a') == '1'
+    assert cache.get('c') == '3'
+    assert cache.evictions == 1
+
+def test_should_throw_error_if_max_size_is_invalid():
+    '''
+    Cache must be able to hold at least one entry.
+    '''
+
+    # Act
+    with pytest.raises(ValueError) as e:
+        ResponseCache(max_size=0)
+
+    # Assert
+    assert str(e.value) == 'max_size must be at least 1'
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+from urchintai_client.exceptions import (CircuitOpenError, RequestError,
+                                         RequestTimeoutError, ServerError,
+                                         ThrottledError)
+from urchintai_client.retry import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                    RetryPolicy)
+
+
+def test_should_only_retry_transient_errors():
+    '''
+    Timeouts, connection errors and retryable statuses are retried, other errors are not.
+    '''
+
+    # Arrange
+    policy = RetryPolicy()
+
+    # Act, Assert
+    assert policy.is_retryable(RequestTimeoutError('timeout'))
+    assert policy.is_retryable(RequestError('connection reset'))
+    assert policy.is_retryable(ThrottledError('throttled', status=429))
+    assert policy.is_retryable(ServerError('bad gateway', status=502))
+    assert not policy.is_retryable(ServerError('not implemented', status=501))
+    assert not policy.is_retryable(RequestError('not found', status=404))
+    assert not policy.is_retryable(CircuitOpenError('circuit open'))
+
+def test_should_back_off_exponentially_up_to_max_delay():
+    '''
+    Without jitter, delay doubles after each attempt and is capped by max_delay.
+    '''
+
+    # Arrange
+    policy = RetryPolicy(base_delay=1, max_delay=5, jitter=False)
+
+    # Act
+    delays = [policy.get_delay(attempt) for attempt in range(1, 6)]
+
+    # Assert
+    assert delays == [1, 2, 4, 5, 5]
+
+def test_should_pick_jittered_delay_below_backoff():
+    '''
+    With jitter, delay is picked at random between 0 and the backoff.
+    '''
+
+    # Arrange
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+
+    # Act
+    delays = [policy.get_delay(3) for _ in range(100)]
+
+    # Assert
+    assert all(0 <= delay <= 4 for delay in delays)
+    assert len(set(delays)) > 1
+
+def test_circuit_should_open_after_consecutive_failures():
+    '''
+    Requests fail fast once failure_threshold consecutive failures have been recorded.
+    '''
+
+    # Arrange
+    breaker = CircuitBreaker(failure_threshold=2, clock=FakeClock())
+    endpoint = 'http://example.com'
+
+    # Act
+    breaker.record_failure(endpoint)
+    breaker.record_success(endpoint)
+    breaker.record_failure(endpoint)
+    state_after_one_failure = breaker.get_state(endpoint)
+    breaker.record_failure(endpoint)
+
+    # Assert
+    assert state_after_one_failure == CLOSED
+    assert breaker.get_state(endpoint) == OPEN
+    assert breaker.get_state('http://other.example.com') == CLOSED
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call(endpoint)
+
+def test_circuit_should_let_probe_through_after_reset_timeout():
+    '''
+    After reset_timeout, one probe is allowed. Its result closes or reopens the circuit.
+    '''
+
+    # Arrange
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    endpoint = 'http://example.com'
+    breaker.record_failure(endpoint)
+
+    # Act
+    clock.now = 10
+    breaker.before_call(endpoint)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call(endpoint)
+    breaker.record_failure(endpoint)
+    state_after_failed_probe = breaker.get_state(endpoint)
+
+    clock.now = 20
+    state_before_second_probe = breaker.get_state(endpoint)
+    breaker.before_call(endpoint)
+    breaker.record_success(endpoint)
+
+    # Assert
+    assert state_after_failed_probe == OPEN
+    assert state_before_second_probe == HALF_OPEN
+    assert breaker.get_state(endpoint) == CLOSED
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+
+import pytest
+from urchintai_client.session_manager import SessionManager
+from urchintai_client.tracing import Tracer
+
+
+@pytest.fixture(autouse=True)
+def reset_session_manager():
+    yield
+    SessionManager._options = {}
+
+@pytest.mark.asyncio
+async def test_should_reuse_session_in_same_event_loop():
+    '''
+    All calls from the same event loop share one session.
+    '''
+
+    # Act
+    first = SessionManager.GetSession()
+    second = SessionManager.GetSession()
+
+    # Assert
+    assert first is second
+
+    await SessionManager.CloseSession()
+    assert first.closed
+
+def test_should_create_one_session_per_event_loop():
+    '''
+    A session is bound to its event loop and cannot be shared with other loops.
+    '''
+
+    # Arrange
+    async def get_and_close_session():
+        session = SessionManager.GetSession()
+        await SessionManager.CloseSession()
+        return session
+
+    # Act
+    first = asyncio.run(get_and_close_session())
+    second = asyncio.run(get_and_close_session())
+
+    # Assert
+    assert first is not second
+
+def test_should_forget_sessions_of_closed_event_loops():
+    '''
+    Sessions of event loops which are closed are not kept forever.
+    '''
+
+    # Arrange
+    async def get_session():
+        return SessionManager.GetSession()
+
+    # Act
+    sessions = [asyncio.run(get_session()) for _ in range(3)]
+
+    # Assert
+    assert len(SessionManager._sessions) == 1
+    assert sessions[-1] in SessionManager._sessions.values()
+
+    for session in sessions:
+        session.detach()
+    SessionManager._sessions.clear()
+
+@pytest.mark.asyncio
+async def test_should_create_session_using_configured_options():
+    '''
+    Connection pool and timeouts can be configured.
+    '''
+
+    # Arrange
+    SessionManager.Configure(limit=20, limit_per_host=5, total_timeout=30, connect_timeout=3)
+
+    # Act
+    session = SessionManager.GetSession()
+
+    # Assert
+    assert session.connector.limit == 20
+    assert session.connector.limit_per_host == 5
+    assert session.timeout.total == 30
+    assert session.timeout.connect == 3
+
+    await SessionManager.CloseSession()
+
+@pytest.mark.asyncio
+async def test_should_create_session_with_trace_configs():
+    '''
+    Trace configs are passed to the session.
+    '''
+
+    # Arrange
+    trace_config = Tracer().trace_config()
+    SessionManager.Configure(trace_configs=[trace_config])
+
+    # Act
+    session = SessionManager.GetSession()
+
+    # Assert
+    assert session.trace_configs == [trace_config]
+
+    await SessionManager.CloseSession()
+
+@pytest.mark.asyncio
+async def test_warm_up_should_ignore_connection_errors():
+    '''
+    Warm up is best effort and never fails.
+    '''
+
+    # Act
+    await SessionManager.WarmUp(hosts=['http://127.0.0.1:1/'], connections_per_host=2)
+
+    # Assert
+    await SessionManager.CloseSession()
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import threading
+from functools import partial
+
+import pytest
+from urchintai_client.models import PropertyCode, RoomCode
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.sharded_sweep import ShardedSweep, get_shard
+from urchintai_client.stub_server import StubServer
+from urchintai_client.ur_client import UrClient
+
+
+@pytest.fixture(scope='module')
+def server():
+    # Workers are other processes, the server runs on a loop of its own in a thread.
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    server = StubServer(null_ratio=0.5)
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    yield server
+
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def create_stub_client(property_rooms_api, session, rate_limiter):
+    return UrClient(RequestSender(session, rate_limiter=rate_limiter), property_rooms_api=property_rooms_api)
+
+def create_broken_client(session, rate_limiter):
+    raise ValueError('Cannot create client')
+
+def test_should_assign_targets_of_same_property_to_same_shard():
+    '''
+    Property URL, property code and room codes of one property share a shard.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460.html'
+    room_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000030201'
+    property_code = { 'store_code': '40', 'house_code': '246', 'type': '0' }
+
+    # Act
+    shards = {get_shard(target, 8) for target in
+              [url, room_url, property_code, PropertyCode('40', '246', '0'), RoomCode('40', '246', '0', '000010101')]}
+
+    # Assert
+    assert len(shards) == 1
+
+def test_should_only_move_targets_to_new_shard():
+    '''
+    When a shard is added, targets either stay where they were or move to the new shard.
+    '''
+
+    # Arrange
+    codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(1000)]
+
+    # Act
+    before = [get_shard(code, 4) for code in codes]
+    after = [get_shard(code, 5) for code in codes]
+
+    # Assert
+    moved = [new for old, new in zip(before, after) if old != new]
+    assert set(moved) == {4}
+    assert 100 < len(moved) < 300
+    assert set(before) == {0, 1, 2, 3}
+
+def test_should_merge_results_of_all_workers_in_order(server):
+    '''
+    Each target is checked once by one worker, and results can be yielded in the order of targets.
+    '''
+
+    # Arrange
+    codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(30)]
+    sweep = ShardedSweep(workers=3, rate=1000, create_client=partial(create_stub_client, server.property_rooms_api))
+    request_count = server.request_count
+
+    # Act
+    results = list(sweep.check_properties(codes, ordered=True))
+
+    # Assert
+    assert [r.target for r in results] == codes
+    assert all(r.error is None for r in results)
+    assert 0 < sum(r.vacant for r in results) < len(codes)
+    assert server.request_count - request_count == 30
+
+def test_should_report_errors_of_failed_workers():
+    '''
+    If a worker fails, all its targets are reported with the error.
+    '''
+
+    # Arrange
+    codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(5)]
+    sweep = ShardedSweep(workers=2, create_client=create_broken_client)
+
+    # Act
+    results = list(sweep.check_properties(codes))
+
+    # Assert
+    assert sorted(r.target for r in results) == codes
+    assert all(isinstance(r.error, ValueError) and r.vacant is None for r in results)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import aiohttp
+import pytest
+from urchintai_client.exceptions import ServerError
+from urchintai_client.models import PropertyCode
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.stub_server import StubServer
+from urchintai_client.ur_client import UrClient
+
+
+@pytest.mark.asyncio
+async def test_should_serve_vacancy_and_rooms_through_real_client():
+    '''
+    UrClient can check vacancy and list rooms against the stub server over HTTP.
+    '''
+
+    # Arrange
+    property_codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(20)]
+
+    async with StubServer(null_ratio=0.5, rooms_per_property=25, rows_per_page=10) as server, \
+            aiohttp.ClientSession() as session:
+        client = create_client(server, session)
+
+        # Act
+        results = [r async for r in client.check_properties(property_codes, max_concurrency=5)]
+        vacant_code = next(r.target for r in results if r.vacant)
+        rooms = [room async for room in client.iter_vacant_rooms(property_code=vacant_code)]
+        again = await client.is_property_vacant(property_code=vacant_code)
+
+    # Assert
+    assert all(r.error is None for r in results)
+    assert 0 < sum(r.vacant for r in results) < len(results)
+    assert len(rooms) == 25
+    assert again == True
+
+@pytest.mark.asyncio
+async def test_should_serve_property_page():
+    '''
+    Property name can be parsed from pages served by the stub server.
+    '''
+
+    # Arrange
+    async with StubServer(page_size=10_000) as server, aiohttp.ClientSession() as session:
+        client = create_client(server, session)
+        url = server.property_page_url(PropertyCode('40', '246', '0'))
+
+        # Act
+        name = await client.get_property_name(url)
+
+    # Assert
+    assert name == '団地 40_2460'
+
+@pytest.mark.asyncio
+async def test_should_simulate_errors():
+    '''
+    With error_rate 1, every request fails with HTTP 503.
+    '''
+
+    # Arrange
+    async with StubServer(error_rate=1) as server, aiohttp.ClientSession() as session:
+        client = create_client(server, session)
+
+        # Act
+        with pytest.raises(ServerError) as e:
+            await client.is_property_vacant(property_code=PropertyCode('40', '246', '0'))
+
+    # Assert
+    assert e.value.status == 503
+    assert server.request_count == 1
+
+@pytest.mark.asyncio
+async def test_should_check_vacancy_and_names_with_binary_sender():
+    '''
+    A binary RequestSender works end to end: vacancy, rooms and property names are read from bytes.
+    '''
+
+    # Arrange
+    property_codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(10)]
+
+    async with StubServer(null_ratio=0.5, page_size=10_000) as server, aiohttp.ClientSession() as session:
+        client = create_client(server, session, binary=True)
+
+        # Act
+        results = [r async for r in client.check_properties(property_codes)]
+        vacant_code = next(r.target for r in results if r.vacant)
+        rooms = [room async for room in client.iter_vacant_rooms(property_code=vacant_code)]
+        name = await client.get_property_name(server.property_page_url(vacant_code))
+
+    # Assert
+    assert 0 < sum(r.vacant for r in results) < len(results)
+    assert rooms[0].building == '1号棟'
+    assert name == f'団地 40_{vacant_code.house_code}0'
+
+def create_client(server, session, binary=False):
+    return UrClient(RequestSender(session, binary=binary),
+                    property_rooms_api=server.property_rooms_api,
+                    room_details_api=server.room_details_api)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+from urchintai_client.models import PropertyCode
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.stub_server import StubServer
+from urchintai_client.sync_client import SyncUrClient
+from urchintai_client.ur_client import UrClient
+
+
+@pytest.fixture
+def stub_client():
+    server = StubServer(null_ratio=0.5, rooms_per_property=15, rows_per_page=10, page_size=1000)
+    sessions = []
+
+    def create_client(session):
+        sessions.append(session)
+        return UrClient(RequestSender(session), property_rooms_api=server.property_rooms_api,
+                        room_details_api=server.room_details_api)
+
+    # The server is started on a loop of its own, in the client's background thread.
+    starter = SyncUrClient(create_client=lambda session: None)
+    starter.run(server.start())
+
+    client = SyncUrClient(create_client=create_client)
+    yield client, server, sessions
+
+    client.close()
+    starter.run(server.close())
+    starter.close()
+
+def test_should_check_vacancy_synchronously(stub_client):
+    '''
+    Single and batch calls block until done and return plain results.
+    '''
+
+    # Arrange
+    client, server, _ = stub_client
+    property_codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(10)]
+
+    # Act
+    results = client.check_properties(property_codes, max_concurrency=5)
+    vacant_code = next(r.target for r in results if r.vacant)
+    is_vacant = client.is_property_vacant(property_code=vacant_code)
+    rooms = client.get_vacant_rooms(property_code=vacant_code)
+    name = client.get_property_name(server.property_page_url(vacant_code))
+
+    # Assert
+    assert len(results) == 10
+    assert all(r.error is None for r in results)
+    assert is_vacant == True
+    assert len(rooms) == 15
+    assert name == f'団地 40_{vacant_code.house_code}0'
+
+def test_should_share_one_session_between_threads(stub_client):
+    '''
+    Calls from many threads run on the same loop and reuse the same session.
+    '''
+
+    # Arrange
+    client, server, sessions = stub_client
+    property_codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(40)]
+
+    # Act
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda code: client.is_property_vacant(property_code=code),
+                                    property_codes))
+
+    # Assert
+    assert len(results) == 40
+    assert server.request_count == 40
+    assert len(sessions) == 1
+    assert not sessions[0].closed
+
+def test_should_cancel_call_after_timeout():
+    '''
+    A call which takes longer than timeout is cancelled.
+    '''
+
+    # Arrange
+    cancelled = threading.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with SyncUrClient(timeout=0.01) as client:
+
+        # Act
+        with pytest.raises(concurrent.futures.TimeoutError):
+            client.run(slow())
+
+        # Assert
+        assert cancelled.wait(1)
+
+def test_should_close_session_and_refuse_calls_after_close():
+    '''
+    Closing the client closes its session, later calls raise RuntimeError.
+    '''
+
+    # Arrange
+    sessions = []
+    client = SyncUrClient(create_client=lambda session: sessions.append(session) or UrClient(RequestSender(session)))
+
+    # Act
+    client.close()
+    client.close()
+
+    # Assert
+    assert sessions[0].closed
+    with pytest.raises(RuntimeError):
+        client.is_property_vacant(property_code=PropertyCode('40', '246', '0'))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import aiohttp
+import pytest
+from urchintai_client.models import PropertyCode
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.stub_server import StubServer
+from urchintai_client.tracing import Tracer
+from urchintai_client.ur_client import UrClient
+
+
+@pytest.mark.asyncio
+async def test_should_record_phases_of_traced_requests():
+    '''
+    Each request sent by UrClient is recorded with the time spent in each phase.
+    '''
+
+    # Arrange
+    timings = []
+    tracer = Tracer(callback=timings.append, slow_threshold=None)
+
+    async with StubServer(page_size=10_000, null_ratio=0) as server, \
+            aiohttp.ClientSession(trace_configs=[tracer.trace_config()]) as session:
+        client = UrClient(RequestSender(session), tracer=tracer,
+                          property_rooms_api=server.property_rooms_api,
+                          room_details_api=server.room_details_api)
+        property_code = PropertyCode('40', '246', '0')
+
+        # Act
+        await client.is_property_vacant(property_code=property_code)
+        await client.get_property_name(server.property_page_url(property_code))
+
+    # Assert
+    vacancy, name = timings
+    assert vacancy.name == 'property_rooms'
+    assert vacancy.target == property_code
+    assert vacancy.url == server.property_rooms_api
+    assert vacancy.status == 200
+    assert vacancy.attempts == 1
+    assert vacancy.connect > 0
+    assert vacancy.ttfb > 0
+    assert vacancy.body > 0
+    assert vacancy.error is None
+
+    assert name.name == 'property_name'
+    assert name.connect == 0 # connection is reused
+    assert name.parse > 0
+    assert name.total >= name.ttfb + name.body + name.parse
+
+@pytest.mark.asyncio
+async def test_should_record_body_and_parse_of_streamed_pages():
+    '''
+    Property pages read chunk by chunk are recorded with the time spent reading and parsing them.
+    '''
+
+    # Arrange
+    timings = []
+    tracer = Tracer(callback=timings.append, slow_threshold=None)
+
+    async with StubServer(page_size=100_000, null_ratio=0) as server, \
+            aiohttp.ClientSession(trace_configs=[tracer.trace_config()]) as session:
+        client = UrClient(RequestSender(session), tracer=tracer, stream_property_pages=True)
+
+        # Act
+        await client.get_property_name(server.property_page_url(PropertyCode('40', '246', '0')))
+
+    # Assert
+    name, = timings
+    assert name.name == 'property_name'
+    assert name.body > 0
+    assert name.parse > 0
+    assert name.total >= name.ttfb + name.body + name.parse
+
+@pytest.mark.asyncio
+async def test_should_keep_slow_requests():
+    '''
+    Only operations slower than the threshold are kept, most recent first out.
+    '''
+
+    # Arrange
+    now = [0]
+    tracer = Tracer(slow_threshold=1, max_slow_requests=2, clock=lambda: now[0])
+
+    # Act
+    for i, duration in enumerate([2, 0.5, 3, 4]):
+        with tracer.span('op', i):
+            now[0] += duration
+
+    # Assert
+    assert [t.target for t in tracer.slow_requests] == [2, 3]
+    assert [t.total for t in tracer.slow_requests] == [3, 4]
+
+def test_should_record_errors_in_span():
+    '''
+    Operations which fail are recorded with the type of the error.
+    '''
+
+    # Arrange
+    timings = []
+    tracer = Tracer(callback=timings.append)
+
+    # Act
+    with pytest.raises(ValueError):
+        with tracer.span('op'):
+            raise ValueError()
+
+    # Assert
+    assert timings[0].error == 'ValueError'
+
+@pytest.mark.asyncio
+async def test_should_ignore_requests_outside_of_span():
+    '''
+    Requests sent without a span are not recorded.
+    '''
+
+    # Arrange
+    timings = []
+    tracer = Tracer(callback=timings.append)
+
+    async with StubServer() as server, \
+            aiohttp.ClientSession(trace_configs=[tracer.trace_config()]) as session:
+
+        # Act
+        await RequestSender(session).get(server.property_page_url(PropertyCode('40', '246', '0')))
+
+    # Assert
+    assert timings == []
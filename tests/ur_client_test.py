@@ -1,10 +1,21 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import Mock
 
 import pytest
 from pytest_mock import mocker
+from urchintai_client.change_tracker import ChangeTracker
+from urchintai_client.constants import (UR_API_PROPERTY_ROOMS,
+                                        UR_API_ROOM_DETAILS)
+from urchintai_client.exceptions import DeadlineExceededError
+from urchintai_client.metrics import Metrics
+from urchintai_client.models import PropertyCode, RoomCode
+from urchintai_client.name_store import PropertyNameStore
+from urchintai_client.priority import BACKGROUND, get_priority
+from urchintai_client.request_sender import ConditionalResponse
 from urchintai_client.ur_client import UrClient
 
 ignored_request_sender = None
@@ -86,6 +97,25 @@ async def test_should_return_false_if_property_full_using_url():
     # Assert
     assert isVacant == False
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize('resp, expected', [(b'null', False), (b'[{"id":"000020654"}]', True)])
+async def test_should_check_vacancy_from_bytes_response(resp, expected):
+    '''
+    Responses of a binary RequestSender are compared to b'null' without being decoded.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+
+    request_sender = setup_request_sender(resp)
+    client = UrClient(request_sender)
+
+    # Act
+    isVacant = await client.is_property_vacant(url=url)
+
+    # Assert
+    assert isVacant == expected
+
 @pytest.mark.asyncio
 async def test_should_return_false_if_property_full_using_code():
     '''
@@ -305,6 +335,466 @@ async def test_should_get_property_name_from_page(mocker):
     # Assert
     assert property_name == expected_property_name
 
+@pytest.mark.asyncio
+@pytest.mark.parametrize('page, parsed_inline', [('x' * 10, True), ('x' * 100, False)])
+async def test_should_parse_big_pages_in_executor(mocker, page, parsed_inline):
+    '''
+    Pages longer than inline_parse_limit are parsed in the executor, smaller ones on the event loop.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    threads = []
+
+    def parse(html_doc):
+        threads.append(threading.current_thread())
+        return 'Name'
+
+    request_sender = setup_request_sender(page, method='GET')
+    mocker.patch('urchintai_client.ur_parser.get_property_name_from_content', side_effect=parse)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        client = UrClient(request_sender, parser_executor=executor, inline_parse_limit=50)
+
+        # Act
+        property_name = await client.get_property_name(url)
+
+    # Assert
+    assert property_name == 'Name'
+    assert (threads == [threading.current_thread()]) == parsed_inline
+
+@pytest.mark.asyncio
+async def test_should_stream_property_page_to_find_name():
+    '''
+    If streaming is enabled, the property page is fed to the parser chunk by chunk.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    chunks = [b'<h1 class="article_headings"><span class="item_', b'title">Streamed Name</span>', b'<p>']
+
+    async def get_until(url, consume):
+        for chunk in chunks:
+            if consume(chunk):
+                return
+
+    request_sender = Mock()
+    request_sender.get_until.side_effect = get_until
+    client = UrClient(request_sender, stream_property_pages=True)
+
+    # Act
+    property_name = await client.get_property_name(url)
+
+    # Assert
+    assert property_name == 'Streamed Name'
+    request_sender.get.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_poll_property_should_tell_if_response_changed():
+    '''
+    With a change tracker, identical responses are reported as unchanged.
+    '''
+
+    # Arrange
+    property_code = {
+        'store_code': '40',
+        'house_code': '412',
+        'type': '0'
+    }
+    responses = ['null', 'null', '[{"id": "000020654"}]']
+
+    request_sender = Mock()
+    request_sender.post.side_effect = lambda url, data: asyncio.sleep(0, responses.pop(0))
+    client = UrClient(request_sender, change_tracker=ChangeTracker())
+
+    # Act
+    results = [await client.poll_property(property_code=property_code) for _ in range(3)]
+
+    # Assert
+    assert [(r.vacant, r.changed) for r in results] == [(False, True), (False, False), (True, True)]
+
+@pytest.mark.asyncio
+async def test_poll_room_should_always_report_change_without_tracker():
+    '''
+    Without a change tracker, there is no way to know if a response changed.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654'
+    request_sender = setup_request_sender('null')
+    client = UrClient(request_sender)
+
+    # Act
+    results = [await client.poll_room(url=url) for _ in range(2)]
+
+    # Assert
+    assert [(r.vacant, r.changed) for r in results] == [(False, True), (False, True)]
+
+@pytest.mark.asyncio
+async def test_should_use_conditional_get_for_property_page(mocker):
+    '''
+    Validators of the property page are sent back, and the page is not parsed again if not modified.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    responses = [
+        ConditionalResponse('html doc', '"v1"', None, False),
+        ConditionalResponse(None, '"v1"', None, True),
+    ]
+
+    request_sender = Mock()
+    request_sender.get_conditional.side_effect = lambda *args: asyncio.sleep(0, responses.pop(0))
+    mock_parser = mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='Parsed Name')
+    client = UrClient(request_sender, change_tracker=ChangeTracker())
+
+    # Act
+    first = await client.get_property_name(url)
+    second = await client.get_property_name(url)
+
+    # Assert
+    assert first == second == 'Parsed Name'
+    assert mock_parser.call_count == 1
+    assert request_sender.get_conditional.call_args_list[1].args == (url, '"v1"', None)
+
+@pytest.mark.asyncio
+async def test_should_load_page_if_not_modified_without_known_name(mocker):
+    '''
+    A not modified answer received without any known name falls back to loading the page.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    request_sender = Mock()
+    request_sender.get_conditional.side_effect = \
+        lambda *args: asyncio.sleep(0, ConditionalResponse(None, '"v1"', None, True))
+    request_sender.get.side_effect = lambda url: asyncio.sleep(0, 'html doc')
+    mock_parser = mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='Parsed Name')
+    client = UrClient(request_sender, change_tracker=ChangeTracker())
+
+    # Act
+    name = await client.get_property_name(url)
+
+    # Assert
+    assert name == 'Parsed Name'
+    mock_parser.assert_called_once_with('html doc')
+
+@pytest.mark.asyncio
+async def test_should_iterate_vacant_rooms_through_all_pages():
+    '''
+    All pages of the list of vacant rooms are loaded, in order.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    pages = {
+        '0': '[{"pageMax":"2","id":"000000001"},{"pageMax":"2","id":"000000002"}]',
+        '1': '[{"pageMax":"2","id":"000000003"}]',
+    }
+
+    request_sender = Mock()
+    request_sender.post.side_effect = lambda url, data: asyncio.sleep(0, pages[data['pageIndex']])
+    client = UrClient(request_sender)
+
+    # Act
+    rooms = [room async for room in client.iter_vacant_rooms(url=url)]
+
+    # Assert
+    assert [room.room_id for room in rooms] == ['000000001', '000000002', '000000003']
+    assert request_sender.post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_should_iterate_until_empty_page_without_page_count():
+    '''
+    If the response does not tell the number of pages, pages are loaded until one is empty.
+    '''
+
+    # Arrange
+    property_code = {
+        'store_code': '40',
+        'house_code': '412',
+        'type': '0'
+    }
+    pages = {
+        '0': '[{"id":"000000001"}]',
+        '1': '[{"id":"000000002"}]',
+        '2': 'null',
+    }
+
+    request_sender = Mock()
+    request_sender.post.side_effect = lambda url, data: asyncio.sleep(0, pages[data['pageIndex']])
+    client = UrClient(request_sender)
+
+    # Act
+    rooms = [room async for room in client.iter_vacant_rooms(property_code=property_code)]
+
+    # Assert
+    assert [room.room_id for room in rooms] == ['000000001', '000000002']
+
+@pytest.mark.asyncio
+async def test_should_not_iterate_rooms_of_full_property():
+    '''
+    A full property has no vacant room.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    request_sender = setup_request_sender('null')
+    client = UrClient(request_sender)
+
+    # Act
+    rooms = [room async for room in client.iter_vacant_rooms(url=url)]
+
+    # Assert
+    assert rooms == []
+    assert request_sender.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_should_check_rooms_using_property_listing():
+    '''
+    Rooms of the same property are resolved from one listing of vacant rooms,
+    rooms missing from a complete listing are full.
+    '''
+
+    # Arrange
+    vacant_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000000001'
+    missing_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000000009'
+    other_property_room_code = {
+        'store_code': '40',
+        'house_code': '412',
+        'type': '0',
+        'room_id': '000000002',
+    }
+    invalid_url = 'abcxyz'
+
+    async def post(url, data):
+        if url == UR_API_ROOM_DETAILS:
+            return 'null'
+        if data['danchi'] == '246':
+            return '[{"pageMax":"1","id":"000000001"},{"pageMax":"1","id":"000000003"}]'
+        return '[{"pageMax":"1","id":"000000002"}]'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+    targets = [vacant_url, missing_url, other_property_room_code, invalid_url]
+
+    # Act
+    results = [r async for r in client.check_rooms_by_property(targets)]
+
+    # Assert
+    by_target = { str(r.target): r for r in results }
+    assert by_target[vacant_url].vacant == True
+    assert by_target[missing_url].vacant == False
+    assert by_target[str(other_property_room_code)].vacant == True
+    assert isinstance(by_target[invalid_url].error, ValueError)
+    called_urls = [c.args[0] for c in request_sender.post.call_args_list]
+    assert called_urls.count(UR_API_PROPERTY_ROOMS) == 2
+    assert called_urls.count(UR_API_ROOM_DETAILS) == 0
+
+@pytest.mark.asyncio
+async def test_should_verify_rooms_missing_from_incomplete_listing_concurrently():
+    '''
+    If the listing may be incomplete, rooms missing from it are checked one by one,
+    concurrently but with at most max_concurrency requests in flight.
+    '''
+
+    # Arrange
+    urls = [f'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=00000000{i}'
+            for i in range(1, 7)]
+    in_flight = 0
+    max_in_flight = 0
+
+    async def post(url, data):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if url == UR_API_ROOM_DETAILS:
+            return 'not null' if data['id'] == '000000002' else 'null'
+        # No page count, and the same page whatever the page index.
+        return '[{"id":"000000001"}]'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+
+    # Act
+    results = { r.target: r.vacant async for r in client.check_rooms_by_property(urls, max_concurrency=3) }
+
+    # Assert
+    assert results == { url: i in (0, 1) for i, url in enumerate(urls) }
+    called_urls = [c.args[0] for c in request_sender.post.call_args_list]
+    assert called_urls.count(UR_API_ROOM_DETAILS) == 5
+    assert max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_should_trust_property_listing_if_not_verifying_missing_rooms():
+    '''
+    With verify_missing disabled, rooms missing from the listing are considered full.
+    '''
+
+    # Arrange
+    urls = [
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000000001',
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000000002',
+    ]
+    request_sender = setup_request_sender('[{"pageMax":"1","id":"000000001"}]')
+    client = UrClient(request_sender)
+
+    # Act
+    results = { r.target: r.vacant async for r in client.check_rooms_by_property(urls, verify_missing=False) }
+
+    # Assert
+    assert results == { urls[0]: True, urls[1]: False }
+    assert request_sender.post.call_count == 1
+
+@pytest.mark.asyncio
+async def test_should_report_listing_error_for_each_room_of_property():
+    '''
+    If the listing of a property cannot be loaded, all its rooms get the error.
+    '''
+
+    # Arrange
+    urls = [
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000000001',
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000000002',
+    ]
+    request_sender = Mock()
+    request_sender.post.side_effect = ConnectionError('Server error')
+    client = UrClient(request_sender)
+
+    # Act
+    results = [r async for r in client.check_rooms_by_property(urls)]
+
+    # Assert
+    assert len(results) == 2
+    assert all(isinstance(r.error, ConnectionError) for r in results)
+
+@pytest.mark.asyncio
+async def test_should_accept_typed_codes():
+    '''
+    PropertyCode and RoomCode can be used wherever a code dict is accepted.
+    '''
+
+    # Arrange
+    request_sender = setup_request_sender('not null')
+    client = UrClient(request_sender)
+
+    # Act
+    property_vacant = await client.is_property_vacant(property_code=PropertyCode('40', '412', '0'))
+    room_vacant = await client.is_room_vacant(room_code=RoomCode('40', '246', '0', '000020654'))
+
+    # Assert
+    assert property_vacant == room_vacant == True
+    assert request_sender.post.call_args.args[1]['id'] == '000020654'
+
+@pytest.mark.asyncio
+async def test_should_record_parse_time_and_name_store_hits(mocker):
+    '''
+    Parsing time and name store lookups are recorded in metrics.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    metrics = Metrics()
+
+    request_sender = setup_request_sender('not null', method='GET')
+    mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='Loaded Name')
+    client = UrClient(request_sender, name_store=PropertyNameStore(':memory:'), metrics=metrics)
+
+    # Act
+    await client.get_property_name(url)
+    await client.get_property_name(url)
+
+    # Assert
+    snapshot = metrics.snapshot()
+    assert snapshot['parse_seconds']['property_name']['count'] == 1
+    assert snapshot['counters'] == { 'name_store_misses': 1, 'name_store_hits': 1 }
+
+@pytest.mark.asyncio
+async def test_should_send_batch_checks_in_background_lane():
+    '''
+    Single checks use the default lane, batch checks are sent in the background lane.
+    '''
+
+    # Arrange
+    lanes = []
+
+    async def post(url, data):
+        lanes.append(get_priority())
+        return 'null'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+    property_code = PropertyCode('40', '246', '0')
+
+    # Act
+    await client.is_property_vacant(property_code=property_code)
+    _ = [r async for r in client.check_properties([property_code, property_code])]
+
+    # Assert
+    assert lanes == [None, BACKGROUND, BACKGROUND]
+
+@pytest.mark.asyncio
+async def test_should_cancel_call_when_timeout_runs_out():
+    '''
+    A call which does not finish within its timeout is cancelled and raises DeadlineExceededError.
+    '''
+
+    # Arrange
+    cancelled = []
+
+    async def post(url, data):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+
+    # Act
+    with pytest.raises(DeadlineExceededError):
+        await client.is_room_vacant(room_code=RoomCode('40', '246', '0', '000010101'), timeout=0.01)
+
+    # Assert
+    assert cancelled == [UR_API_ROOM_DETAILS]
+
+@pytest.mark.asyncio
+async def test_should_return_partial_results_when_batch_timeout_runs_out():
+    '''
+    When the batch timeout runs out, finished targets are reported, targets in flight
+    expire with DeadlineExceededError and the others are not checked.
+    '''
+
+    # Arrange
+    async def post(url, data):
+        if data['danchi'] != '000':
+            await asyncio.sleep(10)
+        return 'null'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+    codes = [PropertyCode('40', f'{i:03d}', '0') for i in range(10)]
+
+    # Act
+    results = [r async for r in client.check_properties(codes, max_concurrency=3, timeout=0.05)]
+
+    # Assert
+    assert results[0] == (codes[0], False, None)
+    assert sorted(r.target for r in results[1:]) == codes[1:4]
+    assert all(isinstance(r.error, DeadlineExceededError) for r in results[1:])
+    assert request_sender.post.call_count == 4
+
 def setup_request_sender(text, method='POST'):
     resp = asyncio.Future()
     resp.set_result(text)
@@ -315,4 +805,208 @@ def setup_request_sender(text, method='POST'):
     else:
         request_sender.get.return_value = resp
     
-    return request_sender
\ No newline at end of file
+    return request_sender
+
+@pytest.mark.asyncio
+async def test_check_properties_should_yield_result_for_each_target():
+    '''
+    Batch check accepts both URLs and property codes and yields one result per target.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    property_code = {
+        'store_code': '40',
+        'house_code': '246',
+        'type': '0'
+    }
+
+    request_sender = setup_request_sender('not null')
+    client = UrClient(request_sender)
+
+    # Act
+    results = [r async for r in client.check_properties(iter([url, property_code]))]
+
+    # Assert
+    assert len(results) == 2
+    assert all(r.vacant == True and r.error is None for r in results)
+    assert request_sender.post.call_count == 2
+
+@pytest.mark.asyncio
+async def test_check_properties_should_report_error_per_item():
+    '''
+    An invalid URL or a failed request must not abort the whole batch.
+    '''
+
+    # Arrange
+    good_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    bad_url = 'abcxyz'
+    failing_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460.html'
+
+    async def post(url, data):
+        if data['danchi'] == '246':
+            raise ConnectionError('Server error')
+        return 'null'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+
+    # Act
+    results = {r.target: r async for r in client.check_properties([good_url, bad_url, failing_url])}
+
+    # Assert
+    assert results[good_url].vacant == False
+    assert results[good_url].error is None
+    assert isinstance(results[bad_url].error, ValueError)
+    assert results[bad_url].vacant is None
+    assert isinstance(results[failing_url].error, ConnectionError)
+
+@pytest.mark.asyncio
+async def test_check_rooms_should_limit_requests_in_flight():
+    '''
+    No more than max_concurrency requests are sent at the same time.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654'
+    in_flight = 0
+    max_in_flight = 0
+
+    async def post(url, data):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return 'not null'
+
+    request_sender = Mock()
+    request_sender.post.side_effect = post
+    client = UrClient(request_sender)
+
+    # Act
+    results = [r async for r in client.check_rooms([url] * 10, max_concurrency=3)]
+
+    # Assert
+    assert len(results) == 10
+    assert all(r.vacant == True for r in results)
+    assert max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_should_get_property_name_from_name_store():
+    '''
+    If the property name is in the name store, the property page is not loaded.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    name_store = PropertyNameStore(':memory:')
+    name_store.set({ 'store_code': '40', 'house_code': '412', 'type': '0' }, 'Stored Name')
+
+    request_sender = setup_request_sender('not null', method='GET')
+    client = UrClient(request_sender, name_store=name_store)
+
+    # Act
+    property_name = await client.get_property_name(url)
+
+    # Assert
+    assert property_name == 'Stored Name'
+    request_sender.get.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_should_store_property_name_after_loading_page(mocker):
+    '''
+    The first lookup loads the page, the next ones are served from the name store.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    name_store = PropertyNameStore(':memory:')
+
+    request_sender = setup_request_sender('not null', method='GET')
+    mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='Loaded Name')
+    client = UrClient(request_sender, name_store=name_store)
+
+    # Act
+    first = await client.get_property_name(url)
+    second = await client.get_property_name(url)
+
+    # Assert
+    assert first == second == 'Loaded Name'
+    assert request_sender.get.call_count == 1
+
+@pytest.mark.asyncio
+async def test_should_commit_names_loaded_by_a_batch_together(mocker, tmp_path):
+    '''
+    Names loaded by get_property_names are committed once, at the end of the batch.
+    '''
+
+    # Arrange
+    path = str(tmp_path / 'names.db')
+    urls = [f'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_412{i}.html' for i in range(3)]
+    name_store = PropertyNameStore(path, commit_every=100, commit_interval=60)
+
+    request_sender = setup_request_sender('not null', method='GET')
+    mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='Loaded Name')
+    client = UrClient(request_sender, name_store=name_store)
+
+    # Act
+    results = [r async for r in client.get_property_names(urls)]
+
+    # Assert
+    assert [r.name for r in results] == ['Loaded Name'] * 3
+    assert len(PropertyNameStore(path)) == 3
+
+@pytest.mark.asyncio
+async def test_should_refresh_stale_property_name_in_background(mocker):
+    '''
+    A stale name is returned immediately and replaced in the background.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    name_store = PropertyNameStore(':memory:')
+    name_store.set({ 'store_code': '40', 'house_code': '412', 'type': '0' }, 'Old Name')
+
+    request_sender = setup_request_sender('not null', method='GET')
+    mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='New Name')
+    client = UrClient(request_sender, name_store=name_store, name_refresh_after=0)
+
+    # Act
+    property_name = await client.get_property_name(url)
+    await asyncio.sleep(0.01)
+
+    # Assert
+    assert property_name == 'Old Name'
+    assert name_store.get({ 'store_code': '40', 'house_code': '412', 'type': '0' })[0] == 'New Name'
+
+@pytest.mark.asyncio
+async def test_get_property_names_should_only_load_missing_names(mocker):
+    '''
+    Bulk lookup only loads pages of properties which are not in the name store.
+    '''
+
+    # Arrange
+    stored_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    missing_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460.html'
+    invalid_url = 'abcxyz'
+    name_store = PropertyNameStore(':memory:')
+    name_store.set({ 'store_code': '40', 'house_code': '412', 'type': '0' }, 'Stored Name')
+
+    request_sender = setup_request_sender('not null', method='GET')
+    mocker.patch('urchintai_client.ur_parser.get_property_name_from_content',\
+        return_value='Loaded Name')
+    client = UrClient(request_sender, name_store=name_store)
+
+    # Act
+    results = {r.target: r async for r in client.get_property_names([stored_url, missing_url, invalid_url])}
+
+    # Assert
+    assert results[stored_url].name == 'Stored Name'
+    assert results[missing_url].name == 'Loaded Name'
+    assert isinstance(results[invalid_url].error, ValueError)
+    request_sender.get.assert_called_once_with(missing_url)
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import json
+
 import pytest
-from urchintai_client.ur_parser import (get_property_code_from_url,
+from urchintai_client import ur_parser
+from urchintai_client.models import PropertyCode, RoomCode
+from urchintai_client.ur_parser import (PropertyNameParser,
+                                        get_property_code_from_url,
                                         get_property_name_from_content,
-                                        get_room_code_from_url)
+                                        get_room_code_from_url,
+                                        get_rooms_from_content, parse_url_file,
+                                        parse_urls)
 
 
 def test_should_parse_property_codes_from_url():
@@ -201,6 +208,218 @@ def test_should_throw_error_if_cannot_find_property_name_in_html_doc():
         # Assert
         assert str(e.value) == 'Cannot parse property name from html doc'
 
+def test_should_parse_property_name_from_chunks():
+    '''
+    Property name can be parsed from a HTML doc split into chunks of bytes,
+    even when a chunk ends in the middle of a multi-byte character.
+    '''
+
+    # Arrange
+    expected_property_name = '西久保町公園ハイツ'
+    html_doc = ('<html><body><h1 class="heading article_headings">' + \
+                    '<span class="item_title">\n' + expected_property_name + '\n</span>' + \
+                    '<span class="item_sub">(東京都武蔵野市)</span>' + \
+                '</h1><p>rest of the page</p></body></html>').encode('utf-8')
+
+    for chunk_size in [1, 2, 7, len(html_doc)]:
+        parser = PropertyNameParser()
+        chunks = [html_doc[i:i + chunk_size] for i in range(0, len(html_doc), chunk_size)]
+
+        # Act
+        for chunk in chunks:
+            if parser.feed_chunk(chunk):
+                break
+
+        # Assert
+        assert parser.get_property_name() == expected_property_name
+
+def test_should_stop_parsing_chunks_after_property_name():
+    '''
+    No more chunk is needed once the title span has been closed.
+    '''
+
+    # Arrange
+    parser = PropertyNameParser()
+
+    # Act
+    need_more = parser.feed_chunk('<h1 class="article_headings"><span class="item_title">Name')
+    done = parser.feed_chunk('</span>')
+
+    # Assert
+    assert need_more == False
+    assert done == True
+
+def test_should_throw_error_if_cannot_find_property_name_in_chunks():
+    '''
+    Same behavior as get_property_name_from_content if the name cannot be found.
+    '''
+
+    # Arrange
+    resp_contents = [
+        '',
+        '<body><h1>This is a header</h1></body>',
+        '<h1 class="article_headings"><span>Dummy</span><h1>',
+        '<h1 class="test"><span class="item_title">Dummy</span><h1>',
+        '<h1 class="article_headings"><span class="item_sub">Dummy</span></h1>' + \
+            '<h1 class="article_headings"><span class="item_title">Dummy</span></h1>'
+    ]
+
+    for resp_content in resp_contents:
+        parser = PropertyNameParser()
+        parser.feed_chunk(resp_content)
+
+        # Act
+        with pytest.raises(Exception) as e:
+            parser.get_property_name()
+
+        # Assert
+        assert str(e.value) == 'Cannot parse property name from html doc'
+
+def test_should_parse_rooms_from_api_response():
+    '''
+    Each row in the list of vacant rooms is converted to a Room.
+    '''
+
+    # Arrange
+    resp = '[{"pageIndex":"0","rowMax":"10","allCount":"25","id":"000020654",' + \
+           '"roomNmMain":"2号棟","roomNmSub":"101号室","rent":"84,100円","commonfee":"3,400円",' + \
+           '"type":"2DK","floorspace":"49&#13217;","floor":"1階",' + \
+           '"roomDetailLink":"/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654"},' + \
+           '{"id":"000020655","roomNmMain":"3号棟"}]'
+
+    # Act
+    rooms, page_count = get_rooms_from_content(resp)
+
+    # Assert
+    assert page_count == 3
+    assert len(rooms) == 2
+    assert rooms[0].room_id == '000020654'
+    assert rooms[0].building == '2号棟'
+    assert rooms[0].room_number == '101号室'
+    assert rooms[0].rent == '84,100円'
+    assert rooms[0].common_fee == '3,400円'
+    assert rooms[0].layout == '2DK'
+    assert rooms[0].floor == '1階'
+    assert rooms[0].url == '/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654'
+    assert rooms[1].room_id == '000020655'
+    assert rooms[1].rent is None
+
+def test_should_parse_no_room_from_null_response():
+    '''
+    UR Chintai API returns "null" if there is no vacant room.
+    '''
+
+    # Act
+    rooms, page_count = get_rooms_from_content('null')
+
+    # Assert
+    assert rooms == ()
+    assert page_count is None
+
+@pytest.mark.parametrize('json_loads', [json.loads, ur_parser._json_loads])
+def test_should_parse_rooms_from_bytes(monkeypatch, json_loads):
+    '''
+    Responses can be parsed from UTF-8 bytes or memoryview, with or without orjson.
+    '''
+
+    # Arrange
+    monkeypatch.setattr(ur_parser, '_json_loads', json_loads)
+    resp = '[{"pageMax":"1","id":"000020654","roomNmMain":"2号棟"}]'.encode('utf-8')
+
+    for content in [resp, memoryview(resp)]:
+
+        # Act
+        rooms, page_count = get_rooms_from_content(content)
+
+        # Assert
+        assert page_count == 1
+        assert rooms[0].building == '2号棟'
+
+    assert get_rooms_from_content(b'null') == ((), None)
+    assert get_rooms_from_content(memoryview(b'null')) == ((), None)
+
+def test_should_parse_property_name_from_bytes():
+    '''
+    Property pages can be parsed from UTF-8 bytes or memoryview.
+    '''
+
+    # Arrange
+    html_doc = '<h1 class="article_headings"><span class="item_title"> 西久保町公園ハイツ </span></h1>'.encode('utf-8')
+
+    # Act, Assert
+    assert get_property_name_from_content(html_doc) == '西久保町公園ハイツ'
+    assert get_property_name_from_content(memoryview(html_doc)) == '西久保町公園ハイツ'
+
+def test_codes_should_be_hashable_and_readable_like_dict():
+    '''
+    Parsed codes can be used as dict keys and read like the dicts of earlier versions.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654'
+
+    # Act
+    room_code = get_room_code_from_url(url)
+
+    # Assert
+    assert room_code == RoomCode('40', '246', '0', '000020654')
+    assert room_code['room_id'] == room_code.room_id == '000020654'
+    assert dict(room_code) == CreateRoomCode('40', '246', '0', '000020654')
+    assert room_code == CreateRoomCode('40', '246', '0', '000020654')
+    assert room_code != CreateRoomCode('40', '246', '0', '000000001')
+    assert 'store_code' in room_code
+    assert 'count' not in room_code
+    assert room_code.property_code == PropertyCode('40', '246', '0')
+    assert { room_code: True }[RoomCode('40', '246', '0', '000020654')]
+    with pytest.raises(KeyError):
+        room_code['count']
+    with pytest.raises(AttributeError):
+        room_code.room_id = '000000001'
+
+def test_should_parse_and_classify_many_urls():
+    '''
+    Property URLs, room URLs and invalid URLs are told apart in one pass.
+    '''
+
+    # Arrange
+    urls = [
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html\n',
+        '\n',
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120_room.html?JKSS=000020654',
+        'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html',
+        'abcxyz',
+    ]
+
+    # Act
+    results = list(parse_urls(urls))
+
+    # Assert
+    assert results == [
+        (urls[0].strip(), PropertyCode('40', '412', '0')),
+        (urls[2], RoomCode('40', '412', '0', '000020654')),
+        (urls[3], PropertyCode('40', '412', '0')),
+        ('abcxyz', None),
+    ]
+    assert results[0][1] is results[2][1]
+    assert results[1][1].house_code is results[0][1].house_code
+
+def test_should_parse_urls_from_file(tmp_path):
+    '''
+    URLs can be read from a file, one per line.
+    '''
+
+    # Arrange
+    path = tmp_path / 'urls.txt'
+    path.write_text('https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html\n' + \
+                    'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460_room.html?JKSS=000020654\n',
+                    encoding='utf-8')
+
+    # Act
+    codes = [code for _, code in parse_url_file(str(path))]
+
+    # Assert
+    assert codes == [PropertyCode('40', '412', '0'), RoomCode('40', '246', '0', '000020654')]
+
 def CreatePropertyCode(store_code, house_code, type):
     return {
         'store_code': store_code,
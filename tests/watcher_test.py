@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from urchintai_client.models import PollResult, PropertyCode, VacancyEvent
+from urchintai_client.watcher import VacancyWatcher
+
+
+@pytest.mark.asyncio
+async def test_should_only_emit_state_transitions():
+    '''
+    Events are emitted when a property goes from full to vacant and back, not on every check.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    client = setup_client(property_states=[False, False, True, True, False])
+
+    watcher = VacancyWatcher(client, jitter=0)
+    watcher.watch_property(url, interval=0.001)
+
+    # Act
+    events = await collect_events(watcher, 2)
+
+    # Assert
+    assert events == [
+        VacancyEvent(url, 'property', True, False),
+        VacancyEvent(url, 'property', False, True),
+    ]
+
+@pytest.mark.asyncio
+async def test_should_emit_initial_state_if_requested():
+    '''
+    With emit_initial, the first check of each target is also reported.
+    '''
+
+    # Arrange
+    room_code = {
+        'store_code': '40',
+        'house_code': '246',
+        'type': '0',
+        'room_id': '000020654',
+    }
+    client = setup_client(room_states=[True])
+
+    watcher = VacancyWatcher(client, jitter=0, emit_initial=True)
+    watcher.watch_room(room_code, interval=0.001)
+
+    # Act
+    events = await collect_events(watcher, 1)
+
+    # Assert
+    assert events == [VacancyEvent(room_code, 'room', True, None)]
+    client.poll_room.assert_called_with(room_code=room_code)
+
+@pytest.mark.asyncio
+async def test_should_poll_targets_at_their_own_interval():
+    '''
+    A target with a shorter interval is checked more often.
+    '''
+
+    # Arrange
+    fast_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    slow_url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_2460.html'
+    checked = []
+
+    async def poll_property(url=None, property_code=None):
+        checked.append(url)
+        return PollResult(False, True)
+
+    client = Mock()
+    client.poll_property.side_effect = poll_property
+
+    watcher = VacancyWatcher(client, jitter=0)
+    watcher.watch_property(fast_url, interval=0.01)
+    watcher.watch_property(slow_url, interval=1)
+
+    # Act
+    await run_watcher_for(watcher, 0.1)
+
+    # Assert
+    assert checked.count(fast_url) >= 5
+    assert checked.count(slow_url) == 1
+
+@pytest.mark.asyncio
+async def test_should_keep_watching_after_failed_check():
+    '''
+    A failed check neither stops the watcher nor changes the known state.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    client = setup_client(property_states=[False, ConnectionError('Server error'), True])
+
+    watcher = VacancyWatcher(client, jitter=0)
+    watcher.watch_property(url, interval=0.001)
+
+    # Act
+    events = await collect_events(watcher, 1)
+
+    # Assert
+    assert events == [VacancyEvent(url, 'property', True, False)]
+
+@pytest.mark.asyncio
+async def test_should_stop_checking_unwatched_target():
+    '''
+    Once unwatched, a target is not checked anymore.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    client = setup_client(property_states=[False] * 100)
+
+    watcher = VacancyWatcher(client, jitter=0)
+    watcher.watch_property(url, interval=0.001)
+    watcher.unwatch(url)
+
+    # Act
+    await run_watcher_for(watcher, 0.05)
+
+    # Assert
+    client.poll_property.assert_not_called()
+    assert len(watcher) == 0
+
+def test_should_subscribe_code_dict_and_typed_code_once():
+    '''
+    A code dict and the equivalent PropertyCode are the same subscription.
+    '''
+
+    # Arrange
+    watcher = VacancyWatcher(Mock(), jitter=0)
+
+    # Act
+    watcher.watch_property({ 'store_code': '40', 'house_code': '412', 'type': '0' }, interval=1)
+    watcher.watch_property(PropertyCode('40', '412', '0'), interval=1)
+
+    # Assert
+    assert len(watcher) == 1
+
+@pytest.mark.asyncio
+async def test_should_keep_every_target_scheduled_after_restart():
+    '''
+    Checks which were waiting for a free worker when the watcher stopped are done after it restarts.
+    '''
+
+    # Arrange
+    urls = [f'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_412{i}.html' for i in range(4)]
+
+    async def poll_property(url):
+        await asyncio.sleep(0.02)
+        return PollResult(False, True)
+
+    client = Mock()
+    client.poll_property.side_effect = poll_property
+    watcher = VacancyWatcher(client, jitter=0, max_concurrency=1)
+    for url in urls:
+        watcher.watch_property(url, interval=10)
+
+    # Act
+    await run_watcher_for(watcher, 0.01)
+    await run_watcher_for(watcher, 0.2)
+
+    # Assert
+    polled = { c.kwargs['url'] for c in client.poll_property.call_args_list }
+    assert polled == set(urls)
+    assert len(watcher) == 4
+
+@pytest.mark.asyncio
+async def test_should_skip_unchanged_response():
+    '''
+    If the response did not change since the previous check, no event is emitted.
+    '''
+
+    # Arrange
+    url = 'https://www.ur-net.go.jp/chintai/kanto/kanagawa/40_4120.html'
+    results = [PollResult(False, True), PollResult(True, False), PollResult(True, True)]
+
+    async def poll_property(url=None, property_code=None):
+        return results.pop(0) if len(results) > 1 else results[0]
+
+    client = Mock()
+    client.poll_property.side_effect = poll_property
+
+    watcher = VacancyWatcher(client, jitter=0)
+    watcher.watch_property(url, interval=0.001)
+
+    # Act
+    events = await collect_events(watcher, 1)
+
+    # Assert
+    assert events == [VacancyEvent(url, 'property', True, False)]
+    assert len(results) == 1
+
+async def collect_events(watcher, count):
+    events = []
+
+    async def collect():
+        async for event in watcher.events():
+            events.append(event)
+            if len(events) == count:
+                await watcher.stop()
+
+    await asyncio.wait_for(collect(), timeout=1)
+    return events
+
+async def run_watcher_for(watcher, seconds):
+    async def consume():
+        async for _ in watcher.events():
+            pass
+
+    task = asyncio.ensure_future(consume())
+    await asyncio.sleep(seconds)
+    await watcher.stop()
+    await task
+
+def setup_client(property_states=(), room_states=()):
+    def side_effect(states):
+        states = list(states)
+
+        async def check(**kwargs):
+            # Last state is repeated once all states have been returned.
+            state = states.pop(0) if len(states) > 1 else states[0]
+            if isinstance(state, Exception):
+                raise state
+            return PollResult(state, True)
+
+        return check
+
+    client = Mock()
+    if property_states:
+        client.poll_property.side_effect = side_effect(property_states)
+    if room_states:
+        client.poll_room.side_effect = side_effect(room_states)
+
+    return client
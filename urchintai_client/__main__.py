@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+import sys
+
+from urchintai_client.cli import main
+
+sys.exit(main())
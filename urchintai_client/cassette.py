@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+
+'''
+Record responses received through a RequestSender into a cassette file,
+and replay them later without network.
+
+A cassette starts with a magic header, followed by one record per response:
+flags, status, latency, and the lengths of the request key and of the body,
+then the key and the body themselves. Bodies of conditional GET responses
+start with their ETag and Last-Modified. Records are only ever appended.
+'''
+
+import asyncio
+import mmap
+import os
+import struct
+import time
+from urllib.parse import urlencode
+
+from urchintai_client.exceptions import (CircuitOpenError,
+                                         DeadlineExceededError, RequestError,
+                                         RequestTimeoutError, error_for_status)
+from urchintai_client.request_sender import DEFAULT_CHUNK_SIZE, ConditionalResponse
+from urchintai_client.response_cache import make_key
+
+MAGIC = b'URCASSETTE1\n'
+
+# flags (1 byte), status (2 bytes), latency in seconds (4 bytes), key length and body length (4 bytes each).
+_RECORD_HEADER = struct.Struct('<BHfII')
+
+_TEXT = 1 # body was returned as str, it is stored encoded in UTF-8
+_TIMEOUT = 2 # request timed out, status is 0 and body is the error message
+_VALIDATORS = 4 # body starts with the ETag and Last-Modified of a conditional GET
+
+# Lengths of the ETag and Last-Modified which follow, in UTF-8 (2 bytes each). Empty means None.
+_VALIDATORS_HEADER = struct.Struct('<HH')
+
+_GET_CONDITIONAL = 'GET_CONDITIONAL'
+_GET_UNTIL = 'GET_UNTIL'
+
+
+def _encode_key(method, url, data=None):
+    _, _, fields = make_key(method, url, data)
+    return f'{method}\n{url}\n{urlencode(fields)}'.encode('utf-8')
+
+def _encode_validators(etag, last_modified):
+    etag = (etag or '').encode('utf-8')
+    last_modified = (last_modified or '').encode('utf-8')
+    return _VALIDATORS_HEADER.pack(len(etag), len(last_modified)) + etag + last_modified
+
+class RecordingSender:
+    '''
+    Send requests through request_sender and append every response,
+    and every error received from the server, to the cassette at path.
+
+    It can be used wherever a RequestSender is expected. Call close() when done,
+    or use it as a context manager.
+    '''
+
+    def __init__(self, request_sender, path):
+        self._request_sender = request_sender
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    async def post(self, url, data):
+        return await self._record(_encode_key('POST', url, data), self._request_sender.post(url, data))
+
+    async def get(self, url):
+        return await self._record(_encode_key('GET', url), self._request_sender.get(url))
+
+    async def get_conditional(self, url, etag=None, last_modified=None):
+        started = time.monotonic()
+        response = await self._record(_encode_key(_GET_CONDITIONAL, url),
+                                      self._request_sender.get_conditional(url, etag, last_modified),
+                                      write=False)
+        validators = _encode_validators(response.etag, response.last_modified)
+        if response.not_modified:
+            self._write(_encode_key(_GET_CONDITIONAL, url), _VALIDATORS, 304, time.monotonic() - started,
+                        validators)
+        else:
+            text = response.text
+            flags = _VALIDATORS
+            if isinstance(text, str):
+                text = text.encode('utf-8')
+                flags |= _TEXT
+            self._write(_encode_key(_GET_CONDITIONAL, url), flags, 200, time.monotonic() - started,
+                        validators + text)
+
+        return response
+
+    async def get_until(self, url, consume, chunk_size=DEFAULT_CHUNK_SIZE):
+        chunks = []
+
+        def record(chunk):
+            chunks.append(bytes(chunk))
+            return consume(chunk)
+
+        # Only the part of the body which was read is recorded. RequestSender never retries
+        # once a chunk was consumed, so chunks all come from the same attempt.
+        started = time.monotonic()
+        await self._record(_encode_key(_GET_UNTIL, url), self._request_sender.get_until(url, record, chunk_size),
+                           write=False)
+        self._write(_encode_key(_GET_UNTIL, url), 0, 200, time.monotonic() - started, b''.join(chunks))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    async def _record(self, key, request, write=True):
+        started = time.monotonic()
+        try:
+            body = await request
+        except (CircuitOpenError, DeadlineExceededError):
+            # These are decided locally, nothing was received from the server.
+            raise
+        except RequestError as e:
+            latency = time.monotonic() - started
+            flags = _TIMEOUT if isinstance(e, RequestTimeoutError) else 0
+            self._write(key, flags, e.status or 0, latency, str(e).encode('utf-8'))
+            raise
+
+        if write:
+            self._write_body(key, 200, time.monotonic() - started, body)
+        return body
+
+    def _write_body(self, key, status, latency, body):
+        if isinstance(body, str):
+            self._write(key, _TEXT, status, latency, body.encode('utf-8'))
+        else:
+            self._write(key, 0, status, latency, body)
+
+    def _write(self, key, flags, status, latency, body):
+        self._file.write(_RECORD_HEADER.pack(flags, status, latency, len(key), len(body)) + key + body)
+        self._file.flush()
+
+class ReplaySender:
+    '''
+    Serve responses recorded in the cassette at path, without sending any request.
+
+    When the same request was recorded several times, its responses are served
+    in the order they were recorded, starting over after the last one.
+    Responses are served immediately, or after their recorded latency
+    multiplied by latency_scale. Requests which were never recorded raise LookupError.
+
+    It can be used wherever a RequestSender is expected. Call close() when done,
+    or use it as a context manager.
+    '''
+
+    def __init__(self, path, latency_scale=0):
+        self._latency_scale = latency_scale
+        self._file = open(path, 'rb')
+        self._mmap = None
+        self._index = {}
+        self._cursors = {}
+
+        if os.fstat(self._file.fileno()).st_size == 0 or self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f'{path} is not a cassette')
+
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._build_index()
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._index.values())
+
+    async def post(self, url, data):
+        return await self._replay(url, _encode_key('POST', url, data))
+
+    async def get(self, url):
+        return await self._replay(url, _encode_key('GET', url))
+
+    async def get_conditional(self, url, etag=None, last_modified=None):
+        flags, status, latency, start, end = await self._next_entry(url, _encode_key(_GET_CONDITIONAL, url))
+        recorded_etag = recorded_last_modified = None
+        if flags & _VALIDATORS:
+            etag_length, last_modified_length = _VALIDATORS_HEADER.unpack_from(self._mmap, start)
+            start += _VALIDATORS_HEADER.size
+            recorded_etag = self._mmap[start:start + etag_length].decode('utf-8') or None
+            start += etag_length
+            recorded_last_modified = self._mmap[start:start + last_modified_length].decode('utf-8') or None
+            start += last_modified_length
+
+        if status == 304:
+            return ConditionalResponse(None, etag or recorded_etag, last_modified or recorded_last_modified, True)
+
+        return ConditionalResponse(self._read_body(url, flags, status, start, end), recorded_etag,
+                                   recorded_last_modified, False)
+
+    async def get_until(self, url, consume, chunk_size=DEFAULT_CHUNK_SIZE):
+        flags, status, _, start, end = await self._next_entry(url, _encode_key(_GET_UNTIL, url))
+        if status != 200:
+            self._read_body(url, flags, status, start, end)
+
+        for offset in range(start, end, chunk_size):
+            if consume(self._mmap[offset:min(offset + chunk_size, end)]):
+                return
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _build_index(self):
+        offset = len(MAGIC)
+        size = len(self._mmap)
+        while offset + _RECORD_HEADER.size <= size:
+            flags, status, latency, key_length, body_length = _RECORD_HEADER.unpack_from(self._mmap, offset)
+            key_start = offset + _RECORD_HEADER.size
+            body_start = key_start + key_length
+            body_end = body_start + body_length
+            if body_end > size:
+                # The last record was not fully written, for example the recorder was killed.
+                break
+
+            key = self._mmap[key_start:body_start]
+            self._index.setdefault(key, []).append((flags, status, latency, body_start, body_end))
+            offset = body_end
+
+    async def _replay(self, url, key):
+        flags, status, latency, start, end = await self._next_entry(url, key)
+        return self._read_body(url, flags, status, start, end)
+
+    async def _next_entry(self, url, key):
+        entries = self._index.get(key)
+        if entries is None:
+            raise LookupError(f'No recorded response for {key.decode("utf-8")}')
+
+        cursor = self._cursors.get(key, 0)
+        self._cursors[key] = (cursor + 1) % len(entries)
+        entry = entries[cursor]
+
+        if self._latency_scale > 0:
+            await asyncio.sleep(entry[2] * self._latency_scale)
+
+        return entry
+
+    def _read_body(self, url, flags, status, start, end):
+        body = self._mmap[start:end]
+        if status == 200:
+            return body.decode('utf-8') if flags & _TEXT else body
+
+        message = body.decode('utf-8')
+        if flags & _TIMEOUT:
+            raise RequestTimeoutError(message, url)
+        if status == 0:
+            raise RequestError(message, url)
+
+        raise error_for_status(message, url, status)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+'''
+Remember what was last received for each target, to skip work when nothing changed.
+'''
+
+import hashlib
+from collections import namedtuple
+
+# Validators sent back by the server with a page, and the value parsed from that page.
+PageValidators = namedtuple('PageValidators', ['etag', 'last_modified', 'value'])
+
+
+class ChangeTracker:
+    '''
+    Keep a compact digest of the last response body of each target,
+    along with the value parsed from it.
+    '''
+
+    def __init__(self):
+        self._entries = {}
+        self._validators = {}
+
+    def update(self, key, body, parse):
+        '''
+        Return (changed, value).
+        If body is the same as last time, parse is not called and the previous value is returned.
+        '''
+
+        digest = _digest(body)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == digest:
+            return False, entry[1]
+
+        value = parse(body)
+        self._entries[key] = (digest, value)
+        return True, value
+
+    def get_validators(self, url):
+        return self._validators.get(url)
+
+    def set_validators(self, url, etag, last_modified, value):
+        self._validators[url] = PageValidators(etag, last_modified, value)
+
+    def forget(self, key):
+        '''
+        Forget the last body seen for key, so that its next body is parsed.
+        '''
+
+        self._entries.pop(key, None)
+
+    def forget_validators(self, url):
+        '''
+        Forget the validators of the page at url, so that it is requested unconditionally.
+        '''
+
+        self._validators.pop(url, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+def _digest(body):
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+
+    return hashlib.blake2b(body, digest_size=16).digest()
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+'''
+Command line tool to check vacancy of many properties and rooms.
+
+Each line of input is either a property or room URL, or a code:
+- AA_BBBC for a property
+- AA_BBBC_DDDDDDDDD for a room
+
+Input is read as it arrives, and results are written to stdout as JSON lines,
+one per input line, in the order they complete.
+
+Only the modules needed to check vacancy are imported, and only after
+arguments are parsed, so that the tool starts fast.
+'''
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+import threading
+
+_CODE = re.compile(r'^(\d{2})_(\d{3})(\d{1})(?:_(\d{9}))?$')
+
+
+def main(argv=None):
+    args = _build_argument_parser().parse_args(argv)
+    return asyncio.run(_main(args))
+
+def parse_targets(lines):
+    '''
+    Yield (text, kind, code) for each non empty line.
+    kind is 'property', 'room' or None if the line cannot be parsed.
+    '''
+
+    from urchintai_client.models import PropertyCode, RoomCode
+    from urchintai_client.ur_parser import parse_urls
+
+    for text, code in parse_urls(lines):
+        if code is None:
+            match = _CODE.match(text)
+            if match is not None:
+                store_code, house_code, type, room_id = match.groups()
+                code = PropertyCode(store_code, house_code, type) if room_id is None \
+                    else RoomCode(store_code, house_code, type, room_id)
+
+        if code is None:
+            yield text, None, None
+        elif isinstance(code, RoomCode):
+            yield text, 'room', code
+        else:
+            yield text, 'property', code
+
+async def run(client, lines, output, max_concurrency):
+    '''
+    Check every target in lines and write one JSON line per target to output,
+    as soon as it is checked. Return the number of targets which could not be checked.
+
+    lines can be an iterable or an async iterable. It is read lazily, one line
+    at a time, and at most max_concurrency targets are checked at the same time.
+    Every line gets its own output line, even if the same target appears twice.
+    '''
+
+    if max_concurrency < 1:
+        raise ValueError('max_concurrency must be at least 1')
+
+    slots = asyncio.Semaphore(max_concurrency)
+    tasks = set()
+    failed = 0
+
+    async def check(text, kind, code):
+        nonlocal failed
+        try:
+            if kind == 'property':
+                vacant, error = await client.is_property_vacant(property_code=code), None
+            else:
+                vacant, error = await client.is_room_vacant(room_code=code), None
+        except Exception as e:
+            vacant, error = None, str(e) or type(e).__name__
+        finally:
+            slots.release()
+
+        _write(output, text, kind, vacant, error)
+        failed += error is not None
+
+    try:
+        async for line in _iterate(lines):
+            for text, kind, code in parse_targets([line]):
+                if kind is None:
+                    _write(output, text, None, None, f'Cannot parse URL or code: {text}')
+                    failed += 1
+                    continue
+
+                await slots.acquire()
+                task = asyncio.ensure_future(check(text, kind, code))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        while tasks:
+            await asyncio.wait(tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return failed
+
+async def _main(args):
+    from urchintai_client.rate_limiter import TokenBucket
+    from urchintai_client.request_sender import RequestSender
+    from urchintai_client.retry import RetryPolicy
+    from urchintai_client.session_manager import SessionManager
+    from urchintai_client.ur_client import UrClient
+
+    SessionManager.Configure(limit=args.concurrency, total_timeout=args.timeout)
+    rate_limiter = TokenBucket(args.rate) if args.rate else None
+    retry_policy = RetryPolicy(max_attempts=args.retries + 1) if args.retries else None
+    sender = RequestSender(SessionManager.GetSession(), rate_limiter=rate_limiter,
+                           retry_policy=retry_policy, binary=True)
+    client = UrClient(sender)
+
+    try:
+        failed = await run(client, _read_lines(args.inputs), sys.stdout, args.concurrency)
+    finally:
+        await SessionManager.CloseSession()
+
+    return 1 if failed else 0
+
+async def _iterate(lines):
+    if hasattr(lines, '__aiter__'):
+        async for line in lines:
+            yield line
+    else:
+        for line in lines:
+            yield line
+
+async def _read_lines(inputs, buffer_size=1024):
+    '''
+    Yield the lines of inputs as they arrive. They are read in a thread,
+    so that checks keep running while waiting for input.
+    '''
+
+    loop = asyncio.get_running_loop()
+    lines = asyncio.Queue(buffer_size)
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(lines.put(item), loop).result()
+
+    def read():
+        try:
+            for path in inputs:
+                if path == '-':
+                    for line in sys.stdin:
+                        put(line)
+                    continue
+
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        put(line)
+        except Exception as e:
+            put(e)
+        else:
+            put(None)
+
+    threading.Thread(target=read, name='urchintai-input', daemon=True).start()
+    while True:
+        line = await lines.get()
+        if line is None:
+            return
+        if isinstance(line, Exception):
+            raise line
+        yield line
+
+def _positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1: {value}')
+    return number
+
+def _non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f'must be at least 0: {value}')
+    return number
+
+def _positive_float(value):
+    number = float(value)
+    # Also rejects nan, which compares false to everything.
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f'must be greater than 0: {value}')
+    return number
+
+def _write(output, target, kind, vacant, error):
+    record = { 'target': target, 'kind': kind, 'vacant': vacant, 'error': error }
+    output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    output.flush()
+
+def _build_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog='urchintai',
+        description='Check vacancy of UR Chintai properties and rooms. ' + \
+                    'Exit code is 1 if at least one target could not be checked.')
+    parser.add_argument('inputs', nargs='*', default=['-'],
+                        help='files containing one URL or code per line, "-" for stdin (default)')
+    parser.add_argument('-c', '--concurrency', type=_positive_int, default=10,
+                        help='maximum number of requests in flight (default: 10)')
+    parser.add_argument('-r', '--rate', type=_positive_float, default=None,
+                        help='maximum number of requests per second (default: no limit)')
+    parser.add_argument('-t', '--timeout', type=_positive_float, default=30,
+                        help='timeout of each request in seconds (default: 30)')
+    parser.add_argument('--retries', type=_non_negative_int, default=0,
+                        help='number of times a failed request is retried (default: 0)')
+
+    return parser
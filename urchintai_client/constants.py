@@ -3,3 +3,7 @@
 # UR Chintai Api
 UR_API_PROPERTY_ROOMS = 'https://chintai.sumai.ur-net.go.jp/chintai/api/bukken/detail/detail_bukken_room/'
 UR_API_ROOM_DETAILS = 'https://chintai.sumai.ur-net.go.jp/chintai/api/bukken/detail/detail_room/'
+
+# Hosts used by UR Chintai
+UR_API_HOST = 'https://chintai.sumai.ur-net.go.jp/'
+UR_PAGE_HOST = 'https://www.ur-net.go.jp/'
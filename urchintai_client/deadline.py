@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+'''
+Deadlines shared by all requests sent during a call.
+
+A deadline is set for a block of code with deadline(), and is seen by everything
+run inside it, including tasks started from it. RequestSender uses it to cap
+the timeout of each request and to stop retrying once it is reached.
+'''
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from urchintai_client.exceptions import DeadlineExceededError
+
+_current_deadline = ContextVar('urchintai_deadline', default=None)
+
+
+def get_deadline():
+    '''
+    Return the current deadline, in time.monotonic() seconds, or None if there is none.
+    '''
+
+    return _current_deadline.get()
+
+def get_remaining():
+    '''
+    Return the number of seconds left before the current deadline, or None if there is none.
+    '''
+
+    at = _current_deadline.get()
+    return None if at is None else at - time.monotonic()
+
+def copy_context_without_deadline():
+    '''
+    Return a copy of the current context in which there is no deadline,
+    to run work shared with other callers. Everything else, such as the priority lane, is kept.
+    '''
+
+    context = copy_context()
+    context.run(_current_deadline.set, None)
+    return context
+
+def resolve_deadline(timeout=None):
+    '''
+    Return the deadline of a call given timeout seconds from now.
+    An enclosing deadline which comes first wins.
+    '''
+
+    at = _current_deadline.get()
+    if timeout is None:
+        return at
+
+    own = time.monotonic() + timeout
+    return own if at is None else min(at, own)
+
+@contextmanager
+def deadline(timeout=None, at=None):
+    '''
+    Set a deadline, timeout seconds from now or at time at, for the code inside this block.
+    A deadline can only be shortened by a nested block, never extended.
+    '''
+
+    if at is None:
+        at = resolve_deadline(timeout)
+    elif _current_deadline.get() is not None:
+        at = min(at, _current_deadline.get())
+
+    token = _current_deadline.set(at)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+async def run_with_timeout(coroutine, timeout=None):
+    '''
+    Run coroutine with a deadline timeout seconds from now (or sooner if
+    an enclosing deadline says so). If it has not finished by then,
+    it is cancelled and DeadlineExceededError is raised.
+    '''
+
+    at = resolve_deadline(timeout)
+    if at is None:
+        return await coroutine
+
+    with deadline(at=at):
+        return await wait_until(coroutine, at)
+
+async def wait_until(awaitable, at):
+    '''
+    Wait for awaitable until time at. If it has not finished by then,
+    it is cancelled and DeadlineExceededError is raised.
+    '''
+
+    if at is None:
+        return await awaitable
+
+    try:
+        return await asyncio.wait_for(awaitable, max(0, at - time.monotonic()))
+    except asyncio.TimeoutError:
+        if time.monotonic() < at:
+            raise
+        raise DeadlineExceededError('Deadline exceeded') from None
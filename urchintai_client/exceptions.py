@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+'''
+Errors raised when a request to UR Chintai fails.
+
+All of them are ConnectionError, so code catching ConnectionError keeps working.
+'''
+
+
+class RequestError(ConnectionError):
+    '''
+    A request failed. status is the HTTP status code, or None if no response was received.
+    '''
+
+    def __init__(self, message, url=None, status=None):
+        super().__init__(message)
+        self.url = url
+        self.status = status
+
+class RequestTimeoutError(RequestError):
+    '''
+    No response was received in time.
+    '''
+
+class DeadlineExceededError(RequestTimeoutError):
+    '''
+    The time budget of the call ran out. Retrying within the same call is pointless.
+    '''
+
+class ThrottledError(RequestError):
+    '''
+    Remote server asked us to slow down (HTTP 429).
+    '''
+
+class ServerError(RequestError):
+    '''
+    Remote server failed to process the request (HTTP 5xx).
+    '''
+
+class CircuitOpenError(RequestError):
+    '''
+    Request was not sent because the remote endpoint is considered down.
+    '''
+
+def error_for_status(message, url, status):
+    '''
+    Return the error matching an HTTP status which is not a success.
+    '''
+
+    if status == 429:
+        return ThrottledError(message, url, status)
+    if status >= 500:
+        return ServerError(message, url, status)
+
+    return RequestError(message, url, status)
+
+def is_transient(error):
+    '''
+    Return True if error is likely to go away if the request is sent again later.
+    '''
+
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    if isinstance(error, (RequestTimeoutError, ThrottledError, ServerError)):
+        return True
+
+    return isinstance(error, RequestError) and error.status is None
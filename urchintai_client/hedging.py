@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+'''
+Hedging policy for RequestSender.
+'''
+
+from collections import deque
+
+
+class HedgePolicy:
+    '''
+    Decide when a second, identical request is sent while the first one is still waiting.
+
+    The hedge delay of an endpoint is the percentile (between 0 and 1) of its window
+    most recent latencies. Until min_samples latencies are known, initial_delay is used.
+    The delay is never shorter than min_delay.
+
+    Hedges are paid for with a budget shared by all endpoints: each request adds
+    max_ratio to it, and each hedge costs 1. So at most max_ratio of all requests
+    are hedged, with bursts of up to max_burst hedges.
+
+    Only use it for requests which are safe to send twice.
+    '''
+
+    def __init__(self, percentile=0.95, window=100, min_samples=20, initial_delay=1, min_delay=0.01,
+            max_ratio=0.1, max_burst=10):
+        if not 0 < percentile < 1:
+            raise ValueError('percentile must be between 0 and 1')
+        if not 0 <= max_ratio <= 1:
+            raise ValueError('max_ratio must be between 0 and 1')
+
+        self._percentile = percentile
+        self._window = window
+        self._min_samples = min(min_samples, window)
+        self._initial_delay = initial_delay
+        self._min_delay = min_delay
+        self._max_ratio = max_ratio
+        self._max_burst = max_burst
+        self._budget = 0
+        self._latencies = {}
+
+    def get_delay(self, endpoint):
+        '''
+        Return how long to wait for a response before sending a hedge, in seconds.
+        '''
+
+        latencies = self._latencies.get(endpoint)
+        if latencies is None or len(latencies) < self._min_samples:
+            return max(self._min_delay, self._initial_delay)
+
+        ordered = sorted(latencies)
+        return max(self._min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self._percentile))])
+
+    def record(self, endpoint, latency):
+        latencies = self._latencies.get(endpoint)
+        if latencies is None:
+            latencies = self._latencies[endpoint] = deque(maxlen=self._window)
+
+        latencies.append(latency)
+
+    def on_request(self):
+        self._budget = min(self._max_burst, self._budget + self._max_ratio)
+
+    def try_hedge(self):
+        '''
+        Return True and spend one hedge from the budget if there is one left.
+        '''
+
+        if self._budget < 1:
+            return False
+
+        self._budget -= 1
+        return True
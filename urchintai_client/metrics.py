@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+'''
+Counters, gauges and histograms collected by RequestSender and UrClient.
+'''
+
+import bisect
+from urllib.parse import urlsplit
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def default_endpoint_label(url):
+    '''
+    Query strings are removed, and all pages ending with .html share one label
+    so that each property page does not get its own series.
+    '''
+
+    parts = urlsplit(url)
+    path = parts.path
+    if path.endswith('.html'):
+        path = '/*.html'
+
+    return f'{parts.scheme}://{parts.netloc}{path}'
+
+class Histogram:
+    '''
+    Cumulative histogram with fixed buckets, in the way of Prometheus.
+    '''
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative.append((bound, total))
+
+        return { 'buckets': cumulative, 'sum': self.sum, 'count': self.count }
+
+class Metrics:
+    '''
+    Collect metrics of requests sent to each endpoint and of parsing.
+
+    Pass the same object to RequestSender and UrClient, then read it
+    with snapshot() or to_prometheus(). Without a Metrics object,
+    nothing is recorded.
+    '''
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, endpoint_label=default_endpoint_label):
+        self._buckets = buckets
+        self.endpoint_label = endpoint_label
+        self._requests = {}
+        self._errors = {}
+        self._bytes = {}
+        self._latencies = {}
+        self._in_flight = {}
+        self._parse_times = {}
+        self._counters = {}
+
+    def request_started(self, endpoint):
+        self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def request_finished(self, endpoint, latency):
+        self._in_flight[endpoint] -= 1
+        self._histogram(self._latencies, endpoint).observe(latency)
+
+    def record_response(self, endpoint, status, size):
+        key = (endpoint, status)
+        self._requests[key] = self._requests.get(key, 0) + 1
+        self._bytes[endpoint] = self._bytes.get(endpoint, 0) + size
+
+    def record_error(self, endpoint, error_type):
+        '''
+        Record a request which failed without receiving a response, a timeout for example.
+        '''
+
+        key = (endpoint, error_type)
+        self._errors[key] = self._errors.get(key, 0) + 1
+
+    def record_parse(self, kind, seconds):
+        self._histogram(self._parse_times, kind).observe(seconds)
+
+    def increment(self, name, value=1):
+        '''
+        Increment a plain counter: cache_hits, cache_misses, retries, coalesced...
+        '''
+
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        return {
+            'requests': [{ 'endpoint': e, 'status': s, 'count': c } for (e, s), c in self._requests.items()],
+            'errors': [{ 'endpoint': e, 'type': t, 'count': c } for (e, t), c in self._errors.items()],
+            'bytes': dict(self._bytes),
+            'in_flight': dict(self._in_flight),
+            'latency_seconds': { e: h.snapshot() for e, h in self._latencies.items() },
+            'parse_seconds': { k: h.snapshot() for k, h in self._parse_times.items() },
+            'counters': dict(self._counters),
+        }
+
+    def to_prometheus(self, prefix='urchintai'):
+        '''
+        Return all metrics in Prometheus text exposition format.
+        '''
+
+        lines = []
+
+        def add_type(name, type):
+            lines.append(f'# TYPE {prefix}_{name} {type}')
+
+        add_type('requests_total', 'counter')
+        for (endpoint, status), count in self._requests.items():
+            lines.append(f'{prefix}_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+
+        add_type('request_errors_total', 'counter')
+        for (endpoint, error_type), count in self._errors.items():
+            lines.append(f'{prefix}_request_errors_total{{endpoint="{_escape(endpoint)}",' + \
+                         f'type="{_escape(error_type)}"}} {count}')
+
+        add_type('response_bytes_total', 'counter')
+        for endpoint, size in self._bytes.items():
+            lines.append(f'{prefix}_response_bytes_total{{endpoint="{_escape(endpoint)}"}} {size}')
+
+        add_type('requests_in_flight', 'gauge')
+        for endpoint, count in self._in_flight.items():
+            lines.append(f'{prefix}_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {count}')
+
+        self._add_histograms(lines, f'{prefix}_request_duration_seconds', 'endpoint', self._latencies)
+        self._add_histograms(lines, f'{prefix}_parse_duration_seconds', 'kind', self._parse_times)
+
+        for name, value in self._counters.items():
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total {value}')
+
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self._buckets)
+
+        return histogram
+
+    @staticmethod
+    def _add_histograms(lines, name, label, histograms):
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in histograms.items():
+            snapshot = histogram.snapshot()
+            for bound, count in snapshot['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{{label}="{_escape(key)}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{{label}="{_escape(key)}"}} {snapshot["sum"]}')
+            lines.append(f'{name}_count{{{label}="{_escape(key)}"}} {snapshot["count"]}')
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
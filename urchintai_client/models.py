@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+'''
+Lightweight records returned by UrClient.
+'''
+
+from collections import namedtuple
+from collections.abc import Mapping
+
+# Outcome of one item in a batch vacancy check.
+# - target: the URL or code exactly as passed in by the caller
+# - vacant: True/False, or None if the check failed
+# - error: the exception raised while checking this item, or None
+VacancyResult = namedtuple('VacancyResult', ['target', 'vacant', 'error'])
+
+# Outcome of polling a property or a room.
+# - vacant: True/False
+# - changed: False if the response was exactly the same as at the previous poll
+PollResult = namedtuple('PollResult', ['vacant', 'changed'])
+
+# Outcome of one item in a batch property name lookup.
+# - target: the property URL exactly as passed in by the caller
+# - name: name of the property, or None if the lookup failed
+# - error: the exception raised while looking up this item, or None
+NameResult = namedtuple('NameResult', ['target', 'name', 'error'])
+
+# Change of vacancy detected by VacancyWatcher.
+# - target: the URL or code exactly as passed in when subscribing
+# - kind: 'property' or 'room'
+# - vacant: current vacancy
+# - previous: vacancy at the previous check, or None if this is the first check
+VacancyEvent = namedtuple('VacancyEvent', ['target', 'kind', 'vacant', 'previous'])
+
+# A vacant room, as listed by UR Chintai API.
+# All values are kept as displayed by UR Chintai (for example rent is '84,100円').
+Room = namedtuple('Room', ['room_id', 'building', 'room_number', 'rent', 'common_fee',
+                           'layout', 'floor_space', 'floor', 'url'])
+
+
+class _Code:
+    '''
+    Mixin letting a code be read like the dict returned by earlier versions,
+    for example property_code['store_code'] or 'room_id' in room_code.
+    A code is also equal to the dict with the same keys and values.
+
+    Iterating a code, or serializing it with json, gives its values like a tuple.
+    Use dict(code) to get the dict returned by earlier versions.
+    '''
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+
+        return super().__getitem__(key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return dict(self.items()) == dict(other.items())
+
+        return super().__eq__(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = tuple.__hash__
+
+    def keys(self):
+        return self._fields
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+class PropertyCode(_Code, namedtuple('PropertyCode', ['store_code', 'house_code', 'type'])):
+    '''
+    Immutable and hashable code of a property.
+    '''
+
+    __slots__ = ()
+
+class RoomCode(_Code, namedtuple('RoomCode', ['store_code', 'house_code', 'type', 'room_id'])):
+    '''
+    Immutable and hashable code of a room.
+    '''
+
+    __slots__ = ()
+
+    @property
+    def property_code(self):
+        return PropertyCode(self.store_code, self.house_code, self.type)
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+'''
+On-disk index of property names, so that property pages do not need to be loaded again.
+'''
+
+import sqlite3
+import time
+
+
+class PropertyNameStore:
+    '''
+    Keep property names in a sqlite database, keyed by
+    (store_code, house_code, type) of the property.
+
+    Use ':memory:' as path to keep names only for the lifetime of this object.
+
+    Writes are committed in batches, once commit_every names are waiting or
+    commit_interval seconds after the first one, so that storing many names
+    does not wait for the disk each time. Call flush() to commit waiting names
+    now, close() commits them as well.
+    '''
+
+    def __init__(self, path, commit_every=100, commit_interval=1):
+        self._commit_every = commit_every
+        self._commit_interval = commit_interval
+        self._pending = 0
+        self._pending_since = None
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS property_names ('
+            'store_code TEXT NOT NULL, '
+            'house_code TEXT NOT NULL, '
+            'type TEXT NOT NULL, '
+            'name TEXT NOT NULL, '
+            'updated_at REAL NOT NULL, '
+            'PRIMARY KEY (store_code, house_code, type))'
+        )
+        self._conn.commit()
+
+    def get(self, property_code):
+        '''
+        Return (name, updated_at) of a property, or None if it is not in the store.
+        '''
+
+        row = self._conn.execute(
+            'SELECT name, updated_at FROM property_names '
+            'WHERE store_code = ? AND house_code = ? AND type = ?',
+            self.make_key(property_code)
+        ).fetchone()
+
+        return row
+
+    def set(self, property_code, name):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO property_names '
+            '(store_code, house_code, type, name, updated_at) VALUES (?, ?, ?, ?, ?)',
+            self.make_key(property_code) + (name, time.time())
+        )
+
+        now = time.monotonic()
+        if self._pending_since is None:
+            self._pending_since = now
+        self._pending += 1
+        if self._pending >= self._commit_every or now - self._pending_since >= self._commit_interval:
+            self.flush()
+
+    def flush(self):
+        '''
+        Commit names stored since the last commit.
+        '''
+
+        if self._pending:
+            self._conn.commit()
+            self._pending = 0
+            self._pending_since = None
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM property_names').fetchone()[0]
+
+    @staticmethod
+    def make_key(property_code):
+        return (property_code['store_code'], property_code['house_code'], property_code['type'])
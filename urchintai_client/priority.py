@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+'''
+Priority lanes, so that interactive requests do not wait behind background sweeps.
+'''
+
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+_current_priority = ContextVar('urchintai_priority', default=None)
+
+
+@contextmanager
+def priority(lane):
+    '''
+    Send requests made inside this block, and in tasks started from it, in lane.
+    '''
+
+    if lane not in (INTERACTIVE, BACKGROUND):
+        raise ValueError(f'Unknown priority lane: {lane}')
+
+    token = _current_priority.set(lane)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+def get_priority():
+    '''
+    Return the lane chosen with priority(), or None if none was chosen.
+    '''
+
+    return _current_priority.get()
+
+class PriorityScheduler:
+    '''
+    Share max_concurrency request slots between an interactive and a background lane.
+
+    A free slot goes to waiting interactive requests first, so they jump ahead
+    of queued background requests. Background requests never use more than
+    background_share of the slots, the rest is kept for interactive requests.
+    To keep background requests moving, after starvation_limit interactive
+    requests in a row got a slot while a background request was waiting,
+    the next slot goes to the background request.
+    '''
+
+    def __init__(self, max_concurrency=10, background_share=0.8, starvation_limit=10):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+        if not 0 < background_share <= 1:
+            raise ValueError('background_share must be between 0 and 1')
+
+        self._max_concurrency = max_concurrency
+        self._background_limit = max(1, int(max_concurrency * background_share))
+        self._starvation_limit = starvation_limit
+        self._in_flight = {INTERACTIVE: 0, BACKGROUND: 0}
+        self._waiters = {INTERACTIVE: deque(), BACKGROUND: deque()}
+        self._streak = 0
+
+    @property
+    def in_flight(self):
+        return dict(self._in_flight)
+
+    @property
+    def waiting(self):
+        return {lane: len(waiters) for lane, waiters in self._waiters.items()}
+
+    async def acquire(self, lane):
+        '''
+        Wait for a free slot in lane. Call release once the request is done.
+        '''
+
+        if self._can_start(lane) and not self._waiters[lane] and \
+                (lane == INTERACTIVE or not self._waiters[INTERACTIVE]):
+            self._in_flight[lane] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[lane].append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was given just before the caller was cancelled.
+                self.release(lane)
+            else:
+                self._waiters[lane].remove(future)
+            raise
+
+    def release(self, lane):
+        self._in_flight[lane] -= 1
+        self._wake_up()
+
+    def _can_start(self, lane):
+        if sum(self._in_flight.values()) >= self._max_concurrency:
+            return False
+
+        return lane == INTERACTIVE or self._in_flight[BACKGROUND] < self._background_limit
+
+    def _wake_up(self):
+        while True:
+            interactive = bool(self._waiters[INTERACTIVE]) and self._can_start(INTERACTIVE)
+            background = bool(self._waiters[BACKGROUND]) and self._can_start(BACKGROUND)
+            if not interactive and not background:
+                return
+
+            if interactive and background and self._streak >= self._starvation_limit:
+                interactive = False
+
+            if interactive:
+                lane = INTERACTIVE
+                self._streak = self._streak + 1 if self._waiters[BACKGROUND] else 0
+            else:
+                lane = BACKGROUND
+                self._streak = 0
+
+            future = self._waiters[lane].popleft()
+            future.set_result(None)
+            self._in_flight[lane] += 1
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+'''
+Client side rate limiters for RequestSender.
+'''
+
+import asyncio
+import multiprocessing
+import time
+
+
+class TokenBucket:
+    '''
+    Allow at most rate requests per second on average,
+    with bursts of up to burst requests.
+    '''
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError('rate must be greater than 0')
+
+        self.rate = rate
+        self._burst = burst if burst is not None else max(1, rate)
+        self._clock = clock
+        self._tokens = self._burst
+        self._updated_at = clock()
+
+    async def acquire(self):
+        '''
+        Wait until a request is allowed to be sent.
+        '''
+
+        self._refill()
+
+        # Tokens can go negative: each waiter reserves its own slot in the future.
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return
+
+        try:
+            await asyncio.sleep(-self._tokens / self.rate)
+        except asyncio.CancelledError:
+            self._tokens += 1
+            raise
+
+    def record(self, success, latency):
+        '''
+        Called after each request, success is False if the request failed.
+        A fixed rate limiter ignores it.
+        '''
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+class AdaptiveRateLimiter(TokenBucket):
+    '''
+    Token bucket whose rate is adjusted using AIMD
+    (additive increase, multiplicative decrease).
+
+    Each successful request raises the rate by increase, up to max_rate.
+    A failed request, or one slower than slow_threshold seconds, multiplies
+    the rate by decrease_factor, down to min_rate. The rate is lowered
+    at most once per cooldown seconds so that a burst of failures
+    only counts once.
+    '''
+
+    def __init__(self, rate, min_rate=1, max_rate=100, increase=0.1, decrease_factor=0.5,
+            slow_threshold=None, cooldown=1, burst=None, clock=time.monotonic):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError('rate must be between min_rate and max_rate')
+        if not 0 < decrease_factor < 1:
+            raise ValueError('decrease_factor must be between 0 and 1')
+
+        super().__init__(rate, burst=burst, clock=clock)
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._increase = increase
+        self._decrease_factor = decrease_factor
+        self._slow_threshold = slow_threshold
+        self._cooldown = cooldown
+        self._decreased_at = None
+
+    def record(self, success, latency):
+        slow = self._slow_threshold is not None and latency > self._slow_threshold
+        if success and not slow:
+            self.rate = min(self._max_rate, self.rate + self._increase)
+            return
+
+        now = self._clock()
+        if self._decreased_at is not None and now - self._decreased_at < self._cooldown:
+            return
+
+        self._refill()
+        self.rate = max(self._min_rate, self.rate * self._decrease_factor)
+        self._decreased_at = now
+
+class SharedRateLimiter:
+    '''
+    Allow at most rate requests per second on average, with bursts of up to
+    burst requests, across all processes sharing this object.
+
+    It must be passed to the other processes when they are created,
+    for example as an argument of multiprocessing.Process.
+    clock must return the same time in all processes.
+    '''
+
+    def __init__(self, rate, burst=None, clock=time.monotonic, context=None):
+        if rate <= 0:
+            raise ValueError('rate must be greater than 0')
+
+        context = context or multiprocessing.get_context()
+        self.rate = rate
+        self._burst = burst if burst is not None else max(1, rate)
+        self._clock = clock
+        self._lock = context.Lock()
+        self._next_slot = context.RawValue('d', float('-inf'))
+
+    async def acquire(self):
+        '''
+        Wait until a request is allowed to be sent.
+        '''
+
+        now = self._clock()
+
+        # Each caller reserves the next free slot, up to burst slots can be in the past.
+        # The lock is only held to update one number, so it never blocks the event loop for long.
+        with self._lock:
+            slot = max(self._next_slot.value, now - (self._burst - 1) / self.rate)
+            self._next_slot.value = slot + 1 / self.rate
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def record(self, success, latency):
+        '''
+        Called after each request, a fixed rate limiter ignores it.
+        '''
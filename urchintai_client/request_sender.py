@@ -1,26 +1,395 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+import importlib.util
+import time
+from collections import namedtuple
+
+import aiohttp
+
+from urchintai_client.deadline import (copy_context_without_deadline, get_deadline,
+                                       get_remaining, wait_until)
+from urchintai_client.exceptions import (DeadlineExceededError, RequestError,
+                                         RequestTimeoutError, error_for_status,
+                                         is_transient)
+from urchintai_client.priority import INTERACTIVE, get_priority
+from urchintai_client.response_cache import make_key
+
+DEFAULT_CHUNK_SIZE = 8192
+
+# aiohttp can only decompress brotli if one of these packages is installed.
+if any(importlib.util.find_spec(name) is not None for name in ('brotli', 'brotlicffi')):
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+else:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+# Response of a conditional GET. If not_modified is True, text is None.
+ConditionalResponse = namedtuple('ConditionalResponse', ['text', 'etag', 'last_modified', 'not_modified'])
+
+
 class RequestSender:
     '''
     This class is used to make HTTP request to remote server.
+
+    If a ResponseCache is provided, successful responses are served from it
+    until they expire.
+
+    If coalesce is True, concurrent identical requests share a single
+    in-flight request instead of each sending their own.
+
+    If a rate limiter (see rate_limiter module) is provided, it is shared
+    by all requests sent through this object.
+
+    If a RetryPolicy is provided, transient failures are retried with backoff.
+    If a CircuitBreaker is provided, requests to an endpoint which keeps failing
+    fail fast with CircuitOpenError instead of being sent.
+
+    Failed requests raise RequestError or one of its subclasses (see exceptions module).
+
+    If a Metrics object is provided, requests, responses, latencies,
+    cache hits and retries are recorded in it.
+
+    If a HedgePolicy is provided, a second identical request is sent when
+    the first one is slower than usual, and the first response wins.
+
+    If a PriorityScheduler is provided, it limits the number of requests in flight
+    and gives free slots to interactive requests before background ones
+    (see priority module). Requests are interactive unless sent inside priority(BACKGROUND).
+
+    Inside a deadline (see deadline module), the timeout of each request is capped
+    by the time left, no retry is attempted if it would end after the deadline,
+    and DeadlineExceededError is raised once it is reached.
+
+    If binary is True, responses are returned as bytes, without being decoded,
+    and compressed responses are asked for. Otherwise they are decoded
+    using their charset, or UTF-8 if they have none.
     '''
 
-    def __init__(self, session):
+    def __init__(self, session, cache=None, coalesce=False, rate_limiter=None,
+            retry_policy=None, circuit_breaker=None, metrics=None, binary=False, hedge_policy=None,
+            scheduler=None):
         self._session = session
+        self._cache = cache
+        self._coalesce = coalesce
+        self._in_flight = {}
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._metrics = metrics
+        self._binary = binary
+        self._hedge_policy = hedge_policy
+        self._scheduler = scheduler
 
     async def post(self, url, data):
-        async with self._session.post(url, data=data) as response:
-            return await self._ensure_success(url, response)
+        return await self._send('POST', url, data)
 
     async def get(self, url):
-        async with self._session.get(url) as response:
+        return await self._send('GET', url)
+
+    async def get_conditional(self, url, etag=None, last_modified=None):
+        '''
+        Send a GET request with If-None-Match / If-Modified-Since headers
+        built from validators received with a previous response.
+
+        Responses read this way are never cached nor shared.
+        '''
+
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        if self._binary:
+            headers['Accept-Encoding'] = ACCEPT_ENCODING
+
+        return await self._with_retries(url, lambda: self._conditional_request(url, headers))
+
+    async def get_until(self, url, consume, chunk_size=DEFAULT_CHUNK_SIZE):
+        '''
+        Send a GET request and pass the response body to consume, chunk by chunk.
+        As soon as consume returns True, the connection is closed
+        and the rest of the body is not downloaded.
+
+        Responses read this way are never cached nor shared. Once part of the body
+        was passed to consume, a failed request is not retried, as consume would
+        then see the beginning of the body twice.
+        '''
+
+        delivered = False
+
+        def consume_chunk(chunk):
+            nonlocal delivered
+            delivered = True
+            return consume(chunk)
+
+        await self._with_retries(url, lambda: self._stream(url, consume_chunk, chunk_size),
+                                 can_retry=lambda: not delivered)
+
+    async def _conditional_request(self, url, headers):
+        async with self._session.get(url, headers=headers, **self._get_deadline_options()) as response:
+            if response.status == 304:
+                if self._metrics is not None:
+                    self._record_response(url, 304, 0)
+                return ConditionalResponse(None, headers.get('If-None-Match'),
+                                           headers.get('If-Modified-Since'), True)
+
+            response_text = await self._ensure_success(url, response)
+            return ConditionalResponse(response_text, response.headers.get('ETag'),
+                                       response.headers.get('Last-Modified'), False)
+
+    async def _stream(self, url, consume, chunk_size):
+        async with self._session.get(url, **self._get_deadline_options()) as response:
+            if response.status != 200:
+                await self._ensure_success(url, response)
+
+            if self._metrics is not None:
+                self._record_response(url, response.status, response.content_length or 0)
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                if consume(chunk):
+                    response.close()
+                    return
+
+    async def _send(self, method, url, data=None):
+        key = make_key(method, url, data)
+
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if self._metrics is not None:
+                self._metrics.increment('cache_misses' if cached is None else 'cache_hits')
+            if cached is not None:
+                return cached
+
+        if not self._coalesce:
+            return await self._fetch_and_store(key, method, url, data)
+
+        future = self._in_flight.get(key)
+        if future is None:
+            # The shared request is not bound by the deadline of the caller which happened
+            # to start it, each caller applies its own below. It keeps the caller's priority lane.
+            future = copy_context_without_deadline().run(asyncio.ensure_future,
+                                                          self._fetch_and_store(key, method, url, data))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda f: self._on_shared_request_done(key, f))
+        elif self._metrics is not None:
+            self._metrics.increment('coalesced')
+
+        # Shield the shared request so that a cancelled caller does not cancel it for the others.
+        # Each caller only waits for it until its own deadline.
+        try:
+            return await wait_until(asyncio.shield(future), get_deadline())
+        except DeadlineExceededError:
+            raise DeadlineExceededError(f'Deadline exceeded while waiting for {url}', url) from None
+
+    def _on_shared_request_done(self, key, future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+        # Mark the exception as retrieved in case every caller was cancelled.
+        if not future.cancelled():
+            future.exception()
+
+    async def _fetch_and_store(self, key, method, url, data=None):
+        response_text = await self._fetch(method, url, data)
+
+        if self._cache is not None:
+            self._cache.set(key, response_text)
+
+        return response_text
+
+    async def _fetch(self, method, url, data=None):
+        return await self._with_retries(url, lambda: self._request(method, url, data),
+                                        hedge=self._hedge_policy is not None)
+
+    async def _with_retries(self, url, send, hedge=False, can_retry=None):
+        attempt = 1
+        while True:
+            try:
+                if hedge:
+                    return await self._hedged_attempt(url, send)
+                return await self._attempt(url, send)
+            except RequestError as e:
+                if self._retry_policy is None or attempt >= self._retry_policy.max_attempts or \
+                        not self._retry_policy.is_retryable(e) or (can_retry is not None and not can_retry()):
+                    raise
+
+                delay = self._retry_policy.get_delay(attempt)
+                remaining = get_remaining()
+                if remaining is not None and delay >= remaining:
+                    raise
+
+            if self._metrics is not None:
+                self._metrics.increment('retries')
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt(self, url, send):
+        remaining = get_remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(f'Deadline exceeded before sending request to {url}', url)
+
+        endpoint = url.split('?', 1)[0]
+        if self._circuit_breaker is not None:
+            self._circuit_breaker.before_call(endpoint)
+        if self._scheduler is None:
+            return await self._limited_attempt(url, endpoint, send)
+
+        lane = get_priority() or INTERACTIVE
+        await self._scheduler.acquire(lane)
+        try:
+            return await self._limited_attempt(url, endpoint, send)
+        finally:
+            self._scheduler.release(lane)
+
+    async def _limited_attempt(self, url, endpoint, send):
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
+
+        if self._metrics is not None:
+            return await self._measured_attempt(url, endpoint, send)
+
+        started = time.monotonic()
+        try:
+            result = await self._translate_errors(url, send)
+        except RequestError as e:
+            self._on_attempt_done(endpoint, e, time.monotonic() - started)
+            raise
+
+        self._on_attempt_done(endpoint, None, time.monotonic() - started)
+        return result
+
+    async def _hedged_attempt(self, url, send):
+        endpoint = url.split('?', 1)[0]
+        policy = self._hedge_policy
+        policy.on_request()
+
+        started = time.monotonic()
+        first = asyncio.ensure_future(self._attempt(url, send))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=policy.get_delay(endpoint))
+            if not done and policy.try_hedge():
+                if self._metrics is not None:
+                    self._metrics.increment('hedges')
+                tasks.append(asyncio.ensure_future(self._attempt(url, send)))
+
+            # The first successful response wins. If one request fails, wait for the other one.
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        policy.record(endpoint, time.monotonic() - started)
+                        if self._metrics is not None and task is not first:
+                            self._metrics.increment('hedges_won')
+                        return task.result()
+
+            raise first.exception()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                    task.add_done_callback(_retrieve_exception)
+
+    async def _measured_attempt(self, url, endpoint, send):
+        label = self._metrics.endpoint_label(url)
+        self._metrics.request_started(label)
+
+        started = time.monotonic()
+        try:
+            result = await self._translate_errors(url, send)
+        except RequestError as e:
+            latency = time.monotonic() - started
+            if e.status is None:
+                self._metrics.record_error(label, type(e).__name__)
+            self._on_attempt_done(endpoint, e, latency)
+            raise
+        finally:
+            self._metrics.request_finished(label, time.monotonic() - started)
+
+        self._on_attempt_done(endpoint, None, time.monotonic() - started)
+        return result
+
+    async def _translate_errors(self, url, send):
+        try:
+            return await send()
+        except asyncio.TimeoutError as e:
+            remaining = get_remaining()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError(f'Deadline exceeded while waiting for {url}', url) from e
+            raise RequestTimeoutError(f'Request to {url} timed out', url) from e
+        except aiohttp.ClientError as e:
+            raise RequestError(f'An error occurred while sending request to {url}: {e}', url) from e
+
+    def _record_response(self, url, status, size):
+        self._metrics.record_response(self._metrics.endpoint_label(url), status, size)
+
+    def _on_attempt_done(self, endpoint, error, latency):
+        # Any error slows the rate limiter down, 4xx included.
+        if self._rate_limiter is not None:
+            self._rate_limiter.record(error is None, latency)
+
+        # An endpoint which answers with a 4xx is up, one which times out or fails is not.
+        if self._circuit_breaker is not None:
+            if error is None or not (isinstance(error, RequestTimeoutError) or is_transient(error)):
+                self._circuit_breaker.record_success(endpoint)
+            else:
+                self._circuit_breaker.record_failure(endpoint)
+
+    def _get_deadline_options(self):
+        remaining = get_remaining()
+        if remaining is None:
+            return {}
+
+        # aiohttp disables a timeout of 0, keep it positive.
+        remaining = max(remaining, 0.001)
+        timeout = getattr(self._session, 'timeout', None)
+        if not isinstance(timeout, aiohttp.ClientTimeout):
+            timeout = aiohttp.ClientTimeout()
+
+        def cap(value):
+            return remaining if value is None else min(value, remaining)
+
+        return {'timeout': aiohttp.ClientTimeout(total=cap(timeout.total), connect=cap(timeout.connect),
+                                                 sock_read=cap(timeout.sock_read),
+                                                 sock_connect=cap(timeout.sock_connect))}
+
+    async def _request(self, method, url, data=None):
+        options = self._get_deadline_options()
+        if self._binary:
+            options['headers'] = {'Accept-Encoding': ACCEPT_ENCODING}
+
+        if method == 'POST':
+            request = self._session.post(url, data=data, **options)
+        else:
+            request = self._session.get(url, **options)
+
+        async with request as response:
             return await self._ensure_success(url, response)
 
     async def _ensure_success(self, url, response):
         status = response.status
-        response_text = await response.text()
+        if self._binary:
+            body = await response.read()
+        else:
+            # Without charset, skip detection: UR Chintai always answers in UTF-8.
+            body = await response.text(encoding=response.charset or 'utf-8')
+
+        if self._metrics is not None:
+            size = response.content_length
+            if size is None:
+                size = len(body) if self._binary else len(body.encode('utf-8'))
+            self._record_response(url, status, size)
 
         if status == 200:
-            return response_text
-        else:
-            raise ConnectionError(f'An error occurred while sending request to {url}: {response_text}')
+            return body
+
+        if self._binary:
+            body = body.decode('utf-8', errors='replace')
+        raise error_for_status(f'An error occurred while sending request to {url}: {body}', url, status)
+
+def _retrieve_exception(task):
+    # A cancelled hedge may still fail before it stops, nobody waits for its error.
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+'''
+In-memory cache for responses returned by RequestSender.
+'''
+
+import time
+from collections import OrderedDict
+
+NULL_RESPONSE = 'null'
+NULL_RESPONSE_BYTES = b'null'
+
+
+def make_key(method, url, data=None):
+    '''
+    Build a hashable key from a request.
+    Form data is normalized so that the order of its fields does not matter.
+    '''
+
+    if not data:
+        return (method, url, ())
+
+    return (method, url, tuple(sorted((str(k), str(v)) for k, v in data.items())))
+
+class ResponseCache:
+    '''
+    LRU cache with a time to live for each entry.
+
+    UR Chintai API answers 'null' when nothing is found (no vacant room, room is full...).
+    Those answers can be kept for a different, usually shorter, time than real content.
+    '''
+
+    def __init__(self, max_size=1024, ttl=60, null_ttl=10, clock=time.monotonic):
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1')
+
+        self._max_size = max_size
+        self._ttl = ttl
+        self._null_ttl = null_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        '''
+        Return the cached response for key, or None if it is missing or expired.
+        '''
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        is_null = value == NULL_RESPONSE or value == NULL_RESPONSE_BYTES
+        ttl = self._null_ttl if is_null else self._ttl
+        if ttl <= 0:
+            return
+
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+'''
+Retry policy and circuit breaker for RequestSender.
+'''
+
+import random
+import time
+
+from urchintai_client.exceptions import CircuitOpenError, is_transient
+
+DEFAULT_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class RetryPolicy:
+    '''
+    Retry failed requests up to max_attempts times in total, using exponential backoff.
+
+    Timeouts, connection errors and responses with a status in retry_statuses
+    are retried. Other errors are permanent and raised immediately.
+    If jitter is True, each delay is picked at random between 0 and the backoff
+    so that clients failing at the same time do not retry at the same time.
+    '''
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=10, jitter=True,
+            retry_statuses=DEFAULT_RETRY_STATUSES):
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1')
+
+        self.max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._jitter = jitter
+        self._retry_statuses = frozenset(retry_statuses)
+
+    def is_retryable(self, error):
+        if getattr(error, 'status', None) is not None:
+            return error.status in self._retry_statuses
+
+        return is_transient(error)
+
+    def get_delay(self, attempt):
+        '''
+        Return how long to wait before the next attempt, attempt starts from 1.
+        '''
+
+        backoff = min(self._max_delay, self._base_delay * 2 ** (attempt - 1))
+        if self._jitter:
+            return random.uniform(0, backoff)
+
+        return backoff
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitBreaker:
+    '''
+    Track failures of each endpoint and stop sending requests to an endpoint
+    after failure_threshold consecutive failures.
+
+    After reset_timeout seconds, up to half_open_max_calls probe requests are let through.
+    If a probe succeeds the endpoint is considered up again, otherwise it stays open
+    for another reset_timeout seconds.
+    '''
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, half_open_max_calls=1,
+            clock=time.monotonic):
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be at least 1')
+
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._circuits = {}
+
+    def get_state(self, endpoint):
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            return CLOSED
+
+        if circuit.state == OPEN and self._clock() - circuit.opened_at >= self._reset_timeout:
+            circuit.state = HALF_OPEN
+            circuit.probes = 0
+
+        return circuit.state
+
+    def before_call(self, endpoint):
+        '''
+        Raise CircuitOpenError if a request to endpoint must not be sent now.
+        '''
+
+        state = self.get_state(endpoint)
+        if state == CLOSED:
+            return
+
+        circuit = self._circuits[endpoint]
+        if state == HALF_OPEN:
+            now = self._clock()
+
+            # Probes which never reported back (cancelled for example) must not block forever.
+            if circuit.probes >= self._half_open_max_calls and \
+                    now - circuit.probe_started_at >= self._reset_timeout:
+                circuit.probes = 0
+
+            if circuit.probes < self._half_open_max_calls:
+                circuit.probes += 1
+                circuit.probe_started_at = now
+                return
+
+        raise CircuitOpenError(f'Circuit is open for {endpoint}, request was not sent', endpoint)
+
+    def record_success(self, endpoint):
+        self._circuits.pop(endpoint, None)
+
+    def record_failure(self, endpoint):
+        circuit = self._circuits.get(endpoint)
+        if circuit is None:
+            circuit = self._circuits[endpoint] = _Circuit()
+
+        circuit.failures += 1
+        if circuit.state == HALF_OPEN or circuit.failures >= self._failure_threshold:
+            circuit.state = OPEN
+            circuit.opened_at = self._clock()
+
+class _Circuit:
+    __slots__ = ('state', 'failures', 'opened_at', 'probes', 'probe_started_at')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.probes = 0
+        self.probe_started_at = 0
@@ -1,20 +1,115 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+
 import aiohttp
 
+from urchintai_client.constants import UR_API_HOST, UR_PAGE_HOST
+
+
 class SessionManager:
-    _session = None
+    '''
+    Create and keep one aiohttp session per event loop.
+
+    Call Configure before GetSession to tune the connection pool and timeouts
+    of the sessions created afterward.
+    '''
+
+    _sessions = {}
+    _options = {}
+
+    @classmethod
+    def Configure(cls, limit=100, limit_per_host=0, keepalive_timeout=30, ttl_dns_cache=300,
+            total_timeout=None, connect_timeout=None, read_timeout=None, trace_configs=None):
+        '''
+        - limit: maximum number of connections in the pool, 0 for no limit
+        - limit_per_host: maximum number of connections to the same host, 0 for no limit
+        - keepalive_timeout: how long an idle connection is kept open, in seconds
+        - ttl_dns_cache: how long resolved addresses are cached, in seconds
+        - total_timeout, connect_timeout, read_timeout: timeouts of each request, in seconds
+        - trace_configs: list of aiohttp TraceConfig, see Tracer.trace_config in tracing module
+        '''
+
+        cls._options = {
+            'limit': limit,
+            'limit_per_host': limit_per_host,
+            'keepalive_timeout': keepalive_timeout,
+            'ttl_dns_cache': ttl_dns_cache,
+            'total_timeout': total_timeout,
+            'connect_timeout': connect_timeout,
+            'read_timeout': read_timeout,
+            'trace_configs': trace_configs,
+        }
 
     @classmethod
     def GetSession(cls):
-        if not cls._session:
-            cls._session = aiohttp.ClientSession()
+        loop = cls._get_loop()
+        cls._forget_closed_loops()
+
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            session = cls._create_session(loop)
+            cls._sessions[loop] = session
 
-        return cls._session
+        return session
 
     @classmethod
     async def CloseSession(cls):
-        if cls._session:
-            await cls._session.close()
+        session = cls._sessions.pop(cls._get_loop(), None)
+        if session:
+            await session.close()
+
+    @classmethod
+    async def WarmUp(cls, hosts=(UR_API_HOST, UR_PAGE_HOST), connections_per_host=2):
+        '''
+        Open keep-alive connections to UR Chintai hosts before they are needed.
+        This is best effort, errors are ignored.
+        '''
+
+        session = cls.GetSession()
+
+        async def open_connection(host):
+            try:
+                async with session.head(host) as response:
+                    await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                pass
+
+        await asyncio.gather(*[open_connection(host) for host in hosts
+                               for _ in range(connections_per_host)])
+
+    @classmethod
+    def _forget_closed_loops(cls):
+        # A session keeps its loop alive, so entries are dropped once their loop is closed.
+        # Sessions which were not closed before their loop cannot be closed anymore.
+        for loop in [loop for loop in cls._sessions if loop.is_closed()]:
+            del cls._sessions[loop]
+
+    @classmethod
+    def _get_loop(cls):
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.get_event_loop()
+
+    @classmethod
+    def _create_session(cls, loop):
+        options = cls._options
+        if not options:
+            return aiohttp.ClientSession(connector=aiohttp.TCPConnector(loop=loop))
+
+        connector = aiohttp.TCPConnector(
+            limit=options['limit'],
+            limit_per_host=options['limit_per_host'],
+            keepalive_timeout=options['keepalive_timeout'],
+            ttl_dns_cache=options['ttl_dns_cache'],
+            loop=loop,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=options['total_timeout'],
+            connect=options['connect_timeout'],
+            sock_read=options['read_timeout'],
+        )
 
-        cls._session = None
+        return aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=options['trace_configs'])
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+
+'''
+Check many targets using several worker processes, to use more than one CPU core.
+'''
+
+import asyncio
+import multiprocessing
+import os
+import pickle
+import queue
+import zlib
+from collections import deque
+
+from urchintai_client.models import NameResult, VacancyResult
+from urchintai_client.rate_limiter import SharedRateLimiter
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.session_manager import SessionManager
+from urchintai_client.ur_client import DEFAULT_MAX_CONCURRENCY, UrClient
+from urchintai_client.ur_parser import parse_urls
+
+_POLL_INTERVAL = 0.1
+
+
+def create_default_client(session, rate_limiter):
+    return UrClient(RequestSender(session, rate_limiter=rate_limiter))
+
+def get_shard(target, shards):
+    '''
+    Return the shard, between 0 and shards - 1, which target belongs to.
+
+    Targets of the same property always go to the same shard, and adding
+    or removing one shard only moves the targets of that shard
+    (rendezvous hashing).
+    '''
+
+    key = _get_shard_key(target).encode('utf-8')
+    return max(range(shards), key=lambda shard: zlib.crc32(key + b'#' + str(shard).encode('ascii')))
+
+def _get_shard_key(target):
+    if isinstance(target, str):
+        code = next(parse_urls([target]), (None, None))[1]
+        if code is None:
+            return target
+        target = code
+
+    try:
+        return f'{target["store_code"]}_{target["house_code"]}{target["type"]}'
+    except (KeyError, TypeError):
+        return repr(target)
+
+class ShardedSweep:
+    '''
+    Split targets between worker processes, each with its own event loop,
+    session and UrClient, and merge their results into one stream.
+
+    - workers: number of processes, the number of CPU cores by default
+    - max_concurrency: maximum number of requests in flight in each worker
+    - rate, burst: if set, requests per second allowed across all workers
+    - create_client: called in each worker with the session and the shared rate limiter
+      (or None), must return a UrClient. It must be picklable, a module level function for example.
+    - session_options: keyword arguments of SessionManager.Configure used in workers
+
+    Targets are assigned using get_shard, so that a given property
+    is always checked by the same worker and its caches stay useful.
+
+    Results are yielded in the order they complete, or in the order of targets
+    if ordered is True. A worker which dies reports an error for its remaining targets.
+    '''
+
+    def __init__(self, workers=None, max_concurrency=DEFAULT_MAX_CONCURRENCY, rate=None, burst=None,
+            create_client=create_default_client, session_options=None, start_method='spawn'):
+        self._workers = workers or os.cpu_count() or 1
+        self._max_concurrency = max_concurrency
+        self._rate = rate
+        self._burst = burst
+        self._create_client = create_client
+        self._session_options = session_options
+        self._context = multiprocessing.get_context(start_method)
+
+    def check_properties(self, codes_or_urls, ordered=False):
+        return self._sweep('check_properties', codes_or_urls, ordered, VacancyResult)
+
+    def check_rooms(self, codes_or_urls, ordered=False):
+        return self._sweep('check_rooms', codes_or_urls, ordered, VacancyResult)
+
+    def check_rooms_by_property(self, codes_or_urls, ordered=False):
+        return self._sweep('check_rooms_by_property', codes_or_urls, ordered, VacancyResult)
+
+    def get_property_names(self, urls, ordered=False):
+        return self._sweep('get_property_names', urls, ordered, NameResult)
+
+    def _sweep(self, method, targets, ordered, result_type):
+        targets = list(targets)
+        shards = [[] for _ in range(self._workers)]
+        for index, target in enumerate(targets):
+            shards[get_shard(target, self._workers)].append(index)
+
+        rate_limiter = None
+        if self._rate is not None:
+            rate_limiter = SharedRateLimiter(self._rate, self._burst, context=self._context)
+
+        results = self._context.Queue()
+        processes = {}
+        for worker_id, indices in enumerate(shards):
+            if not indices:
+                continue
+
+            items = [(index, targets[index]) for index in indices]
+            process = self._context.Process(
+                target=_run_worker, name=f'urchintai-sweep-{worker_id}', daemon=True,
+                args=(worker_id, method, items, self._create_client, rate_limiter,
+                      self._max_concurrency, self._session_options, results))
+            process.start()
+            processes[worker_id] = (process, set(indices))
+
+        # The rate limiter is passed along so that it lives as long as workers use it.
+        return self._collect(targets, processes, results, rate_limiter, ordered, result_type)
+
+    def _collect(self, targets, processes, results, rate_limiter, ordered, result_type):
+        buffered = {}
+        next_index = 0
+
+        try:
+            for index, value, error in self._receive(processes, results):
+                result = result_type(targets[index], value, error)
+                if not ordered:
+                    yield result
+                    continue
+
+                buffered[index] = result
+                while next_index in buffered:
+                    yield buffered.pop(next_index)
+                    next_index += 1
+        finally:
+            for process, _ in processes.values():
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+    def _receive(self, processes, results):
+        running = dict(processes)
+
+        def handle(message):
+            worker_id, index, value, error = message
+            if worker_id not in running:
+                return []
+
+            remaining = running[worker_id][1]
+            if index is not None:
+                remaining.discard(index)
+                return [(index, value, error)]
+
+            # The worker is done, anything not reported failed with error.
+            del running[worker_id]
+            error = error or RuntimeError(f'Worker {worker_id} returned no result')
+            return [(index, None, error) for index in sorted(remaining)]
+
+        while running:
+            try:
+                yield from handle(results.get(timeout=_POLL_INTERVAL))
+                continue
+            except queue.Empty:
+                pass
+
+            for worker_id, (process, _) in list(running.items()):
+                if process.exitcode is None or worker_id not in running:
+                    continue
+
+                # Messages sent before the worker exited may still be in the queue.
+                while worker_id in running:
+                    try:
+                        yield from handle(results.get(timeout=_POLL_INTERVAL))
+                    except queue.Empty:
+                        error = RuntimeError(f'Worker process exited with code {process.exitcode}')
+                        yield from handle((worker_id, None, None, error))
+
+def _run_worker(worker_id, method, items, create_client, rate_limiter, max_concurrency,
+        session_options, results):
+    asyncio.run(_sweep_shard(worker_id, method, items, create_client, rate_limiter,
+                             max_concurrency, session_options, results))
+
+async def _sweep_shard(worker_id, method, items, create_client, rate_limiter, max_concurrency,
+        session_options, results):
+    if session_options:
+        SessionManager.Configure(**session_options)
+
+    # Results carry the target object they were checked for, find its index back from it.
+    indices = {}
+    for index, target in items:
+        indices.setdefault(id(target), deque()).append(index)
+
+    error = None
+    try:
+        client = create_client(SessionManager.GetSession(), rate_limiter)
+        async for target, value, result_error in getattr(client, method)([target for _, target in items],
+                max_concurrency=max_concurrency):
+            index = indices[id(target)].popleft()
+            results.put((worker_id, index, value, _picklable(result_error)))
+    except Exception as e:
+        error = _picklable(e)
+    finally:
+        await SessionManager.CloseSession()
+        results.put((worker_id, None, None, error))
+
+def _picklable(error):
+    if error is None:
+        return None
+
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f'{type(error).__name__}: {error}')
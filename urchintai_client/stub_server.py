@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+'''
+Local stand-in for UR Chintai API and property pages, for tests and benchmarks.
+'''
+
+import asyncio
+import json
+import random
+import zlib
+
+from aiohttp import web
+
+PROPERTY_ROOMS_PATH = '/chintai/api/bukken/detail/detail_bukken_room/'
+ROOM_DETAILS_PATH = '/chintai/api/bukken/detail/detail_room/'
+
+
+class StubServer:
+    '''
+    Serve detail_bukken_room, detail_room and property pages over HTTP on localhost.
+
+    - latency, latency_jitter: each response is delayed by latency plus a random
+      value between 0 and latency_jitter, in seconds
+    - error_rate: ratio of requests answered with HTTP 503
+    - null_ratio: ratio of properties and rooms which are full (answered with 'null').
+      Whether a given property or room is full does not change between requests.
+    - rooms_per_property, rows_per_page: size and paging of the list of vacant rooms
+    - room_padding: number of extra bytes added to each room, to make payloads bigger
+    - page_size: approximate size of property pages in bytes
+    '''
+
+    def __init__(self, latency=0, latency_jitter=0, error_rate=0, null_ratio=0.5,
+            rooms_per_property=5, rows_per_page=10, room_padding=0, page_size=100_000, seed=None):
+        self._latency = latency
+        self._latency_jitter = latency_jitter
+        self._error_rate = error_rate
+        self._null_ratio = null_ratio
+        self._rooms_per_property = rooms_per_property
+        self._rows_per_page = rows_per_page
+        self._room_padding = 'x' * room_padding
+        self._page_size = page_size
+        self._random = random.Random(seed)
+        self._runner = None
+        self.base_url = None
+        self.request_count = 0
+
+        app = web.Application()
+        app.router.add_post(PROPERTY_ROOMS_PATH, self._handle_property_rooms)
+        app.router.add_post(ROOM_DETAILS_PATH, self._handle_room_details)
+        app.router.add_get('/chintai/{area}/{prefecture}/{code}.html', self._handle_property_page)
+        self._app = app
+
+    @property
+    def property_rooms_api(self):
+        return self.base_url + PROPERTY_ROOMS_PATH
+
+    @property
+    def room_details_api(self):
+        return self.base_url + ROOM_DETAILS_PATH
+
+    def property_page_url(self, property_code):
+        code = f'{property_code["store_code"]}_{property_code["house_code"]}{property_code["type"]}'
+        return f'{self.base_url}/chintai/kanto/kanagawa/{code}.html'
+
+    async def start(self, host='127.0.0.1', port=0):
+        '''
+        Start serving, port 0 picks a free port. Return the base URL of the server.
+        '''
+
+        self._runner = web.AppRunner(self._app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+
+        port = self._runner.addresses[0][1]
+        self.base_url = f'http://{host}:{port}'
+        return self.base_url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _handle_property_rooms(self, request):
+        error = await self._simulate()
+        if error is not None:
+            return error
+
+        form = await request.post()
+        key = (form.get('shisya'), form.get('danchi'), form.get('shikibetu'))
+        if self._is_full(key):
+            return web.Response(text='null')
+
+        page_index = int(form.get('pageIndex', '0'))
+        page_max = max(1, -(-self._rooms_per_property // self._rows_per_page))
+        first = page_index * self._rows_per_page
+        last = min(first + self._rows_per_page, self._rooms_per_property)
+        if first >= last:
+            return web.Response(text='null')
+
+        rows = [self._build_room(key, i, page_index, page_max) for i in range(first, last)]
+        return web.Response(text=json.dumps(rows, ensure_ascii=False), content_type='application/json')
+
+    async def _handle_room_details(self, request):
+        error = await self._simulate()
+        if error is not None:
+            return error
+
+        form = await request.post()
+        key = (form.get('shisya'), form.get('danchi'), form.get('shikibetu'), form.get('id'))
+        if self._is_full(key):
+            return web.Response(text='null')
+
+        room = self._build_room(key[:3], 0, 0, 1)
+        room['id'] = key[3]
+        return web.Response(text=json.dumps(room, ensure_ascii=False), content_type='application/json')
+
+    async def _handle_property_page(self, request):
+        error = await self._simulate()
+        if error is not None:
+            return error
+
+        code = request.match_info['code']
+        filler = '<div class="filler">' + 'x' * max(0, self._page_size // 10) + '</div>'
+        html_doc = '<html><head><title>' + code + '</title>' + filler + '</head><body>' + \
+                   '<h1 class="article_headings"><span class="item_title">団地 ' + code + '</span>' + \
+                   '<span class="item_sub">(神奈川県川崎市川崎区)</span></h1>' + \
+                   '<p>' + 'y' * max(0, self._page_size - len(filler)) + '</p></body></html>'
+        return web.Response(text=html_doc, content_type='text/html', charset='utf-8')
+
+    async def _simulate(self):
+        self.request_count += 1
+
+        delay = self._latency + self._random.uniform(0, self._latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if self._error_rate and self._random.random() < self._error_rate:
+            return web.Response(status=503, text='Service Unavailable')
+
+        return None
+
+    def _is_full(self, key):
+        return zlib.crc32('_'.join(str(k) for k in key).encode('utf-8')) % 1000 < self._null_ratio * 1000
+
+    def _build_room(self, key, index, page_index, page_max):
+        store_code, house_code, type = key
+        room = {
+            'pageIndex': str(page_index),
+            'pageMax': str(page_max),
+            'allCount': str(self._rooms_per_property),
+            'rowMax': str(self._rows_per_page),
+            'shisya': store_code,
+            'danchi': house_code,
+            'shikibetu': type,
+            'id': f'{index:09d}',
+            'roomNmMain': f'{index // 10 + 1}号棟',
+            'roomNmSub': f'{index % 10 + 1}01号室',
+            'rent': '84,100円',
+            'commonfee': '3,400円',
+            'type': '2DK',
+            'floorspace': '49&#13217;',
+            'floor': f'{index % 10 + 1}階',
+            'roomDetailLink': f'/chintai/kanto/kanagawa/{store_code}_{house_code}{type}_room.html?JKSS={index:09d}',
+        }
+        if self._room_padding:
+            room['padding'] = self._room_padding
+
+        return room
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+
+'''
+Synchronous client for threaded applications.
+'''
+
+import asyncio
+import concurrent.futures
+import threading
+
+from urchintai_client.request_sender import RequestSender
+from urchintai_client.session_manager import SessionManager
+from urchintai_client.ur_client import DEFAULT_MAX_CONCURRENCY, UrClient
+
+
+def _create_default_client(session):
+    return UrClient(RequestSender(session))
+
+class SyncUrClient:
+    '''
+    Blocking version of UrClient which can be called from any number of threads.
+
+    It owns an event loop running in a background thread, and a session created
+    by SessionManager on that loop, so that connections are pooled and reused
+    by all calls. Each call is sent to the loop and blocks until it is done,
+    or until timeout seconds have passed in which case it is cancelled.
+
+    create_client is called on the loop with the session and must return
+    the UrClient to use, for example to add a cache or a rate limiter.
+
+    Call close() when done, or use it as a context manager.
+    '''
+
+    def __init__(self, create_client=_create_default_client, timeout=None):
+        self._timeout = timeout
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='urchintai-loop', daemon=True)
+        self._thread.start()
+        self._closed = False
+        self._close_lock = threading.Lock()
+
+        async def setup():
+            return create_client(SessionManager.GetSession())
+
+        try:
+            self._client = self.run(setup())
+        except BaseException:
+            self._stop_loop()
+            raise
+
+    def run(self, coroutine, timeout=None):
+        '''
+        Run a coroutine on the background loop and return its result.
+        '''
+
+        if self._closed:
+            coroutine.close()
+            raise RuntimeError('SyncUrClient is closed')
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError('SyncUrClient cannot be called from its own event loop')
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(timeout if timeout is not None else self._timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def is_property_vacant(self, url=None, property_code=None):
+        return self.run(self._client.is_property_vacant(url, property_code))
+
+    def is_room_vacant(self, url=None, room_code=None):
+        return self.run(self._client.is_room_vacant(url, room_code))
+
+    def get_property_name(self, url):
+        return self.run(self._client.get_property_name(url))
+
+    def get_vacant_rooms(self, url=None, property_code=None):
+        '''
+        Return the list of all vacant rooms of a property.
+        '''
+
+        return self.run(self._collect(self._client.iter_vacant_rooms(url, property_code)))
+
+    def check_properties(self, codes_or_urls, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        '''
+        Same as UrClient.check_properties, but return the list of all VacancyResult.
+        '''
+
+        return self.run(self._collect(self._client.check_properties(codes_or_urls, max_concurrency)))
+
+    def check_rooms(self, codes_or_urls, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        '''
+        Same as UrClient.check_rooms, but return the list of all VacancyResult.
+        '''
+
+        return self.run(self._collect(self._client.check_rooms(codes_or_urls, max_concurrency)))
+
+    def check_rooms_by_property(self, codes_or_urls, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+            verify_missing=True):
+        '''
+        Same as UrClient.check_rooms_by_property, but return the list of all VacancyResult.
+        '''
+
+        return self.run(self._collect(self._client.check_rooms_by_property(codes_or_urls, max_concurrency,
+                                                                           verify_missing)))
+
+    def get_property_names(self, urls, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        '''
+        Same as UrClient.get_property_names, but return the list of all NameResult.
+        '''
+
+        return self.run(self._collect(self._client.get_property_names(urls, max_concurrency)))
+
+    def close(self):
+        '''
+        Close the session and stop the background loop. Calling it again does nothing.
+        '''
+
+        with self._close_lock:
+            if self._closed:
+                return
+
+            try:
+                self.run(SessionManager.CloseSession())
+            finally:
+                self._closed = True
+                self._stop_loop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    @staticmethod
+    async def _collect(results):
+        return [result async for result in results]
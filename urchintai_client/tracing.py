@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+'''
+Per-request timing breakdown using aiohttp tracing.
+'''
+
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import aiohttp
+
+# Time spent in each phase of an operation, in seconds. When an operation
+# is retried, phases of all attempts are added up. A phase which did not
+# happen is 0, for example connect when a pooled connection was reused.
+# - pool_wait: waiting for a free connection in the pool
+# - dns: resolving the host
+# - connect: opening the connection, including TLS handshake
+# - ttfb: from sending the request to receiving response headers
+# - body: reading the response body, including bodies streamed chunk by chunk
+# - parse: parsing the response in ur_parser
+RequestTiming = namedtuple('RequestTiming', ['name', 'target', 'url', 'status', 'attempts',
+                                             'pool_wait', 'dns', 'connect', 'ttfb', 'body', 'parse',
+                                             'total', 'error'])
+
+_current_span = ContextVar('urchintai_current_span', default=None)
+
+
+class _Span:
+    __slots__ = ('name', 'target', 'url', 'status', 'attempts', 'pool_wait', 'dns', 'connect',
+                 'ttfb', 'body', 'parse', 'started', 'error', 'body_started')
+
+    def __init__(self, name, target, started):
+        self.name = name
+        self.target = target
+        self.url = None
+        self.status = None
+        self.attempts = 0
+        self.pool_wait = 0
+        self.dns = 0
+        self.connect = 0
+        self.ttfb = 0
+        self.body = 0
+        self.parse = 0
+        self.started = started
+        self.error = None
+        self.body_started = None
+
+class Tracer:
+    '''
+    Collect the timing of each phase of operations run inside span().
+
+    Pass trace_config() to the aiohttp session (see SessionManager.Configure),
+    and the tracer to UrClient, which opens a span for each request it sends.
+
+    Each finished span is passed to callback as a RequestTiming.
+    Spans which took at least slow_threshold seconds are also kept
+    in slow_requests, which holds the max_slow_requests most recent ones.
+
+    Requests sent outside of a span are not recorded.
+    '''
+
+    def __init__(self, callback=None, slow_threshold=1, max_slow_requests=100, clock=time.perf_counter):
+        self._callback = callback
+        self._slow_threshold = slow_threshold
+        self._clock = clock
+        self.slow_requests = deque(maxlen=max_slow_requests)
+
+    def trace_config(self):
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_connection_queued_start.append(self._on_connection_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_connection_queued_end)
+        trace_config.on_connection_create_start.append(self._on_connection_create_start)
+        trace_config.on_connection_create_end.append(self._on_connection_create_end)
+        trace_config.on_dns_resolvehost_start.append(self._on_dns_resolvehost_start)
+        trace_config.on_dns_resolvehost_end.append(self._on_dns_resolvehost_end)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_response_chunk_received.append(self._on_response_chunk_received)
+
+        return trace_config
+
+    @contextmanager
+    def span(self, name, target=None):
+        '''
+        Record requests sent and responses parsed inside this block as one operation.
+        '''
+
+        span = _Span(name, target, self._clock())
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record_parse(self, seconds):
+        span = _current_span.get()
+        if span is not None:
+            span.parse += seconds
+
+    def chunk_received(self):
+        '''
+        Count the time since the response headers, or since chunk_consumed, as reading the body.
+
+        aiohttp only reports chunks of bodies read at once, so code which streams a body
+        chunk by chunk calls this when it receives a chunk, and chunk_consumed once done with it.
+        '''
+
+        span = _current_span.get()
+        if span is not None and span.body_started is not None:
+            now = self._clock()
+            span.body += now - span.body_started
+            span.body_started = now
+
+    def chunk_consumed(self):
+        '''
+        Start counting the time waiting for the next chunk of a streamed body.
+        '''
+
+        span = _current_span.get()
+        if span is not None and span.body_started is not None:
+            span.body_started = self._clock()
+
+    def _finish(self, span):
+        timing = RequestTiming(span.name, span.target, span.url, span.status, span.attempts,
+                               span.pool_wait, span.dns, span.connect, span.ttfb, span.body,
+                               span.parse, self._clock() - span.started, span.error)
+
+        if self._slow_threshold is not None and timing.total >= self._slow_threshold:
+            self.slow_requests.append(timing)
+        if self._callback is not None:
+            self._callback(timing)
+
+    # aiohttp gives each request its own ctx, which holds the span and timestamps of that attempt.
+
+    async def _on_request_start(self, session, ctx, params):
+        ctx.span = _current_span.get()
+        if ctx.span is None:
+            return
+
+        ctx.started = self._clock()
+        ctx.setup = 0
+        ctx.headers_received = None
+        ctx.span.attempts += 1
+        ctx.span.url = str(params.url)
+
+    async def _on_connection_queued_start(self, session, ctx, params):
+        ctx.queued = self._clock()
+
+    async def _on_connection_queued_end(self, session, ctx, params):
+        if getattr(ctx, 'span', None) is not None:
+            elapsed = self._clock() - ctx.queued
+            ctx.span.pool_wait += elapsed
+            ctx.setup += elapsed
+
+    async def _on_connection_create_start(self, session, ctx, params):
+        ctx.creating = self._clock()
+        ctx.dns = 0
+
+    async def _on_connection_create_end(self, session, ctx, params):
+        if getattr(ctx, 'span', None) is not None:
+            # Host is resolved while the connection is created, it is reported separately.
+            elapsed = self._clock() - ctx.creating
+            ctx.span.connect += elapsed - ctx.dns
+            ctx.setup += elapsed
+
+    async def _on_dns_resolvehost_start(self, session, ctx, params):
+        ctx.resolving = self._clock()
+
+    async def _on_dns_resolvehost_end(self, session, ctx, params):
+        if getattr(ctx, 'span', None) is not None:
+            elapsed = self._clock() - ctx.resolving
+            ctx.span.dns += elapsed
+            ctx.dns = getattr(ctx, 'dns', 0) + elapsed
+
+    async def _on_request_end(self, session, ctx, params):
+        if getattr(ctx, 'span', None) is not None:
+            ctx.headers_received = self._clock()
+            ctx.span.ttfb += ctx.headers_received - ctx.started - ctx.setup
+            ctx.span.status = params.response.status
+            ctx.span.body_started = ctx.headers_received
+
+    async def _on_response_chunk_received(self, session, ctx, params):
+        if getattr(ctx, 'span', None) is not None and ctx.headers_received is not None:
+            # Count each part of the body once, in case it is received in several chunks.
+            now = self._clock()
+            ctx.span.body += now - ctx.headers_received
+            ctx.headers_received = now
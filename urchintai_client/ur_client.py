@@ -1,19 +1,83 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections import namedtuple
+
 from urchintai_client import ur_parser
 from urchintai_client.constants import (UR_API_PROPERTY_ROOMS,
                                         UR_API_ROOM_DETAILS)
+from urchintai_client.deadline import (deadline, resolve_deadline,
+                                       run_with_timeout, wait_until)
+from urchintai_client.exceptions import DeadlineExceededError
+from urchintai_client.models import (NameResult, PollResult, PropertyCode,
+                                     VacancyResult)
+from urchintai_client.name_store import PropertyNameStore
+from urchintai_client.priority import BACKGROUND, get_priority, priority
+from urchintai_client.response_cache import make_key
+
+DEFAULT_MAX_CONCURRENCY = 10
+DEFAULT_INLINE_PARSE_LIMIT = 32 * 1024
+
+# Outcome of checking all rooms of one property, group is (property_code, rooms).
+_GroupResult = namedtuple('_GroupResult', ['group', 'results', 'error'])
 
 
 class UrClient:
     '''
     This class use UR Chintai URL to check if a property is vacant or not.
+
+    If a PropertyNameStore is provided, property names are read from it
+    instead of loading the property page every time. If name_refresh_after
+    (in seconds) is also set, names older than that are returned as is
+    and refreshed in the background.
+
+    If stream_property_pages is True, property pages are read chunk by chunk
+    and the download stops as soon as the property name is found.
+
+    If a ChangeTracker is provided, responses identical to the previous one
+    are not parsed again, and property pages are loaded using conditional GET.
+
+    property_rooms_api and room_details_api can be changed to send API requests
+    somewhere else than UR Chintai, for example to a StubServer.
+
+    If a Metrics object is provided, parsing time and name store hits are recorded in it.
+
+    If a Tracer is provided, each request is run in its own span so that the time
+    spent in each phase of the request, and in parsing its response, is recorded.
+
+    If parser_executor (a concurrent.futures Executor) is provided, property pages
+    longer than inline_parse_limit characters are parsed in it instead of blocking
+    the event loop. A ProcessPoolExecutor parses pages in parallel, a ThreadPoolExecutor
+    only lets other requests make progress while a page is parsed.
+
+    Every method accepts a timeout, in seconds, which covers all requests and
+    retries of the call. When it runs out, the call is cancelled and raises
+    DeadlineExceededError. Batch methods instead yield DeadlineExceededError
+    for targets being checked at that time, and do not check the others.
     '''
 
-    def __init__(self, request_sender):
+    def __init__(self, request_sender, name_store=None, name_refresh_after=None,
+            stream_property_pages=False, change_tracker=None,
+            property_rooms_api=UR_API_PROPERTY_ROOMS, room_details_api=UR_API_ROOM_DETAILS,
+            metrics=None, tracer=None, parser_executor=None,
+            inline_parse_limit=DEFAULT_INLINE_PARSE_LIMIT):
         self._request_sender = request_sender
+        self._name_store = name_store
+        self._name_refresh_after = name_refresh_after
+        self._refresh_tasks = {}
+        self._stream_property_pages = stream_property_pages
+        self._change_tracker = change_tracker
+        self._property_rooms_api = property_rooms_api
+        self._room_details_api = room_details_api
+        self._metrics = metrics
+        self._tracer = tracer
+        self._parser_executor = parser_executor
+        self._inline_parse_limit = inline_parse_limit
 
-    async def is_property_vacant(self, url=None, property_code=None):
+    async def is_property_vacant(self, url=None, property_code=None, timeout=None):
         '''
         Query UR Chintai API to get the list of empty room in a property.
         If the list is empty then that property is full and vice versa.
@@ -22,18 +86,30 @@ class UrClient:
         If both are provided, property_code is prioritized.
         '''
 
+        return (await self.poll_property(url, property_code, timeout)).vacant
+
+    async def poll_property(self, url=None, property_code=None, timeout=None):
+        '''
+        Same as is_property_vacant, but return a PollResult which also tells
+        if the response changed since the previous poll of this property.
+        Without a ChangeTracker, changed is always True.
+        '''
+
         if not url and not property_code:
             raise ValueError('Please provide either property\'s URL or property code')
 
         if property_code is None:
             property_code = ur_parser.get_property_code_from_url(url)
 
-        property_data = self._build_data_from_property_code(property_code)
+        return await run_with_timeout(self._poll(self._property_rooms_api, 'property_rooms', property_code,
+                                                 self._build_data_from_property_code(property_code)), timeout)
 
-        resp = await self._request_sender.post(UR_API_PROPERTY_ROOMS, property_data)
-        return resp != 'null'
+    async def _poll(self, api, name, code, data):
+        with self._span(name, code):
+            resp = await self._request_sender.post(api, data)
+            return self._parse_vacancy(api, data, resp)
 
-    async def get_property_name(self, url):
+    async def get_property_name(self, url, timeout=None):
         '''
         Load property page and parse html doc to retrieve property name.
         '''
@@ -41,12 +117,198 @@ class UrClient:
         if not url:
             raise ValueError('Room\'s URL cannot be empty')
 
+        if self._name_store is None:
+            return await run_with_timeout(self._load_property_name(url), timeout)
+
+        property_code = ur_parser.get_property_code_from_url(url)
+        entry = self._get_stored_name(property_code)
+        if entry is None:
+            name = await run_with_timeout(self._load_and_store_property_name(url, property_code), timeout)
+            self._name_store.flush()
+            return name
+
+        name, updated_at = entry
+        self._refresh_if_stale(url, property_code, updated_at)
+        return name
+
+    async def get_property_names(self, urls, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=None):
+        '''
+        Find the names of many properties.
+
+        Names already in the name store are yielded first, then only the missing
+        ones are loaded, with at most max_concurrency requests in flight.
+        Results are yielded as NameResult, a failure only affects its own item.
+        '''
+
+        expires_at = resolve_deadline(timeout)
+        if self._name_store is None:
+            async for result in self._run_bounded(urls, self.get_property_name,
+                    max_concurrency, NameResult, expires_at):
+                yield result
+            return
+
+        misses = []
+        for url in urls:
+            try:
+                property_code = ur_parser.get_property_code_from_url(url)
+            except ValueError as e:
+                yield NameResult(url, None, e)
+                continue
+
+            entry = self._get_stored_name(property_code)
+            if entry is None:
+                misses.append((url, property_code))
+                continue
+
+            name, updated_at = entry
+            self._refresh_if_stale(url, property_code, updated_at)
+            yield NameResult(url, name, None)
+
+        async def load(miss):
+            return await self._load_and_store_property_name(*miss)
+
+        # Names loaded by this batch are committed together.
+        try:
+            async for result in self._run_bounded(misses, load, max_concurrency, NameResult, expires_at):
+                yield result._replace(target=result.target[0])
+        finally:
+            self._name_store.flush()
+
+    async def _load_property_name(self, url):
+        with self._span('property_name', url):
+            return await self._load_property_name_in_span(url)
+
+    async def _load_property_name_in_span(self, url):
+        if self._stream_property_pages:
+            return await self._stream_property_name(url)
+
+        if self._change_tracker is not None:
+            return await self._load_property_name_if_modified(url)
+
         resp = await self._request_sender.get(url)
-        property_name = ur_parser.get_property_name_from_content(resp)
+        return await self._parse_page('property_name', ur_parser.get_property_name_from_content, resp)
+
+    async def _stream_property_name(self, url):
+        parser = ur_parser.PropertyNameParser()
+        if self._metrics is None and self._tracer is None:
+            await self._request_sender.get_until(url, parser.feed_chunk)
+            return parser.get_property_name()
+
+        parse_time = 0
+
+        def feed_chunk(chunk):
+            nonlocal parse_time
+            if self._tracer is not None:
+                self._tracer.chunk_received()
+
+            started = time.perf_counter()
+            try:
+                return parser.feed_chunk(chunk)
+            finally:
+                parse_time += time.perf_counter() - started
+                if self._tracer is not None:
+                    self._tracer.chunk_consumed()
+
+        try:
+            await self._request_sender.get_until(url, feed_chunk)
+        finally:
+            self._record_parse('property_name', parse_time)
+
+        return parser.get_property_name()
+
+    async def _load_property_name_if_modified(self, url):
+        validators = self._change_tracker.get_validators(url)
+        if validators is None:
+            resp = await self._request_sender.get_conditional(url)
+        else:
+            resp = await self._request_sender.get_conditional(url, validators.etag,
+                                                              validators.last_modified)
+
+        if resp.not_modified:
+            if validators is not None:
+                return validators.value
+
+            # Not modified, but there is no known name to return: ask for the page itself.
+            text = await self._request_sender.get(url)
+            return await self._parse_page('property_name', ur_parser.get_property_name_from_content, text)
+
+        property_name = await self._parse_page('property_name', ur_parser.get_property_name_from_content,
+                                               resp.text)
+        if resp.etag or resp.last_modified:
+            self._change_tracker.set_validators(url, resp.etag, resp.last_modified, property_name)
 
         return property_name
 
-    async def is_room_vacant(self, url=None, room_code=None):
+    async def _load_and_store_property_name(self, url, property_code):
+        name = await self._load_property_name(url)
+        self._name_store.set(property_code, name)
+        return name
+
+    def _get_stored_name(self, property_code):
+        entry = self._name_store.get(property_code)
+        if self._metrics is not None:
+            self._metrics.increment('name_store_misses' if entry is None else 'name_store_hits')
+
+        return entry
+
+    def _parse(self, kind, parse, content):
+        if self._metrics is None and self._tracer is None:
+            return parse(content)
+
+        started = time.perf_counter()
+        try:
+            return parse(content)
+        finally:
+            self._record_parse(kind, time.perf_counter() - started)
+
+    async def _parse_page(self, kind, parse, content):
+        if self._parser_executor is None or len(content) <= self._inline_parse_limit:
+            return self._parse(kind, parse, content)
+
+        # Parsing time includes waiting for a free worker of the executor.
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._parser_executor, parse, content)
+        finally:
+            self._record_parse(kind, time.perf_counter() - started)
+
+    def _record_parse(self, kind, seconds):
+        if self._metrics is not None:
+            self._metrics.record_parse(kind, seconds)
+        if self._tracer is not None:
+            self._tracer.record_parse(seconds)
+
+    def _span(self, name, target):
+        if self._tracer is None:
+            return contextlib.nullcontext()
+
+        return self._tracer.span(name, target)
+
+    def _refresh_if_stale(self, url, property_code, updated_at):
+        if self._name_refresh_after is None:
+            return
+        if time.time() - updated_at < self._name_refresh_after:
+            return
+
+        key = PropertyNameStore.make_key(property_code)
+        if key in self._refresh_tasks:
+            return
+
+        # The refresh runs in a context of its own, so that it is bound by neither
+        # the deadline nor the trace span of the call which started it.
+        task = contextvars.Context().run(asyncio.ensure_future,
+                                         self._load_and_store_property_name(url, property_code))
+        self._refresh_tasks[key] = task
+        task.add_done_callback(lambda t: self._on_refresh_done(key, t))
+
+    def _on_refresh_done(self, key, task):
+        del self._refresh_tasks[key]
+
+        # A failed refresh keeps the old name, it will be retried on the next lookup.
+        if not task.cancelled():
+            task.exception()
+
+    async def is_room_vacant(self, url=None, room_code=None, timeout=None):
         '''
         Query UR Chintai API to check if a given room is vacant.
 
@@ -54,24 +316,246 @@ class UrClient:
         If both are provided, room_code is prioritized.
         '''
 
+        return (await self.poll_room(url, room_code, timeout)).vacant
+
+    async def poll_room(self, url=None, room_code=None, timeout=None):
+        '''
+        Same as is_room_vacant, but return a PollResult which also tells
+        if the response changed since the previous poll of this room.
+        Without a ChangeTracker, changed is always True.
+        '''
+
         if not url and not room_code:
             raise ValueError('Please provide either room\'s URL or room code')
 
         if room_code is None:
             room_code = ur_parser.get_room_code_from_url(url)
-        room_data = self._build_data_from_room_code(room_code)
+        return await run_with_timeout(self._poll(self._room_details_api, 'room_details', room_code,
+                                                 self._build_data_from_room_code(room_code)), timeout)
+
+    async def iter_vacant_rooms(self, url=None, property_code=None, timeout=None):
+        '''
+        Yield each vacant room of a property as a Room, walking through all pages
+        of the list. The next page is loaded while the current one is consumed.
+
+        At least url or property_code must be provided.
+        If both are provided, property_code is prioritized.
+        '''
+
+        if not url and not property_code:
+            raise ValueError('Please provide either property\'s URL or property code')
+
+        if property_code is None:
+            property_code = ur_parser.get_property_code_from_url(url)
+
+        async for rooms, _ in self._iter_room_pages(property_code, resolve_deadline(timeout)):
+            for room in rooms:
+                yield room
+
+    async def _iter_room_pages(self, property_code, expires_at):
+        '''
+        Yield (rooms, page_count) for each page of the list of vacant rooms of a property.
+        The last page yielded is empty, or has a page count, unless the walk stopped
+        because a page repeated the previous one.
+        '''
+
+        async def load_page(page_index):
+            property_data = self._build_data_from_property_code(property_code, page_index)
+            with deadline(at=expires_at), self._span('property_rooms', property_code):
+                resp = await self._request_sender.post(self._property_rooms_api, property_data)
+                return self._parse('rooms', ur_parser.get_rooms_from_content, resp)
+
+        page_index = 0
+        next_page = asyncio.ensure_future(load_page(page_index))
+        previous_rooms = None
+        try:
+            while next_page is not None:
+                rooms, page_count = await wait_until(next_page, expires_at)
+                next_page = None
+
+                # Without page count, stop when a page is empty or repeats the previous one.
+                if page_count is None and rooms == previous_rooms:
+                    return
+
+                page_index += 1
+                if rooms and (page_count is None or page_index < page_count):
+                    next_page = asyncio.ensure_future(load_page(page_index))
+
+                previous_rooms = rooms
+                yield rooms, page_count
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+                if next_page.done() and not next_page.cancelled():
+                    next_page.exception()
+
+    def _parse_vacancy(self, url, data, resp):
+        if self._change_tracker is None:
+            return PollResult(not ur_parser.is_null_response(resp), True)
+
+        changed, vacant = self._change_tracker.update(make_key('POST', url, data), resp,
+                                                      lambda body: not ur_parser.is_null_response(body))
+        return PollResult(vacant, changed)
+
+    async def check_properties(self, codes_or_urls, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=None):
+        '''
+        Check vacancy of many properties, with at most max_concurrency
+        requests in flight at any time.
+
+        codes_or_urls can be any iterable of property URLs or property codes.
+        Results are yielded as VacancyResult in the order they complete.
+        A failure only affects its own item and is reported in VacancyResult.error.
+        '''
+
+        async def check(target):
+            if isinstance(target, str):
+                return await self.is_property_vacant(url=target)
+            return await self.is_property_vacant(property_code=target)
+
+        async for result in self._run_bounded(codes_or_urls, check, max_concurrency,
+                expires_at=resolve_deadline(timeout)):
+            yield result
+
+    async def check_rooms(self, codes_or_urls, max_concurrency=DEFAULT_MAX_CONCURRENCY, timeout=None):
+        '''
+        Check vacancy of many rooms, with at most max_concurrency
+        requests in flight at any time.
+
+        codes_or_urls can be any iterable of room URLs or room codes.
+        Results are yielded as VacancyResult in the order they complete.
+        A failure only affects its own item and is reported in VacancyResult.error.
+        '''
+
+        async def check(target):
+            if isinstance(target, str):
+                return await self.is_room_vacant(url=target)
+            return await self.is_room_vacant(room_code=target)
+
+        async for result in self._run_bounded(codes_or_urls, check, max_concurrency,
+                expires_at=resolve_deadline(timeout)):
+            yield result
+
+    async def check_rooms_by_property(self, codes_or_urls, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+            verify_missing=True, timeout=None):
+        '''
+        Check vacancy of many rooms using the list of vacant rooms of their property.
+
+        Rooms are grouped by property, and the list of vacant rooms of each property
+        is loaded once instead of sending one request per room. Rooms missing from
+        a complete list are full. If the list may be incomplete (the API did not say
+        how many pages there are and ignored the page index), rooms missing from it
+        are checked one by one, unless verify_missing is False in which case
+        they are considered full.
+
+        Results are yielded as VacancyResult, a failure only affects its own items.
+        At most max_concurrency requests are in flight at the same time.
+        '''
+
+        expires_at = resolve_deadline(timeout)
+        groups = {}
+        for target in codes_or_urls:
+            try:
+                room_code = ur_parser.get_room_code_from_url(target) if isinstance(target, str) else target
+                property_code = PropertyCode(room_code['store_code'], room_code['house_code'],
+                                             room_code['type'])
+            except (ValueError, KeyError, TypeError) as e:
+                yield VacancyResult(target, None, e)
+                continue
+
+            groups.setdefault(property_code, []).append((target, room_code))
+
+        # Shared by listings and verifications, so that at most max_concurrency requests are in flight.
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def verify(target, room_code):
+            async with slots:
+                try:
+                    return VacancyResult(target, await self.is_room_vacant(room_code=room_code), None)
+                except Exception as e:
+                    return VacancyResult(target, None, e)
+
+        async def check_group(property_code, rooms):
+            vacant_ids = set()
+            complete = True
+            async with slots:
+                async for page, page_count in self._iter_room_pages(property_code, resolve_deadline()):
+                    vacant_ids.update(room.room_id for room in page)
+                    complete = page_count is not None or not page
+
+            results = []
+            missing = []
+            for target, room_code in rooms:
+                if room_code['room_id'] in vacant_ids:
+                    results.append(VacancyResult(target, True, None))
+                elif complete or not verify_missing:
+                    results.append(VacancyResult(target, False, None))
+                else:
+                    missing.append((target, room_code))
+
+            results.extend(await asyncio.gather(*(verify(target, room_code) for target, room_code in missing)))
+            return results
+
+        async for group_result in self._run_bounded(groups.items(), lambda group: check_group(*group),
+                max_concurrency, _GroupResult, expires_at):
+            if group_result.error is None:
+                for result in group_result.results:
+                    yield result
+            else:
+                _, rooms = group_result.group
+                for target, _ in rooms:
+                    yield VacancyResult(target, None, group_result.error)
+
+    async def _run_bounded(self, targets, check, max_concurrency, result_type=VacancyResult, expires_at=None):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+
+        async def run(target):
+            # Batch checks are background traffic, unless the caller chose otherwise.
+            with priority(get_priority() or BACKGROUND), deadline(at=expires_at):
+                try:
+                    return result_type(target, await check(target), None)
+                except Exception as e:
+                    return result_type(target, None, e)
+
+        # Targets are pulled lazily so that huge iterables are never materialized.
+        targets = iter(targets)
+        pending = {}
+        try:
+            while True:
+                if expires_at is None or time.monotonic() < expires_at:
+                    for target in targets:
+                        pending[asyncio.ensure_future(run(target))] = target
+                        if len(pending) >= max_concurrency:
+                            break
+
+                if not pending:
+                    return
+
+                timeout = None if expires_at is None else max(0, expires_at - time.monotonic())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Out of time: targets in flight expired, the others are not checked.
+                    for task, target in pending.items():
+                        task.cancel()
+                        yield result_type(target, None, DeadlineExceededError('Deadline exceeded'))
+                    pending = {}
+                    return
 
-        resp = await self._request_sender.post(UR_API_ROOM_DETAILS, room_data)
-        return resp != 'null'
+                for task in done:
+                    del pending[task]
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
 
-    def _build_data_from_property_code(self, property_code):
+    def _build_data_from_property_code(self, property_code, page_index=0):
         return {
             'shisya': property_code['store_code'],
             'danchi': property_code['house_code'],
             'shikibetu': property_code['type'],
             'orderByField': '0',
             'orderBySort': '0',
-            'pageIndex': '0',
+            'pageIndex': str(page_index),
         }
 
     def _build_data_from_room_code(self, room_code):
@@ -4,9 +4,22 @@
 Methods to parse URL and HTMLDOC and retrieve data.
 '''
 
+import codecs
+import json
 import re
+from html.parser import HTMLParser
 
-from bs4 import BeautifulSoup
+from urchintai_client.models import PropertyCode, Room, RoomCode
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+_PROPERTY_URL = re.compile(r'^https:\/\/www\.ur-net\.go\.jp\/chintai\/\w+\/\w+\/(\d{2})_(\d{3})(\d{1}).html$')
+_ROOM_URL = re.compile(r'^https:\/\/www\.ur-net\.go\.jp\/chintai\/\w+\/\w+\/(\d{2})_(\d{3})(\d{1})_room.html\?JKSS=(\d{9})$')
+_ANY_URL = re.compile(r'^https:\/\/www\.ur-net\.go\.jp\/chintai\/\w+\/\w+\/(\d{2})_(\d{3})(\d{1})(?:.html|_room.html\?JKSS=(\d{9}))$')
 
 
 def get_property_code_from_url(url):
@@ -21,17 +34,12 @@ def get_property_code_from_url(url):
     if url is None:
         raise ValueError('UR Chintai URL cannot be empty')
 
-    reg = r'^https:\/\/www\.ur-net\.go\.jp\/chintai\/\w+\/\w+\/(\d{2})_(\d{3})(\d{1}).html$'
-    match = re.search(reg, url)
+    match = _PROPERTY_URL.search(url)
 
     if match is None:
         raise ValueError(f'UR Chintai URL is invalid: {url}')
 
-    return {
-        'store_code': match.group(1),
-        'house_code': match.group(2),
-        'type': match.group(3)
-    }
+    return PropertyCode(*match.groups())
 
 def get_room_code_from_url(url):
     '''
@@ -46,26 +54,128 @@ def get_room_code_from_url(url):
     if url is None:
         raise ValueError('UR Chintai URL cannot be empty')
 
-    reg = r'^https:\/\/www\.ur-net\.go\.jp\/chintai\/\w+\/\w+\/(\d{2})_(\d{3})(\d{1})_room.html\?JKSS=(\d{9})$'
-    match = re.search(reg, url)
+    match = _ROOM_URL.search(url)
 
     if match is None:
         raise ValueError(f'UR Chintai URL is invalid: {url}')
 
-    return {
-        'store_code': match.group(1),
-        'house_code': match.group(2),
-        'type': match.group(3),
-        'room_id': match.group(4),
-    }
+    return RoomCode(*match.groups())
+
+def parse_urls(urls):
+    '''
+    Parse many property and room URLs in one pass, for example the lines of a file.
+    Surrounding blank characters and empty lines are ignored.
+
+    Yield (url, code) where code is a PropertyCode, a RoomCode, or None if url is invalid.
+    Codes of the same property share the same strings, and property URLs
+    of the same property share the same PropertyCode.
+    '''
+
+    strings = {}
+    property_codes = {}
+
+    for url in urls:
+        url = url.strip()
+        if not url:
+            continue
+
+        match = _ANY_URL.match(url)
+        if match is None:
+            yield url, None
+            continue
+
+        store_code, house_code, type, room_id = match.groups()
+        key = (store_code, house_code, type)
+        property_code = property_codes.get(key)
+        if property_code is None:
+            property_code = PropertyCode(strings.setdefault(store_code, store_code),
+                                         strings.setdefault(house_code, house_code),
+                                         strings.setdefault(type, type))
+            property_codes[key] = property_code
+
+        if room_id is None:
+            yield url, property_code
+        else:
+            yield url, RoomCode(property_code.store_code, property_code.house_code,
+                                property_code.type, room_id)
+
+def parse_url_file(path, encoding='utf-8'):
+    '''
+    Same as parse_urls, reading one URL per line from a file without loading it whole.
+    '''
+
+    with open(path, 'r', encoding=encoding) as f:
+        yield from parse_urls(f)
+
+def is_null_response(resp):
+    '''
+    UR Chintai API answers 'null' when nothing is found. resp can be str, bytes or memoryview.
+    '''
+
+    return resp == 'null' or resp == b'null'
+
+def get_rooms_from_content(resp):
+    '''
+    Parse one page of the list of vacant rooms returned by UR Chintai API.
+    resp can be str, or UTF-8 encoded bytes or memoryview.
+
+    Return (rooms, page_count). page_count is None if the response
+    does not say how many pages there are.
+    '''
+
+    if is_null_response(resp):
+        return (), None
+
+    # orjson reads memoryview directly, json needs bytes.
+    if isinstance(resp, memoryview) and _json_loads is json.loads:
+        resp = resp.tobytes()
+
+    rows = _json_loads(resp)
+    if not rows:
+        return (), None
+
+    rooms = tuple(Room(
+        row.get('id'),
+        row.get('roomNmMain'),
+        row.get('roomNmSub'),
+        row.get('rent'),
+        row.get('commonfee'),
+        row.get('type'),
+        row.get('floorspace'),
+        row.get('floor'),
+        row.get('roomDetailLink'),
+    ) for row in rows)
+
+    return rooms, _get_page_count(rows[0])
+
+def _get_page_count(row):
+    page_max = row.get('pageMax')
+    if page_max:
+        return int(page_max)
+
+    all_count = row.get('allCount')
+    row_max = row.get('rowMax')
+    if all_count and row_max and int(row_max) > 0:
+        return -(-int(all_count) // int(row_max))
+
+    return None
 
 def get_property_name_from_content(html_doc):
     '''
     Property's name is not included in API response.
     We need to load the page and parse property's name from HTML doc.
+
+    html_doc can be str, or UTF-8 encoded bytes or memoryview.
     '''
 
-    soup = BeautifulSoup(html_doc, 'html.parser')
+    # BeautifulSoup is slow to import and only needed here.
+    from bs4 import BeautifulSoup
+
+    if isinstance(html_doc, str):
+        soup = BeautifulSoup(html_doc, 'html.parser')
+    else:
+        # Pages are UTF-8, telling it spares BeautifulSoup guessing the encoding.
+        soup = BeautifulSoup(bytes(html_doc), 'html.parser', from_encoding='utf-8')
 
     article_headings = soup.find_all('h1', attrs={'class':'article_headings'})
     if not article_headings:
@@ -80,3 +190,74 @@ def get_property_name_from_content(html_doc):
     property_name_with_blank = item_title_span.string
     property_name = property_name_with_blank.strip()
     return property_name
+
+class PropertyNameParser(HTMLParser):
+    '''
+    Incremental version of get_property_name_from_content.
+
+    HTML doc can be fed chunk by chunk, as bytes or str, using feed_chunk.
+    Parsing stops as soon as the property name has been found,
+    so the rest of the page does not need to be downloaded.
+    '''
+
+    def __init__(self, encoding='utf-8'):
+        super().__init__()
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        self._in_heading = False
+        self._in_title = False
+        self._title_parts = []
+        self.done = False
+        self.property_name = None
+
+    def feed_chunk(self, chunk):
+        '''
+        Parse the next chunk of HTML doc.
+        Return True once no more chunk is needed.
+        '''
+
+        if self.done:
+            return True
+
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = self._decoder.decode(chunk)
+        self.feed(chunk)
+
+        return self.done
+
+    def get_property_name(self):
+        if self.property_name is None:
+            raise Exception('Cannot parse property name from html doc')
+
+        return self.property_name
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+
+        if not self._in_heading:
+            if tag == 'h1' and _has_class(attrs, 'article_headings'):
+                self._in_heading = True
+        elif tag == 'span' and _has_class(attrs, 'item_title'):
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+
+        if self._in_title and tag == 'span':
+            self.property_name = ''.join(self._title_parts).strip()
+            self.done = True
+        elif self._in_heading and tag == 'h1':
+            # Only the first heading is checked, like get_property_name_from_content.
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title and not self.done:
+            self._title_parts.append(data)
+
+def _has_class(attrs, class_name):
+    for name, value in attrs:
+        if name == 'class' and value and class_name in value.split():
+            return True
+
+    return False
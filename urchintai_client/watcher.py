@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+'''
+Watch many properties and rooms and report when their vacancy changes.
+'''
+
+import asyncio
+import heapq
+import itertools
+import random
+
+from urchintai_client.models import PropertyCode, RoomCode, VacancyEvent
+from urchintai_client.priority import BACKGROUND, get_priority, priority
+
+PROPERTY = 'property'
+ROOM = 'room'
+
+_STOP = object()
+
+
+class VacancyWatcher:
+    '''
+    Poll properties and rooms, each at its own interval, and emit a VacancyEvent
+    each time one of them goes from full to vacant or from vacant to full.
+
+    Due checks are kept in a heap and run by a pool of max_concurrency workers.
+    Each interval is randomly stretched or shrunk by up to jitter (0.1 means 10%)
+    so that targets subscribed at the same time are not polled at the same time.
+    If emit_initial is True, the first result of each target is also emitted.
+    '''
+
+    def __init__(self, client, max_concurrency=10, jitter=0.1, emit_initial=False):
+        if max_concurrency < 1:
+            raise ValueError('max_concurrency must be at least 1')
+
+        self._client = client
+        self._max_concurrency = max_concurrency
+        self._jitter = jitter
+        self._emit_initial = emit_initial
+        self._subscriptions = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._wake_up = None
+        self._due = None
+        self._events = None
+        self._tasks = []
+
+    def watch_property(self, target, interval):
+        '''
+        Start watching a property, target is a property URL or a property code.
+        '''
+
+        self._subscribe(PROPERTY, target, interval)
+
+    def watch_room(self, target, interval):
+        '''
+        Start watching a room, target is a room URL or a room code.
+        '''
+
+        self._subscribe(ROOM, target, interval)
+
+    def unwatch(self, target):
+        self._subscriptions.pop(_make_key(target), None)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    async def events(self):
+        '''
+        Start watching and yield VacancyEvent until stop is called.
+        '''
+
+        self._start()
+        try:
+            while True:
+                event = await self._events.get()
+                if event is _STOP:
+                    return
+                yield event
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if tasks:
+            # Checks which were due but not started are kept for the next run.
+            while not self._due.empty():
+                key, subscription = self._due.get_nowait()
+                self._schedule(key, subscription, 0)
+
+            self._events.put_nowait(_STOP)
+
+    def _subscribe(self, kind, target, interval):
+        if interval <= 0:
+            raise ValueError('interval must be greater than 0')
+
+        key = _make_key(target)
+        subscription = _Subscription(kind, target, interval)
+        self._subscriptions[key] = subscription
+
+        # Spread first checks of targets subscribed together.
+        first_delay = random.uniform(0, interval * self._jitter)
+        self._schedule(key, subscription, first_delay)
+
+    def _schedule(self, key, subscription, delay):
+        if self._wake_up is None:
+            due_at = delay
+        else:
+            due_at = asyncio.get_running_loop().time() + delay
+
+        heapq.heappush(self._heap, (due_at, next(self._counter), key, subscription))
+        if self._wake_up is not None:
+            self._wake_up.set()
+
+    def _start(self):
+        if self._tasks:
+            raise RuntimeError('Watcher is already running')
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._wake_up is None:
+            # Targets subscribed before starting were scheduled relative to 0.
+            self._heap = [(now + due_at, count, key, subscription)
+                          for due_at, count, key, subscription in self._heap]
+            heapq.heapify(self._heap)
+
+        self._wake_up = asyncio.Event()
+        self._due = asyncio.Queue(maxsize=self._max_concurrency)
+        self._events = asyncio.Queue()
+        self._tasks = [asyncio.ensure_future(self._run_scheduler())] + \
+            [asyncio.ensure_future(self._run_worker()) for _ in range(self._max_concurrency)]
+
+    async def _run_scheduler(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wake_up.clear()
+
+            if not self._heap:
+                await self._wake_up.wait()
+                continue
+
+            due_at, _, key, subscription = self._heap[0]
+            delay = due_at - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake_up.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            entry = heapq.heappop(self._heap)
+
+            # Entries of targets which were unsubscribed or subscribed again are skipped.
+            if self._subscriptions.get(key) is not subscription:
+                continue
+
+            try:
+                await self._due.put((key, subscription))
+            except asyncio.CancelledError:
+                # Stopped while workers were busy, the check is kept for the next run.
+                heapq.heappush(self._heap, entry)
+                raise
+
+    async def _run_worker(self):
+        while True:
+            key, subscription = await self._due.get()
+            try:
+                # Polling is background traffic, unless the caller chose otherwise.
+                with priority(get_priority() or BACKGROUND):
+                    await self._check(subscription)
+            finally:
+                if self._subscriptions.get(key) is subscription:
+                    jitter = random.uniform(-self._jitter, self._jitter)
+                    self._schedule(key, subscription, subscription.interval * (1 + jitter))
+
+    async def _check(self, subscription):
+        try:
+            if subscription.kind == PROPERTY:
+                result = await _call(self._client.poll_property, 'property_code', subscription.target)
+            else:
+                result = await _call(self._client.poll_room, 'room_code', subscription.target)
+        except Exception:
+            # A failed check keeps the last known state, the target is checked again later.
+            return
+
+        # Same response as last time, there is nothing to compare.
+        if not result.changed and subscription.vacant is not None:
+            return
+
+        vacant = result.vacant
+        previous = subscription.vacant
+        subscription.vacant = vacant
+        if vacant == previous:
+            return
+        if previous is None and not self._emit_initial:
+            return
+
+        self._events.put_nowait(VacancyEvent(subscription.target, subscription.kind, vacant, previous))
+
+class _Subscription:
+    __slots__ = ('kind', 'target', 'interval', 'vacant')
+
+    def __init__(self, kind, target, interval):
+        self.kind = kind
+        self.target = target
+        self.interval = interval
+        self.vacant = None
+
+def _make_key(target):
+    # URLs, PropertyCode and RoomCode are hashable, code dicts are turned into the matching code.
+    if isinstance(target, (str, tuple)):
+        return target
+
+    try:
+        if 'room_id' in target:
+            return RoomCode(target['store_code'], target['house_code'], target['type'], target['room_id'])
+        return PropertyCode(target['store_code'], target['house_code'], target['type'])
+    except KeyError:
+        # Invalid code, its check reports the error.
+        return tuple(sorted(target.items()))
+
+async def _call(method, code_argument, target):
+    if isinstance(target, str):
+        return await method(url=target)
+
+    return await method(**{code_argument: target})